@@ -14,6 +14,7 @@ import os
 import sys
 
 import environ
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -50,13 +51,22 @@ INSTALLED_APPS = [
     'rest_auth.registration',
     'drf_spectacular',
     'corsheaders',
-    'core',
+    'core.apps.CoreConfig',
     'user',
-    'event',
+    'event.apps.EventConfig',
 ]
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
@@ -66,7 +76,15 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS':
         'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10
+    'PAGE_SIZE': 10,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.ScopedTokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'event_list': '60/min',
+        'comment_post': '10/min',
+        'participant_join': '20/min',
+    }
 }
 
 OLD_PASSWORD_FIELD_ENABLED = True
@@ -84,16 +102,115 @@ ACCOUNT_EMAIL_VERIFICATION = 'none'
 SITE_ID = 1
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
+    'core.accesslog.AccessLogMiddleware',
+    'core.slowlog.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.TokenAPISessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
+    'core.middleware.TokenAPICsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.TokenAPIMessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Requests under this prefix carrying a token skip session, message and
+# CSRF cookie handling. Admin and session login keep the full stack.
+API_PATH_PREFIX = '/api/'
+
+# API responses shorter than this many bytes are sent uncompressed
+COMPRESSION_MIN_LENGTH = 1024
+
+# Requests are profiled when sent with an `X-Profile: <PROFILING_KEY>`
+# header or picked with PROFILING_SAMPLE_RATE. Traces are kept in
+# PROFILING_TRACE_DIR and shown with the show_profile command.
+PROFILING_KEY = env('PROFILING_KEY', default='')
+PROFILING_SAMPLE_RATE = env.float('PROFILING_SAMPLE_RATE', default=0.0)
+PROFILING_CPROFILE = env.bool('PROFILING_CPROFILE', default=True)
+PROFILING_TRACE_DIR = env(
+    'PROFILING_TRACE_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+PROFILING_MAX_TRACES = 200
+
+# /metrics is served to scrapers sending `Authorization: Bearer
+# <METRICS_TOKEN>` and disabled while the token is empty. With several
+# uWSGI processes METRICS_DIR must be a directory they share, emptied
+# on deploy, where each process writes its values.
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+METRICS_DIR = env('METRICS_DIR', default='')
+METRICS_FLUSH_SECONDS = 1
+
+# Queries of a request taking SLOW_QUERY_MS or more are logged as JSON
+# lines with an EXPLAIN to the rotating SLOW_QUERY_LOG, summarized by
+# the slow_queries command.
+SLOW_QUERY_MS = env.float('SLOW_QUERY_MS', default=200)
+SLOW_QUERY_EXPLAIN_SECONDS = 300
+SLOW_QUERY_LOG = env(
+    'SLOW_QUERY_LOG', default=os.path.join(BASE_DIR, 'slow_queries.log'))
+SLOW_QUERY_LOG_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+# Requests are logged as JSON lines to ACCESS_LOG, or stderr (the uWSGI
+# log) when empty, by a background thread. Views listed in
+# ACCESS_LOG_SAMPLE_RATES only have that share of requests logged.
+ACCESS_LOG = env('ACCESS_LOG', default='')
+ACCESS_LOG_BYTES = 50 * 1024 * 1024
+ACCESS_LOG_BACKUPS = 5
+ACCESS_LOG_SAMPLE_RATE = env.float('ACCESS_LOG_SAMPLE_RATE', default=1.0)
+ACCESS_LOG_SAMPLE_RATES = {
+    'event:event-list': 0.1,
+    'event:event-counts': 0.1,
+    'metrics': 0,
+}
+
+# Wall time for a fresh worker to run django.setup() and load the
+# URLconf, checked by the import_time command
+COLD_START_TARGET_MS = 1500
+
+# /api/schema/ serves the schema generated once per code version and
+# kept in SCHEMA_CACHE_DIR. The version is CODE_VERSION, e.g. the git
+# commit set by the deploy, or else a hash of the Python sources.
+CODE_VERSION = env('CODE_VERSION', default='')
+SCHEMA_CACHE_DIR = env(
+    'SCHEMA_CACHE_DIR', default=os.path.join(BASE_DIR, 'schema_cache'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'access': {
+            '()': 'core.accesslog.access_log_handler',
+            'filename': ACCESS_LOG,
+            'max_bytes': ACCESS_LOG_BYTES,
+            'backup_count': ACCESS_LOG_BACKUPS,
+        },
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'maxBytes': SLOW_QUERY_LOG_BYTES,
+            'backupCount': SLOW_QUERY_LOG_BACKUPS,
+            'formatter': 'message',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'board.access': {
+            'handlers': ['access'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'board.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'board-app.urls'
 
 TEMPLATES = [
@@ -115,6 +232,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'board-app.wsgi.application'
 
+# Threads of the ASGI server that run the sync views, the counterpart of
+# the uWSGI `threads`
+ASGI_THREADS = env.int('ASGI_THREADS', default=16)
+
 
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
@@ -131,6 +252,29 @@ if DEBUG:
         }
     }
 
+# The local memory default is per process. Cached event counts and user
+# profiles are invalidated through the cache, so with several uWSGI
+# processes or hosts set CACHE_URL to a cache they share, e.g.
+# memcached, or other processes serve stale values until they expire.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://')
+}
+
+# Comment streams a WSGI process serves at once. Each holds a request
+# thread for up to five minutes, so keep it below the uWSGI `threads`;
+# further streams get 503 and the client retries. Under the ASGI server
+# of docker-compose streams wait in the event loop without a thread and
+# are not capped, a process holds thousands of them.
+COMMENT_STREAM_LIMIT = env.int('COMMENT_STREAM_LIMIT', default=4)
+
+# Publish/subscribe backend of comment streams and participant channels.
+# The default keeps messages in process, replace it to fan out across
+# processes.
+PUBSUB_BACKEND = 'core.pubsub.Broker'
+
+# Seconds a response is replayed for a retried Idempotency-Key
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -179,8 +323,16 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 AUTH_USER_MODEL = 'core.User'
 
+# Offline geocoder used to place events on the map
+EVENT_GEOCODER = 'core.geo.GazetteerGeocoder'
+GEOCODER_GAZETTEER = os.path.join(BASE_DIR, 'core', 'data', 'gazetteer.json')
+
 CORS_ALLOWED_ORIGINS = [
     'http://127.0.0.1:8080'
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+
+CORS_ALLOW_HEADERS = list(default_headers) + ['idempotency-key', 'x-profile']
+CORS_EXPOSE_HEADERS = ['idempotent-replayed', 'server-timing',
+                       'x-profile-trace']
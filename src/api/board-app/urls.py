@@ -17,18 +17,22 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import (
-    SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
-)
+from core.metrics import metrics_view
+from core.schema import lazy_view, schema_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/users/', include('user.urls')),
     path('api/events/', include('event.urls')),
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('api/schema/', schema_view, name='schema'),
     path('api/schema/swagger-ui/',
-         SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('api/schema/redoc/', SpectacularRedocView.as_view(url_name='schema'),
+         lazy_view('drf_spectacular.views.SpectacularSwaggerView',
+                   url_name='schema'),
+         name='swagger-ui'),
+    path('api/schema/redoc/',
+         lazy_view('drf_spectacular.views.SpectacularRedocView',
+                   url_name='schema'),
          name='redoc'),
 ]
 
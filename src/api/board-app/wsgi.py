@@ -10,7 +10,12 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/wsgi/
 import os
 
 from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'board-app.settings')
 
 application = get_wsgi_application()
+
+# Import the URLconf with its views and serializers now, so uWSGI forks
+# workers that already have them instead of loading them per worker
+get_resolver().url_patterns
@@ -0,0 +1,11 @@
+import pytest
+from django.core.cache import caches
+
+pytest_plugins = ['core.pytest_budgets']
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test with empty caches, e.g. throttle buckets"""
+    for cache in caches.all():
+        cache.clear()
@@ -0,0 +1,157 @@
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('board.access')
+
+
+class QueueingHandler(logging.handlers.QueueHandler):
+    """Hand records to a thread that writes them with `target`
+
+    Emitting only puts the record on a bounded queue, so a slow disk never
+    stalls a request thread. Records arriving while the queue is full are
+    dropped and counted. The writer thread is started on first use in
+    each process, as uWSGI forks workers after loading the app.
+    """
+
+    def __init__(self, target, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.target = target
+        self.dropped = 0
+        self.listener = None
+        self.listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    def prepare(self, record):
+        # The message is already formatted, skip copying the record
+        return record
+
+    def enqueue(self, record):
+        if self.listener_pid != os.getpid():
+            self.start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def start_listener(self):
+        with self._listener_lock:
+            if self.listener_pid == os.getpid():
+                return
+            self.listener = logging.handlers.QueueListener(
+                self.queue, self.target)
+            self.listener.start()
+            self.listener_pid = os.getpid()
+
+    def stop(self):
+        """Write the queued records and stop the writer thread"""
+        with self._listener_lock:
+            if self.listener_pid == os.getpid():
+                self.listener.stop()
+            self.listener_pid = None
+
+    def close(self):
+        self.stop()
+        self.target.close()
+        super().close()
+
+
+def access_log_handler(filename='', max_bytes=0, backup_count=0,
+                       maxsize=10000):
+    """Build the queueing handler of the LOGGING setting
+
+    Writes JSON lines to a rotating `filename`, or to stderr when empty.
+    """
+    if filename:
+        target = logging.handlers.RotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count,
+            delay=True)
+    else:
+        target = logging.StreamHandler()
+    target.setFormatter(logging.Formatter('%(message)s'))
+    return QueueingHandler(target, maxsize)
+
+
+class QueryTimer:
+
+    def __init__(self):
+        self.seconds = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+def sample_rate(view_name, status_code):
+    """Return the share of requests to log for a view
+
+    Server errors are always logged.
+    """
+    if status_code >= 500:
+        return 1.0
+    return settings.ACCESS_LOG_SAMPLE_RATES.get(
+        view_name, settings.ACCESS_LOG_SAMPLE_RATE)
+
+
+def access_entry(request, response, seconds, db_seconds, rate):
+    match = request.resolver_match
+    view = getattr(response, 'renderer_context', {}).get('view')
+    user = getattr(request, 'user', None)
+    if user is not None and not user.is_authenticated:
+        user = None
+    return {
+        'time': datetime.datetime.now().isoformat(timespec='milliseconds'),
+        'method': request.method,
+        'path': request.path,
+        'view': match.view_name if match else None,
+        'action': getattr(view, 'action', None),
+        'user_id': user and user.pk,
+        'status': response.status_code,
+        'ms': round(seconds * 1000, 3),
+        'db_ms': round(db_seconds * 1000, 3),
+        'bytes': None if response.streaming else len(response.content),
+        'sample_rate': rate,
+    }
+
+
+class AccessLogMiddleware:
+    """Log each request as a JSON line on the board.access logger
+
+    Busy views are sampled with ACCESS_LOG_SAMPLE_RATES, and each entry
+    keeps its rate so counts can be scaled back up. The size and timing
+    of a streaming response only cover building the response.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        seconds = time.perf_counter() - started
+
+        match = request.resolver_match
+        rate = sample_rate(match.view_name if match else None,
+                           response.status_code)
+        if rate >= 1 or random.random() < rate:
+            logger.info(json.dumps(
+                access_entry(request, response, seconds, timer.seconds,
+                             rate)))
+        return response
@@ -0,0 +1,54 @@
+from django.db.models import F, Q
+
+from core.models import Event, Participant
+
+
+def take_seat(event_id):
+    """Take a seat with one conditional UPDATE, return False if full
+
+    The check and the increment happen in the same statement, so
+    concurrent joins can never push the count over the capacity.
+    """
+    return bool(Event.objects.filter(
+        Q(capacity__isnull=True) | Q(participant_count__lt=F('capacity')),
+        pk=event_id
+    ).update(participant_count=F('participant_count') + 1))
+
+
+def admission_status(event_id):
+    """Return JOIN if a seat was taken or WAITING to queue on the waitlist
+
+    Call inside the transaction that saves the participant.
+    """
+    if take_seat(event_id):
+        return Participant.Status.JOIN
+    return Participant.Status.WAITING
+
+
+def release_seat(event_id):
+    """Give a seat back and admit the waitlist, return how many joined
+
+    Call inside the transaction that moves a participant out of JOIN.
+    """
+    Event.objects.filter(pk=event_id, participant_count__gt=0).update(
+        participant_count=F('participant_count') - 1)
+    return admit_waitlist(event_id)
+
+
+def admit_waitlist(event_id):
+    """Move waiting participants into free seats, return how many joined
+
+    Call inside a transaction, e.g. after the capacity has been raised.
+    """
+    promoted = 0
+    while True:
+        waiting = Participant.objects.select_for_update().filter(
+            event=event_id,
+            status=Participant.Status.WAITING,
+            is_active=True
+        ).order_by('created_at', 'id').first()
+        if waiting is None or not take_seat(event_id):
+            return promoted
+        waiting.status = Participant.Status.JOIN
+        waiting.save(update_fields=['status', 'updated_at'])
+        promoted += 1
@@ -1,5 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def repair_search_index(using, **kwargs):
+    """Reinstall SQLite search triggers lost when t_event is remade"""
+    from django.db import connections
+
+    from core.search import ensure_sqlite_triggers
+
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        ensure_sqlite_triggers(connection)
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core import signals  # noqa: F401
+
+        post_migrate.connect(repair_search_index, sender=self)
@@ -0,0 +1,145 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler as DjangoASGIHandler
+from django.db import close_old_connections, connections
+
+
+class ResponseSender:
+    """ASGI `send` that also carries `receive` to send_response()"""
+
+    def __init__(self, send, receive):
+        self.send = send
+        self.receive = receive
+
+    async def __call__(self, message):
+        await self.send(message)
+
+
+async def wait_for_disconnect(receive):
+    """Return once the client has gone, the request body is already read"""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def close_response(response):
+    """Close a response and the database connections of this thread"""
+    try:
+        response.close()
+    finally:
+        connections.close_all()
+
+
+async def iterate_in_thread(response):
+    """Yield the content of a sync streaming response from its own thread
+
+    Lazy querysets in the content then run outside the event loop, and a
+    stream waiting for data holds its thread only, not the loop.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1)
+    iterator = iter(response)
+    try:
+        while True:
+            part = await loop.run_in_executor(executor, next, iterator, None)
+            if part is None:
+                return
+            yield part
+    finally:
+        # Queued after a next() still running, on the same thread
+        await loop.run_in_executor(executor, close_response, response)
+        executor.shutdown(wait=False)
+
+
+class ASGIHandler(DjangoASGIHandler):
+    """Django's ASGIHandler with streaming responses fit for a long life
+
+    Django 3.0 iterates streaming content in the event loop, where lazy
+    queries raise SynchronousOnlyOperation and a waiting stream stalls
+    every other connection. Sync content is read in a thread instead and
+    async content, set as `async_streaming_content`, in the loop. Both
+    stop when the client disconnects.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await super().__call__(scope, receive, ResponseSender(send, receive))
+
+    def get_response(self, request):
+        # Runs on a pool thread, which opens and closes its database
+        # connection per request like a WSGI worker
+        close_old_connections()
+        try:
+            return super().get_response(request)
+        finally:
+            close_old_connections()
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            await super().send_response(response, send)
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': self.response_headers(response),
+        })
+        content = getattr(response, 'async_streaming_content', None)
+        parts = (iterate_in_thread(response) if content is None
+                 else content.__aiter__())
+        disconnect = asyncio.ensure_future(wait_for_disconnect(send.receive))
+        next_part = None
+        try:
+            while True:
+                next_part = asyncio.ensure_future(parts.__anext__())
+                await asyncio.wait({next_part, disconnect},
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if not next_part.done():
+                    return
+                try:
+                    part = next_part.result()
+                except StopAsyncIteration:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({'type': 'http.response.body', 'body': chunk,
+                                'more_body': True})
+            await send({'type': 'http.response.body'})
+        finally:
+            disconnect.cancel()
+            # The client has gone or the server is stopping, the content
+            # must leave its await before it can be closed
+            if next_part is not None and not next_part.done():
+                next_part.cancel()
+                await asyncio.wait({next_part})
+            await parts.aclose()
+            if content is not None:
+                response.close()
+
+    @staticmethod
+    def response_headers(response):
+        """Return the headers and cookies of a response as ASGI pairs"""
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            headers.append((b'Set-Cookie',
+                            cookie.output(header='').encode('ascii').strip()))
+        return headers
+
+
+async def lifespan(scope, receive, send):
+    """Size the thread pool running sync views when the server starts"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            asyncio.get_running_loop().set_default_executor(
+                ThreadPoolExecutor(settings.ASGI_THREADS,
+                                   thread_name_prefix='django'))
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
@@ -0,0 +1,146 @@
+import datetime
+import statistics
+import time
+import tracemalloc
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, reset_queries
+from django.db.models import Count, Q
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from core.generators import DatasetGenerator
+from core.models import Event
+
+# Seeded events are spread over one calendar year from this date
+DATASET_START = datetime.date(2021, 1, 1)
+
+BenchmarkCase = namedtuple('BenchmarkCase', ('name', 'path'))
+
+
+def seed_dataset(sizes, seed=0):
+    """Insert a benchmark dataset, returns the row count per model"""
+    return DatasetGenerator(seed, start=DATASET_START).generate(sizes)
+
+
+def build_cases():
+    """Return the hot endpoint requests against the seeded data"""
+    events = Event.objects.filter(is_active=True, status=Event.Status.PUBLIC)
+    hot_event = events.order_by('-participant_count', 'id').first()
+    commented_event = events.annotate(
+        comments=Count('eventcomment', filter=Q(eventcomment__is_active=True))
+    ).order_by('-comments', 'id').first()
+    month = DATASET_START.replace(month=3)
+    range_query = f'start={month}&end={month.replace(month=4)}'
+
+    return [
+        BenchmarkCase('event list', f'/api/events/?{range_query}'),
+        BenchmarkCase('event list (500)',
+                      f'/api/events/?{range_query}&page_size=500'),
+        BenchmarkCase('event list facets',
+                      f'/api/events/?{range_query}&facets=1'),
+        BenchmarkCase('event detail', f'/api/events/{hot_event.pk}/'),
+        BenchmarkCase('event search', '/api/events/search/?q=tour'),
+        BenchmarkCase('event counts',
+                      f'/api/events/counts/?start={DATASET_START}&'
+                      f'end={DATASET_START.replace(month=12, day=31)}'),
+        BenchmarkCase('comment list',
+                      f'/api/events/{commented_event.pk}/comments/'),
+        BenchmarkCase('participant list',
+                      f'/api/events/{hot_event.pk}/participants/'),
+    ]
+
+
+def request(client, path):
+    """GET the path and read the whole body, return (status, bytes)"""
+    response = client.get(path)
+    if response.streaming:
+        content = b''.join(response.streaming_content)
+    else:
+        content = response.content
+    return response.status_code, len(content)
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_case(client, case, runs):
+    """Time one case cold and warm, count its queries and allocations"""
+    clear_caches()
+    # Closing the connection makes the cold run reconnect as a fresh
+    # worker would, it is ignored for in-memory SQLite databases
+    connection.close()
+    started = time.perf_counter()
+    status, size = request(client, case.path)
+    cold = time.perf_counter() - started
+
+    # The query log is cleared when a request starts, so start empty
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        request(client, case.path)
+
+    tracemalloc.start()
+    try:
+        request(client, case.path)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    warm = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        request(client, case.path)
+        warm.append(time.perf_counter() - started)
+
+    return OrderedDict([
+        ('status', status),
+        ('bytes', size),
+        ('queries', len(queries)),
+        ('peak_kb', round(peak / 1024, 1)),
+        ('cold_ms', round(cold * 1000, 2)),
+        ('warm_median_ms', round(statistics.median(warm) * 1000, 2)),
+        ('warm_p95_ms', round(percentile(warm, 0.95) * 1000, 2)),
+    ])
+
+
+def run_benchmark(cases, runs=20):
+    """Return the results of each case keyed by its name
+
+    Throttling is switched off so repeated requests are all served.
+    """
+    rest_framework = dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={})
+    client = Client()
+    results = OrderedDict()
+    with override_settings(ALLOWED_HOSTS=['*'],
+                           REST_FRAMEWORK=rest_framework):
+        for case in cases:
+            results[case.name] = run_case(client, case, runs)
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Return messages for cases slower or heavier than the baseline"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        limit = base['warm_median_ms'] * (1 + tolerance)
+        if result['warm_median_ms'] > limit:
+            regressions.append(
+                f'{name}: median {result["warm_median_ms"]}ms, '
+                f'baseline {base["warm_median_ms"]}ms')
+        if result['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: {result["queries"]} queries, '
+                f'baseline {base["queries"]}')
+    return regressions
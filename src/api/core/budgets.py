@@ -0,0 +1,144 @@
+import functools
+import time
+from contextlib import ExitStack
+
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+# Latency budgets are only checked when enabled, wall time varies too
+# much between machines to fail the suite on it by default. Query
+# budgets always apply.
+enforce_latency = False
+
+# Multiplies every latency budget, raised for slow machines or CI
+latency_scale = 1.0
+
+
+class BudgetExceeded(AssertionError):
+    pass
+
+
+class RequestRecord:
+    """Queries and wall time of one request served by the test client"""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.queries = []
+        self.started = time.perf_counter()
+        self.ms = None
+
+    def finish(self):
+        self.ms = (time.perf_counter() - self.started) * 1000
+
+    def __str__(self):
+        return f'{self.method} {self.path}'
+
+
+class RequestBudget:
+    """Fail when a request served inside the block goes over budget
+
+    Every request handled between request_started and request_finished,
+    such as a test client call, may run at most `queries` queries and,
+    with `enforce_latency`, take at most `ms` milliseconds. Queries of
+    the test itself, e.g. creating rows with factories, are not counted.
+    """
+
+    def __init__(self, queries=None, ms=None):
+        self.queries = queries
+        self.ms = ms
+        self.requests = []
+        self.current = None
+
+    def __enter__(self):
+        self.stack = ExitStack()
+        for connection in connections.all():
+            self.stack.enter_context(
+                connection.execute_wrapper(self.record_query))
+        request_started.connect(self.request_started)
+        request_finished.connect(self.request_finished)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        request_started.disconnect(self.request_started)
+        request_finished.disconnect(self.request_finished)
+        self.stack.close()
+        # Streaming responses that were never read do not finish
+        self.request_finished()
+        if exc_type is None:
+            self.check()
+
+    def request_started(self, sender=None, environ=None, **kwargs):
+        self.request_finished()
+        environ = environ or {}
+        path = environ.get('PATH_INFO', '')
+        if environ.get('QUERY_STRING'):
+            path += '?' + environ['QUERY_STRING']
+        self.current = RequestRecord(environ.get('REQUEST_METHOD'), path)
+
+    def request_finished(self, sender=None, **kwargs):
+        if self.current is not None:
+            self.current.finish()
+            self.requests.append(self.current)
+            self.current = None
+
+    def record_query(self, execute, sql, params, many, context):
+        if self.current is None:
+            return execute(sql, params, many, context)
+        queries = self.current.queries
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            queries.append((sql, (time.perf_counter() - started) * 1000))
+
+    def violations(self):
+        """Return a message per request over budget"""
+        messages = []
+        max_ms = None
+        if enforce_latency and self.ms is not None:
+            max_ms = self.ms * latency_scale
+        for record in self.requests:
+            problems = []
+            if self.queries is not None and len(record.queries) > self.queries:
+                problems.append(
+                    f'{len(record.queries)} queries (budget {self.queries})')
+            if max_ms is not None and record.ms > max_ms:
+                problems.append(
+                    f'{record.ms:.1f}ms (budget {max_ms:.0f}ms)')
+            if problems:
+                lines = [f'{record}: ' + ', '.join(problems)]
+                lines += [f'  {index}. {ms:.2f}ms {sql}'
+                          for index, (sql, ms)
+                          in enumerate(record.queries, start=1)]
+                messages.append('\n'.join(lines))
+        return messages
+
+    def check(self):
+        messages = self.violations()
+        if messages:
+            raise BudgetExceeded('Request over budget\n' +
+                                 '\n'.join(messages))
+
+
+def budget(queries=None, ms=None):
+    """Give each request of a test at most `queries` queries and `ms`
+
+    Decorates a test method, or a TestCase class to budget every test
+    method of the class that has no budget of its own.
+    """
+    def decorate(target):
+        if isinstance(target, type):
+            for name, value in list(vars(target).items()):
+                if (name.startswith('test') and callable(value) and
+                        not hasattr(value, 'request_budget')):
+                    setattr(target, name, decorate(value))
+            return target
+
+        @functools.wraps(target)
+        def wrapper(*args, **kwargs):
+            with RequestBudget(queries, ms):
+                return target(*args, **kwargs)
+        wrapper.request_budget = (queries, ms)
+        return wrapper
+    return decorate
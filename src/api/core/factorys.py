@@ -1,23 +1,16 @@
-import datetime
 import factory
 
-from faker import Faker
-
 from django.utils.timezone import now
 from django.contrib.auth import get_user_model
-from django.utils.timezone import make_aware
 
 from core.models import Event, EventComment, Participant
 
 
-fake = Faker()
-
-
 class UserFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = get_user_model()
 
-    email = fake.safe_email()
+    email = factory.Sequence(lambda n: f'factory{n}@example.com')
     password = 'testpass'
 
 
@@ -25,11 +18,11 @@ class EventFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = Event
 
-    title = fake.text(max_nb_chars=255)
-    description = fake.text(max_nb_chars=2000)
+    title = factory.Faker('text', max_nb_chars=255)
+    description = factory.Faker('text', max_nb_chars=2000)
     event_time = factory.LazyFunction(now)
-    image = fake.image_url()
-    address = fake.address()
+    image = factory.Faker('image_url')
+    address = factory.Faker('address')
     fee = 500
     status = Event.Status.PUBLIC
 
@@ -38,9 +31,9 @@ class EventCommentFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = EventComment
 
-    comment = fake.text(max_nb_chars=500)
+    comment = factory.Faker('text', max_nb_chars=500)
 
 
 class ParticipantFactory(factory.django.DjangoModelFactory):
     class Meta:
-        model = Participant
\ No newline at end of file
+        model = Participant
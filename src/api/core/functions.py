@@ -0,0 +1,23 @@
+from django.db.models import DateTimeField, ExpressionWrapper, F
+from django.db.models.functions import TruncDate
+
+
+class LocalDate(TruncDate):
+    """Date of a datetime field at a fixed UTC offset
+
+    TruncDate converts to the current time zone in the database, which
+    MySQL can only do with its time zone tables loaded, else it returns
+    NULL. The offset is added instead, so use it for zones without
+    daylight saving time, such as Asia/Tokyo.
+    """
+
+    def __init__(self, field_name, offset, **extra):
+        super().__init__(ExpressionWrapper(
+            F(field_name) + offset, output_field=DateTimeField()), **extra)
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = compiler.compile(self.lhs)
+        # The zone of the connection itself, so nothing is converted
+        sql = connection.ops.datetime_cast_date_sql(
+            lhs, connection.timezone_name)
+        return sql, lhs_params
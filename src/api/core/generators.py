@@ -0,0 +1,279 @@
+import calendar
+import datetime
+import json
+import random
+from collections import OrderedDict
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db.models import Max
+from django.utils.timezone import make_aware
+from faker import Faker
+
+from core.factorys import (EventCommentFactory, EventFactory,
+                           ParticipantFactory, UserFactory)
+from core.geo import encode_geohash
+from core.models import Event, EventComment, Participant
+
+DATASETS = OrderedDict([
+    ('small', {'users': 200, 'events': 1000,
+               'participants': 10000, 'comments': 5000}),
+    ('medium', {'users': 2000, 'events': 10000,
+                'participants': 100000, 'comments': 50000}),
+    ('full', {'users': 20000, 'events': 100000,
+              'participants': 1000000, 'comments': 500000}),
+])
+BATCH_SIZE = 5000
+# Faker is slow per call, texts are drawn from pools of this size
+TEXT_POOL_SIZE = 1000
+GENERATED_PASSWORD = 'generated'
+
+# Relative number of events per month, busy in cherry blossom and
+# autumn leaves seasons and quiet in winter
+MONTH_WEIGHTS = (3, 4, 9, 10, 7, 5, 6, 8, 6, 8, 9, 5)
+WEEKEND_WEIGHT = 2.5
+FEES = ((0, 30), (500, 15), (1000, 20), (2000, 15), (3000, 10), (5000, 7),
+        (10000, 3))
+CAPACITIES = ((None, 60), (10, 10), (20, 12), (30, 8), (50, 6), (100, 4))
+EVENT_STATUSES = ((Event.Status.PUBLIC, 85), (Event.Status.PRIVATE, 10),
+                  (Event.Status.CANCEL, 5))
+# Pareto shapes of event popularity, organizer and commenter activity,
+# lower is more skewed towards a few hot events and busy users
+EVENT_POPULARITY_ALPHA = 1.2
+ORGANIZER_ALPHA = 1.5
+COMMENTER_ALPHA = 2.0
+
+
+def batched(iterable, size=BATCH_SIZE):
+    """Yield lists of at most `size` items"""
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def weighted(rng, choices):
+    """Pick a value from (value, weight) pairs"""
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def pareto_weights(rng, count, alpha):
+    """Return long tailed weights so a few slots get most activity"""
+    return [rng.paretovariate(alpha) for _ in range(count)]
+
+
+def id_range(ids):
+    """Return id__range bounds, long id lists exceed parameter limits"""
+    return (ids[0], ids[-1]) if ids else (0, -1)
+
+
+def spread(rng, total, weights, limit):
+    """Split `total` over the weights with at most `limit` per slot"""
+    if not weights:
+        return []
+    scale = total / sum(weights)
+    return [min(limit, int(weight * scale + rng.random()))
+            for weight in weights]
+
+
+class DatasetGenerator:
+    """Generate users, events, participants and comments in bulk
+
+    Rows are built with the core.factorys factories and inserted with
+    bulk_create in batches. Events are skewed towards busy months and
+    weekends, participants towards a few hot events and comments towards
+    hot events and heavy commenters. The same seed gives the same data.
+    """
+
+    def __init__(self, seed=0, start=None, months=12, batch_size=BATCH_SIZE,
+                 log=None):
+        self.rng = random.Random(seed)
+        self.fake = Faker(['ja_JP', 'en_US'])
+        self.fake.seed_instance(seed)
+        self.start = start or datetime.date.today().replace(month=1, day=1)
+        self.months = months
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        with open(settings.GEOCODER_GAZETTEER, encoding='utf-8') as f:
+            self.places = json.load(f)
+
+    def generate(self, sizes):
+        """Insert rows of the given sizes, return the count per model"""
+        user_ids = self.generate_users(sizes['users'])
+        weights = pareto_weights(self.rng, sizes['events'],
+                                 EVENT_POPULARITY_ALPHA)
+        # Participant statuses are drawn before the events are inserted,
+        # so participant_count is written with them instead of updated
+        counts = spread(self.rng, sizes['participants'], weights,
+                        len(user_ids))
+        event_ids, statuses = self.generate_events(counts, user_ids)
+        participants = self.generate_participants(
+            event_ids, statuses, user_ids)
+        comments = self.generate_comments(
+            sizes['comments'], event_ids, weights, user_ids)
+        return OrderedDict([
+            ('users', len(user_ids)),
+            ('events', len(event_ids)),
+            ('participants', participants),
+            ('comments', comments),
+        ])
+
+    def insert(self, model, rows):
+        """bulk_create the rows in batches, return the ids inserted
+
+        Ids are read back afterwards as bulk_create on SQLite and MySQL
+        does not set them.
+        """
+        first_id = (model.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        inserted = 0
+        for batch in batched(rows, self.batch_size):
+            model.objects.bulk_create(batch)
+            inserted += len(batch)
+            self.log(f'{model.__name__}: {inserted}')
+        return list(model.objects.filter(id__gte=first_id)
+                    .order_by('id').values_list('id', flat=True))
+
+    def text_pool(self, rows, provider, **kwargs):
+        """Return Faker texts to draw from for the given number of rows"""
+        return [getattr(self.fake, provider)(**kwargs)
+                for _ in range(max(1, min(rows, TEXT_POOL_SIZE)))]
+
+    def generate_users(self, count):
+        rng = self.rng
+        User = get_user_model()
+        password = make_password(GENERATED_PASSWORD)
+        first_names = self.text_pool(count, 'first_name')
+        family_names = self.text_pool(count, 'last_name')
+        introductions = self.text_pool(count, 'text', max_nb_chars=1000)
+        offset = User.objects.aggregate(Max('id'))['id__max'] or 0
+
+        users = (
+            UserFactory.build(
+                email=f'generated{offset + index}@example.com',
+                password=password,
+                first_name=(rng.choice(first_names)
+                            if rng.random() < 0.9 else ''),
+                family_name=(rng.choice(family_names)
+                             if rng.random() < 0.7 else ''),
+                introduction=(rng.choice(introductions)
+                              if rng.random() < 0.3 else ''),
+                is_guide=rng.random() < 0.05,
+                is_active=rng.random() < 0.98,
+            )
+            for index in range(count)
+        )
+        return self.insert(User, users)
+
+    def event_time(self):
+        """Return an aware datetime skewed to busy months and weekends"""
+        rng = self.rng
+        weights = [MONTH_WEIGHTS[(self.start.month - 1 + index) % 12]
+                   for index in range(self.months)]
+        while True:
+            index = rng.choices(range(self.months), weights)[0]
+            year = self.start.year + (self.start.month - 1 + index) // 12
+            month = (self.start.month - 1 + index) % 12 + 1
+            day = rng.randint(1, calendar.monthrange(year, month)[1])
+            date = datetime.date(year, month, day)
+            if (date.weekday() >= 5 or
+                    rng.random() < 1 / WEEKEND_WEIGHT):
+                break
+        return make_aware(datetime.datetime(
+            year, month, day, rng.randint(8, 20), rng.choice((0, 30))))
+
+    def participant_statuses(self, count, capacity):
+        """Return the statuses of an event's participants in join order"""
+        rng = self.rng
+        statuses = []
+        joined = 0
+        for _ in range(count):
+            if rng.random() < 0.1:
+                statuses.append(Participant.Status.CANCEL)
+            elif capacity is None or joined < capacity:
+                statuses.append(Participant.Status.JOIN)
+                joined += 1
+            else:
+                statuses.append(Participant.Status.WAITING)
+        return statuses
+
+    def generate_events(self, participant_counts, user_ids):
+        """Insert one event per participant count
+
+        Returns the event ids and the participant statuses of each event.
+        """
+        rng = self.rng
+        User = get_user_model()
+        organizers = list(User.objects.filter(
+            id__range=id_range(user_ids), is_guide=True
+        ).values_list('id', flat=True))
+        organizers = organizers or user_ids
+        # Some guides organize far more events than others
+        organizer_weights = list(accumulate(
+            pareto_weights(rng, len(organizers), ORGANIZER_ALPHA)))
+        count = len(participant_counts)
+        titles = self.text_pool(count, 'sentence', nb_words=6)
+        descriptions = self.text_pool(count, 'text', max_nb_chars=2000)
+        statuses = []
+
+        def event(participant_count):
+            place = rng.choice(self.places)
+            name = rng.choice(place['names'])
+            capacity = weighted(rng, CAPACITIES)
+            statuses.append(
+                self.participant_statuses(participant_count, capacity))
+            return EventFactory.build(
+                title=f'{name} {rng.choice(titles)}'[:255],
+                description=rng.choice(descriptions),
+                organizer_id=rng.choices(
+                    organizers, cum_weights=organizer_weights)[0],
+                image=None,
+                event_time=self.event_time(),
+                address=f'{name} {rng.randint(1, 9)}-{rng.randint(1, 30)}',
+                fee=weighted(rng, FEES),
+                status=weighted(rng, EVENT_STATUSES),
+                is_active=rng.random() < 0.98,
+                capacity=capacity,
+                participant_count=statuses[-1].count(
+                    Participant.Status.JOIN),
+                latitude=place['latitude'],
+                longitude=place['longitude'],
+                geohash=encode_geohash(place['latitude'], place['longitude']),
+            )
+        event_ids = self.insert(
+            Event, (event(count) for count in participant_counts))
+        return event_ids, statuses
+
+    def generate_participants(self, event_ids, statuses, user_ids):
+        rng = self.rng
+
+        def participants():
+            for event_id, event_statuses in zip(event_ids, statuses):
+                users = rng.sample(user_ids, len(event_statuses))
+                for user_id, status in zip(users, event_statuses):
+                    yield ParticipantFactory.build(
+                        event_id=event_id, user_id=user_id, status=status)
+        return len(self.insert(Participant, participants()))
+
+    def generate_comments(self, count, event_ids, weights, user_ids):
+        rng = self.rng
+        comments = self.text_pool(count, 'text', max_nb_chars=500)
+        commenter_weights = list(accumulate(
+            pareto_weights(rng, len(user_ids), COMMENTER_ALPHA)))
+
+        def event_comments():
+            counts = spread(rng, count, weights, count)
+            for event_id, event_count in zip(event_ids, counts):
+                users = rng.choices(
+                    user_ids, cum_weights=commenter_weights, k=event_count)
+                for user_id in users:
+                    yield EventCommentFactory.build(
+                        event_id=event_id, user_id=user_id,
+                        comment=rng.choice(comments),
+                        status=(EventComment.Status.EDITED
+                                if rng.random() < 0.05
+                                else EventComment.Status.DEFAULT))
+        return len(self.insert(EventComment, event_comments()))
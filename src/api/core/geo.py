@@ -0,0 +1,152 @@
+import json
+import math
+import re
+from functools import lru_cache, reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_LATITUDE_DEGREE = 111.2
+# Bits per axis of the stored geohash, 26 bits is about 0.3m at the equator
+GEOHASH_AXIS_BITS = 26
+
+
+class BaseGeocoder:
+    """Resolve a free text address to coordinates without network access"""
+
+    def geocode(self, address):
+        """Return (latitude, longitude) or None if the address is unknown"""
+        raise NotImplementedError
+
+
+class NullGeocoder(BaseGeocoder):
+    """Geocoder that never resolves any address"""
+
+    def geocode(self, address):
+        return None
+
+
+class GazetteerGeocoder(BaseGeocoder):
+    """Geocoder backed by a local JSON list of place names
+
+    Each entry has `names`, `latitude` and `longitude`. More specific
+    places come first in the file and the first match wins.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.GEOCODER_GAZETTEER
+        with open(self.path, encoding='utf-8') as f:
+            places = json.load(f)
+        self.places = [
+            (self._compile(place['names']),
+             (place['latitude'], place['longitude']))
+            for place in places
+        ]
+
+    @staticmethod
+    def _compile(names):
+        patterns = []
+        for name in names:
+            pattern = re.escape(name)
+            if name.isascii():
+                pattern = r'\b' + pattern + r'\b'
+            patterns.append(pattern)
+        return re.compile('|'.join(patterns), re.IGNORECASE)
+
+    def geocode(self, address):
+        for pattern, coordinates in self.places:
+            if pattern.search(address):
+                return coordinates
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_geocoder():
+    """Return the geocoder configured by EVENT_GEOCODER"""
+    return import_string(settings.EVENT_GEOCODER)()
+
+
+def encode_geohash(latitude, longitude):
+    """Return the interleaved integer geohash of a point"""
+    lat_index, lng_index = _axis_indexes(latitude, longitude)
+    return _interleave(lat_index, lng_index, GEOHASH_AXIS_BITS)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Return the great-circle distance between two points in km"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def geohash_ranges(latitude, longitude, radius_km):
+    """Return geohash [low, high) ranges of cells covering a circle
+
+    The level is chosen so that one cell is at least as large as the
+    radius, so the cell of the center and its 8 neighbours cover it.
+    """
+    lat_degrees = radius_km / KM_PER_LATITUDE_DEGREE
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    lng_degrees = min(lat_degrees / cos_lat, 360.0)
+
+    level = 0
+    while (level < GEOHASH_AXIS_BITS and
+           180.0 / 2 ** (level + 1) >= lat_degrees and
+           360.0 / 2 ** (level + 1) >= lng_degrees):
+        level += 1
+
+    shift = GEOHASH_AXIS_BITS - level
+    lat_index, lng_index = _axis_indexes(latitude, longitude)
+    lat_cell, lng_cell = lat_index >> shift, lng_index >> shift
+    cells = 2 ** level
+
+    prefixes = set()
+    for d_lat in (-1, 0, 1):
+        if not 0 <= lat_cell + d_lat < cells:
+            continue
+        for d_lng in (-1, 0, 1):
+            prefixes.add(_interleave(
+                lat_cell + d_lat, (lng_cell + d_lng) % cells, level))
+
+    return [(prefix << (2 * shift), (prefix + 1) << (2 * shift))
+            for prefix in sorted(prefixes)]
+
+
+def nearby_events(queryset, latitude, longitude, radius_km):
+    """Return events within the radius ordered by distance
+
+    Candidates are read through the geohash index only, then the exact
+    distance is checked. Each event gets a `distance` attribute in km.
+    """
+    cells = reduce(or_, (
+        Q(geohash__gte=low, geohash__lt=high)
+        for low, high in geohash_ranges(latitude, longitude, radius_km)
+    ))
+    events = []
+    for event in queryset.filter(cells).order_by():
+        event.distance = haversine_km(
+            latitude, longitude, event.latitude, event.longitude)
+        if event.distance <= radius_km:
+            events.append(event)
+    events.sort(key=lambda event: (event.distance, event.event_time))
+    return events
+
+
+def _axis_indexes(latitude, longitude):
+    cells = 2 ** GEOHASH_AXIS_BITS
+    lat_index = int((latitude + 90.0) / 180.0 * cells)
+    lng_index = int((longitude + 180.0) / 360.0 * cells)
+    return min(lat_index, cells - 1), min(lng_index, cells - 1)
+
+
+def _interleave(lat_index, lng_index, bits):
+    """Interleave axis indexes, longitude first as in geohash"""
+    code = 0
+    for bit in range(bits - 1, -1, -1):
+        code = (code << 1) | ((lng_index >> bit) & 1)
+        code = (code << 1) | ((lat_index >> bit) & 1)
+    return code
@@ -0,0 +1,100 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.metrics import record_cache
+
+IDEMPOTENCY_KEY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+IDEMPOTENCY_REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+# How long a request may run before its key can be used again
+IDEMPOTENCY_LOCK_SECONDS = 60
+
+
+def idempotency_cache_key(request, key):
+    """Return the cache key of an Idempotency-Key scoped to user and URL"""
+    scope = f'{request.user.pk}:{request.method}:{request.path}:{key}'
+    return 'idempotency:' + hashlib.sha256(scope.encode()).hexdigest()
+
+
+def request_fingerprint(request):
+    """Return a digest of the request data to detect a reused key"""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    payload = json.dumps(data, sort_keys=True, default=_describe_value)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _describe_value(value):
+    # Uploaded files are compared by name and size, not content
+    if hasattr(value, 'size'):
+        return [getattr(value, 'name', None), value.size]
+    return str(value)
+
+
+def idempotent(view_method):
+    """Replay the stored response of a view for a repeated Idempotency-Key
+
+    The first successful response is kept for IDEMPOTENCY_KEY_TTL
+    seconds, so a retried request returns it without running the view
+    again. Errors, returned or raised, free the key for a corrected
+    retry. Requests without the header run as usual.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_KEY_HEADER)
+        if key is None or not request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+
+        if not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            return Response(
+                {'detail': 'Idempotency-Key must be 1 to '
+                           f'{MAX_IDEMPOTENCY_KEY_LENGTH} characters.'},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        cache_key = idempotency_cache_key(request, key)
+        fingerprint = request_fingerprint(request)
+        pending = {'fingerprint': fingerprint, 'status': None}
+        if not cache.add(cache_key, pending, IDEMPOTENCY_LOCK_SECONDS):
+            record_cache('idempotency', True)
+            return _replay(cache.get(cache_key), fingerprint)
+        record_cache('idempotency', False)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        if response.status_code >= 400:
+            cache.delete(cache_key)
+        else:
+            cache.set(cache_key, {
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'data': response.data,
+            }, settings.IDEMPOTENCY_KEY_TTL)
+        return response
+
+    return wrapper
+
+
+def _replay(stored, fingerprint):
+    if stored is None or stored['status'] is None:
+        return Response(
+            {'detail': 'A request with this Idempotency-Key is in progress.'},
+            status=status.HTTP_409_CONFLICT)
+
+    if stored['fingerprint'] != fingerprint:
+        return Response(
+            {'detail': 'Idempotency-Key was used with a different request.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    return Response(stored['data'], status=stored['status'],
+                    headers={IDEMPOTENCY_REPLAYED_HEADER: 'true'})
@@ -0,0 +1,80 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+# Loads what a uWSGI worker loads before its first request, then prints
+# the wall time of the startup steps as JSON
+STARTUP_SCRIPT = '''
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls = time.perf_counter()
+print(json.dumps({
+    'setup_ms': (setup - started) * 1000,
+    'urls_ms': (urls - setup) * 1000,
+    'total_ms': (urls - started) * 1000,
+    'modules': sorted(sys.modules),
+}))
+'''
+
+_line_re = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(output):
+    """Return (module, self_us, cumulative_us, depth) of `-X importtime`"""
+    rows = []
+    for line in output.splitlines():
+        match = _line_re.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us),
+                         (len(indent) - 1) // 2))
+    return rows
+
+
+def module_owner(module, app_names):
+    """Return the installed app containing the module, else its package"""
+    for name in app_names:
+        if module == name or module.startswith(name + '.'):
+            return name
+    return module.split('.')[0]
+
+
+def group_by_owner(rows, app_names):
+    """Return own import time in ms per installed app or package
+
+    Longer app names are matched first, so `allauth.account` is not
+    counted under `allauth`.
+    """
+    app_names = sorted(app_names, key=len, reverse=True)
+    totals = defaultdict(float)
+    for module, self_us, _, _ in rows:
+        totals[module_owner(module, app_names)] += self_us / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def measure_startup(importtime=False):
+    """Start a fresh interpreter like a new worker and time its startup
+
+    Returns the timings of STARTUP_SCRIPT and, with `importtime`, the
+    parsed `-X importtime` rows. That option slows the imports down, so
+    timings are best taken without it.
+    """
+    command = [sys.executable, '-c', STARTUP_SCRIPT]
+    if importtime:
+        command[1:1] = ['-X', 'importtime']
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    process = subprocess.run(
+        command, cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    return (json.loads(process.stdout.splitlines()[-1]),
+            parse_importtime(process.stderr) if importtime else None)
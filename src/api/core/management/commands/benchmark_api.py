@@ -0,0 +1,93 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmark import build_cases, compare, run_benchmark, seed_dataset
+from core.generators import DATASETS
+from core.models import Event
+
+
+class Command(BaseCommand):
+    help = ('Time the hot API endpoints against a seeded benchmark '
+            'database. Uses the configured database engine, so set '
+            'DEBUG=False and DATABASE_URL to benchmark MySQL.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', choices=DATASETS, default='small')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--fresh', action='store_true',
+                            help='Recreate and reseed the benchmark database')
+        parser.add_argument('--runs', type=int, default=20,
+                            help='Warm runs per case')
+        parser.add_argument('--case', action='append', default=[],
+                            help='Only run the named case, can be repeated')
+        parser.add_argument('--output', help='Write the results as JSON')
+        parser.add_argument('--baseline',
+                            help='Fail on regressions against this JSON')
+        parser.add_argument('--save-baseline',
+                            help='Write the results as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed slowdown of the warm median')
+
+    def handle(self, *args, **options):
+        self.use_benchmark_database(options)
+        if not Event.objects.exists():
+            self.stdout.write(f'Seeding the {options["dataset"]} dataset')
+            counts = seed_dataset(DATASETS[options['dataset']],
+                                  options['seed'])
+            self.stdout.write(', '.join(
+                f'{count} {name}' for name, count in counts.items()))
+
+        cases = build_cases()
+        if options['case']:
+            cases = [case for case in cases if case.name in options['case']]
+            if not cases:
+                raise CommandError('No case matches ' +
+                                   ', '.join(options['case']))
+
+        results = run_benchmark(cases, options['runs'])
+        self.write_table(results)
+        for path in (options['output'], options['save_baseline']):
+            if path:
+                with open(path, 'w') as f:
+                    json.dump(results, f, indent=2)
+
+        failed = [name for name, result in results.items()
+                  if result['status'] != 200]
+        if failed:
+            raise CommandError('Non 200 responses: ' + ', '.join(failed))
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = compare(results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Regressions against the baseline:\n' +
+                    '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions'))
+
+    def use_benchmark_database(self, options):
+        """Switch to a database kept apart from the configured one
+
+        It is reused across runs so large datasets are only seeded once.
+        """
+        name = f'benchmark_{options["dataset"]}'
+        if connection.vendor == 'sqlite':
+            name += '.sqlite3'
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = name
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False,
+            keepdb=not options['fresh'])
+
+    def write_table(self, results):
+        self.stdout.write(
+            f'{"case":<20}{"status":>7}{"queries":>8}{"cold ms":>10}'
+            f'{"median ms":>11}{"p95 ms":>9}{"peak kb":>10}{"bytes":>10}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<20}{result["status"]:>7}{result["queries"]:>8}'
+                f'{result["cold_ms"]:>10}{result["warm_median_ms"]:>11}'
+                f'{result["warm_p95_ms"]:>9}{result["peak_kb"]:>10}'
+                f'{result["bytes"]:>10}')
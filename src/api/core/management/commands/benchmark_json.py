@@ -0,0 +1,134 @@
+import datetime
+import io
+import random
+import timeit
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer, orjson
+
+CODECS = (
+    ('json', JSONRenderer, JSONParser),
+    ('fast', FastJSONRenderer, FastJSONParser),
+)
+
+WORDS = ('浅草', '寺', 'tour', 'ramen', 'walk', 'サクラ', 'night', 'market',
+         '着物', 'tea', 'sumo', 'river', '祭り', 'temple', 'food')
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def brief_event(rng, pk):
+    return ReturnDict([
+        ('id', pk),
+        ('title', sentence(rng, 6)),
+        ('image', f'https://example.com/media/event/{pk}.jpg'),
+        ('event_time', '2021/03/%02d 19:00' % rng.randint(1, 31)),
+        ('address', sentence(rng, 4)),
+        ('participant_count', rng.randint(0, 300)),
+    ], serializer=None)
+
+
+def event_comment(rng, pk):
+    return ReturnDict([
+        ('id', pk),
+        ('event', 1),
+        ('user', rng.randint(1, 10000)),
+        ('first_name', sentence(rng, 1)),
+        ('icon', f'https://example.com/media/user/{pk}.jpg'),
+        ('comment', sentence(rng, rng.randint(5, 60))),
+        ('status', '0'),
+        ('brief_updated_at', '2021/03/01 12:%02d' % rng.randint(0, 59)),
+    ], serializer=None)
+
+
+def participant(rng, pk):
+    return ReturnDict([
+        ('user', pk),
+        ('first_name', sentence(rng, 1)),
+        ('icon', f'https://example.com/media/user/{pk}.jpg'),
+    ], serializer=None)
+
+
+def page(rows):
+    return OrderedDict([
+        ('count', 10000),
+        ('next', 'https://example.com/api/events/?page=3'),
+        ('previous', 'https://example.com/api/events/?page=1'),
+        ('results', ReturnList(rows, serializer=None)),
+    ])
+
+
+def build_payloads(seed):
+    """Return named payloads shaped like the API responses"""
+    rng = random.Random(seed)
+    start = datetime.date(2021, 1, 1)
+    return OrderedDict([
+        ('event list (30)', page(
+            [brief_event(rng, pk) for pk in range(30)])),
+        ('event list (500)', page(
+            [brief_event(rng, pk) for pk in range(500)])),
+        ('comment page (15)', page(
+            [event_comment(rng, pk) for pk in range(15)])),
+        ('participants (1000)', ReturnList(
+            [participant(rng, pk) for pk in range(1000)], serializer=None)),
+        ('event counts (366)', [
+            {'date': start + datetime.timedelta(days=day),
+             'count': rng.randint(0, 50)}
+            for day in range(366)
+        ]),
+    ])
+
+
+class Command(BaseCommand):
+    help = 'Compare the JSON renderers and parsers on API shaped payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=200,
+                            help='Calls per timing run')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timing runs, the best one is reported')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write(
+                'orjson is not installed, the fast codec falls back to json')
+
+        self.stdout.write(
+            f'{"payload":<22}{"codec":<6}{"render us":>12}'
+            f'{"parse us":>12}{"bytes":>10}')
+        for name, payload in build_payloads(options['seed']).items():
+            results = {}
+            for codec, renderer_class, parser_class in CODECS:
+                results[codec] = self.measure(
+                    renderer_class(), parser_class(), payload, options)
+                render_us, parse_us, content = results[codec]
+                self.stdout.write(
+                    f'{name:<22}{codec:<6}{render_us:>12.1f}'
+                    f'{parse_us:>12.1f}{len(content):>10}')
+
+            if results['json'][2] != results['fast'][2]:
+                raise CommandError(f'Rendered output differs for {name}')
+            self.stdout.write(self.style.SUCCESS(
+                f'{"":<22}{"x":<6}'
+                f'{results["json"][0] / results["fast"][0]:>12.1f}'
+                f'{results["json"][1] / results["fast"][1]:>12.1f}'))
+
+    def measure(self, renderer, parser, payload, options):
+        """Return best render and parse time per call in us and the output"""
+        number, repeat = options['number'], options['repeat']
+        content = renderer.render(payload)
+        render = min(timeit.repeat(
+            lambda: renderer.render(payload), number=number, repeat=repeat))
+        parse = min(timeit.repeat(
+            lambda: parser.parse(io.BytesIO(content)),
+            number=number, repeat=repeat))
+        return render / number * 1e6, parse / number * 1e6, content
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.schema import code_version, generate_schema, write_schema
+
+
+class Command(BaseCommand):
+    help = ('Generate the OpenAPI schema served by /api/schema/ for the '
+            'current code version, e.g. while building a release')
+
+    def handle(self, *args, **options):
+        version = code_version()
+        write_schema(version, generate_schema())
+        self.stdout.write(self.style.SUCCESS(
+            f'Built the schema of code version {version}'))
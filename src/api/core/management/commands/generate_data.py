@@ -0,0 +1,49 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.generators import BATCH_SIZE, DATASETS, DatasetGenerator
+
+
+def month(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f'Expected a YYYY-MM month, got {value}')
+
+
+class Command(BaseCommand):
+    help = ('Insert synthetic users, events, participants and comments in '
+            'bulk, e.g. to build benchmark or demo databases')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', choices=DATASETS, default='small',
+                            help='Preset row counts')
+        for name in ('users', 'events', 'participants', 'comments'):
+            parser.add_argument(f'--{name}', type=int,
+                                help=f'Number of {name}, overrides --dataset')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--start', type=month,
+                            help='First month of events as YYYY-MM, '
+                                 'defaults to January this year')
+        parser.add_argument('--months', type=int, default=12)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        sizes = {
+            name: count if options[name] is None else options[name]
+            for name, count in DATASETS[options['dataset']].items()
+        }
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        generator = DatasetGenerator(
+            seed=options['seed'], start=options['start'],
+            months=options['months'], batch_size=options['batch_size'],
+            log=log)
+
+        started = time.perf_counter()
+        counts = generator.generate(sizes)
+        self.stdout.write(self.style.SUCCESS(
+            'Generated ' +
+            ', '.join(f'{count} {name}' for name, count in counts.items()) +
+            f' in {time.perf_counter() - started:.1f}s'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Geocode event addresses with the configured local geocoder'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Geocode every event, not only events without coordinates')
+
+    def handle(self, *args, **options):
+        events = Event.objects.all()
+        if not options['all']:
+            events = events.filter(geohash__isnull=True)
+
+        located = 0
+        for event in events.iterator():
+            event.geocode()
+            event.save(update_fields=['latitude', 'longitude', 'geohash'])
+            located += event.geohash is not None
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Geocoded {located} events'))
@@ -0,0 +1,52 @@
+import statistics
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importtime import group_by_owner, measure_startup
+
+
+class Command(BaseCommand):
+    help = ('Time the startup of a fresh worker and report the import time '
+            'of each installed app and package')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3,
+                            help='Startups timed, the median is reported')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Apps or packages and modules listed')
+        parser.add_argument('--target-ms', type=float,
+                            default=settings.COLD_START_TARGET_MS,
+                            help='Fail when the median startup is slower')
+
+    def handle(self, *args, **options):
+        runs = [measure_startup()[0] for _ in range(options['runs'])]
+        _, rows = measure_startup(importtime=True)
+
+        self.stdout.write('Own import time by app or package '
+                          '(-X importtime)')
+        app_names = [config.name for config in apps.get_app_configs()]
+        for owner, ms in group_by_owner(rows, app_names)[:options['limit']]:
+            self.stdout.write(f'{ms:>9.1f}ms  {owner}')
+
+        self.stdout.write('\nSlowest modules, own time')
+        for module, self_us, cumulative_us, _ in sorted(
+                rows, key=lambda row: row[1],
+                reverse=True)[:options['limit']]:
+            self.stdout.write(f'{self_us / 1000:>9.1f}ms '
+                              f'{cumulative_us / 1000:>9.1f}ms cumulative  '
+                              f'{module}')
+
+        median = {key: statistics.median(run[key] for run in runs)
+                  for key in ('setup_ms', 'urls_ms', 'total_ms')}
+        self.stdout.write(
+            f'\nStartup over {len(runs)} runs: '
+            f'django.setup() {median["setup_ms"]:.0f}ms, '
+            f'URLconf {median["urls_ms"]:.0f}ms, '
+            f'total {median["total_ms"]:.0f}ms '
+            f'(target {options["target_ms"]:.0f}ms)')
+        if median['total_ms'] > options['target_ms']:
+            raise CommandError(
+                f'Startup takes {median["total_ms"]:.0f}ms, over the '
+                f'{options["target_ms"]:.0f}ms target')
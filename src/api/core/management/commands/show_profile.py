@@ -0,0 +1,54 @@
+import io
+import pstats
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import list_traces, load_trace, trace_path
+
+
+class Command(BaseCommand):
+    help = 'List stored request profiles or show one of them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('trace_id', nargs='?')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Traces listed or cProfile rows shown')
+        parser.add_argument('--sort', default='cumulative',
+                            help='pstats sort key of the cProfile rows')
+
+    def handle(self, *args, **options):
+        if options['trace_id'] is None:
+            self.list_traces(options['limit'])
+        else:
+            self.show_trace(options['trace_id'], options)
+
+    def list_traces(self, limit):
+        for trace_id in list_traces()[:limit]:
+            trace = load_trace(trace_id)
+            summary = trace['summary']
+            self.stdout.write(
+                f'{trace_id}  {trace["status"]} {trace["method"]} '
+                f'{trace["path"]}  {summary["total_ms"]}ms '
+                f'{summary["sql_count"]} queries')
+
+    def show_trace(self, trace_id, options):
+        try:
+            trace = load_trace(trace_id)
+        except FileNotFoundError:
+            raise CommandError(f'No trace {trace_id}')
+
+        self.stdout.write(f'{trace["method"]} {trace["path"]} '
+                          f'{trace["status"]}')
+        for name, value in trace['summary'].items():
+            self.stdout.write(f'  {name}: {value}')
+
+        self.stdout.write('\nSQL by statement')
+        for group in trace['sql']:
+            self.stdout.write(
+                f'{group["count"]:>5} {group["ms"]:>10.3f}ms  {group["sql"]}')
+
+        if trace['hotspots'] is not None:
+            output = io.StringIO()
+            stats = pstats.Stats(trace_path(trace_id, 'prof'), stream=output)
+            stats.sort_stats(options['sort']).print_stats(options['limit'])
+            self.stdout.write('\nProfile\n' + output.getvalue())
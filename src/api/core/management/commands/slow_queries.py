@@ -0,0 +1,45 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.slowlog import read_entries, summarize
+
+SORT_KEYS = {'total': 'total_ms', 'count': 'count', 'max': 'max_ms'}
+
+
+class Command(BaseCommand):
+    help = ('Summarize the slow query log by statement fingerprint, worst '
+            'offenders first')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=settings.SLOW_QUERY_LOG,
+                            help='Log file, rotated backups are included')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--sort', choices=SORT_KEYS, default='total')
+        parser.add_argument('--explain', action='store_true',
+                            help='Show the latest EXPLAIN of each statement')
+
+    def handle(self, *args, **options):
+        groups = summarize(read_entries(options['log']),
+                           SORT_KEYS[options['sort']])
+        if not groups:
+            self.stdout.write('No slow queries logged')
+            return
+
+        for group in groups[:options['limit']]:
+            views = ', '.join(
+                f'{view} ({count})' for view, count in sorted(
+                    group['views'].items(), key=lambda item: -item[1]))
+            self.stdout.write(
+                f'{group["count"]:>6} queries {group["total_ms"]:>12.1f}ms '
+                f'total {group["max_ms"]:>10.1f}ms max')
+            self.stdout.write(f'  {group["fingerprint"]}')
+            self.stdout.write(f'  views: {views}')
+            if options['explain'] and group['explain'] is not None:
+                explain = group['explain']
+                if not isinstance(explain, str):
+                    explain = '\n'.join(json.dumps(row) for row in explain)
+                for line in explain.splitlines():
+                    self.stdout.write(f'    {line}')
+            self.stdout.write('')
@@ -0,0 +1,357 @@
+import bisect
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import empty
+
+from core.pubsub import broker
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# name: (type, help, histogram buckets)
+METRICS = OrderedDict([
+    ('api_requests_total', (
+        'counter', 'API requests by view, method and status', None)),
+    ('api_request_duration_seconds', (
+        'histogram', 'API request latency by view', LATENCY_BUCKETS)),
+    ('api_request_queries', (
+        'histogram', 'Database queries per API request by view',
+        QUERY_BUCKETS)),
+    ('api_cache_requests_total', (
+        'counter', 'Cache lookups by cache and result', None)),
+    ('api_pubsub_subscriptions', (
+        'gauge', 'Open comment stream and channel subscriptions', None)),
+    ('api_pubsub_queued_messages', (
+        'gauge', 'Messages waiting in subscription queues', None)),
+])
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Counters and histograms of exited processes in METRICS_DIR
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = '.lock'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in sorted(labels.items()))
+    return '{' + pairs + '}'
+
+
+class Registry:
+    """Metric values of this process
+
+    Updates only touch memory under a lock. With METRICS_DIR set every
+    process also writes its values to `<pid>-<token>.json` there, at most
+    once per METRICS_FLUSH_SECONDS, and a scrape of any uWSGI worker
+    merges the files: counters and histograms are summed over all
+    processes that ever ran, gauges only over live ones.
+
+    Files of exited processes are folded into ARCHIVE_FILE by the scrape,
+    so they do not pile up. The random token keeps a process that reuses
+    a PID from overwriting the file of the one that exited.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.gauges = {}
+        self.gauge_callbacks = []
+        self.flushed_at = 0
+        self._file_pid = None
+        self._file_name = None
+
+    def inc(self, name, labels, value=1):
+        key = name + format_labels(labels)
+        with self._lock:
+            self.counters[key] += value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = name + format_labels(labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # Counts per bucket and +Inf, then the sum
+                histogram = self.histograms[key] = [0] * (len(buckets) + 2)
+            histogram[bisect.bisect_left(buckets, value)] += 1
+            histogram[-1] += value
+
+    def set_gauge(self, name, labels, value):
+        key = name + format_labels(labels)
+        with self._lock:
+            self.gauges[key] = value
+
+    def add_gauge_callback(self, callback):
+        """Register a function setting gauges just before they are read"""
+        self.gauge_callbacks.append(callback)
+
+    def snapshot(self):
+        for callback in self.gauge_callbacks:
+            callback(self)
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {key: list(value)
+                               for key, value in self.histograms.items()},
+                'gauges': dict(self.gauges),
+            }
+
+    def file_name(self):
+        """Return the file name of this process, new after a fork"""
+        pid = os.getpid()
+        if self._file_pid != pid:
+            self._file_pid = pid
+            self._file_name = f'{pid}-{uuid.uuid4().hex[:8]}.json'
+        return self._file_name
+
+    def flush(self, force=False):
+        """Write this process's values to METRICS_DIR if one is set"""
+        directory = settings.METRICS_DIR
+        now = time.monotonic()
+        if not directory or (
+                not force and
+                now - self.flushed_at < settings.METRICS_FLUSH_SECONDS):
+            return
+        self.flushed_at = now
+        os.makedirs(directory, exist_ok=True)
+        write_values(os.path.join(directory, self.file_name()),
+                     self.snapshot())
+
+    def collect(self):
+        """Return the values of every process merged"""
+        self.flush(force=True)
+        directory = settings.METRICS_DIR
+        if not directory:
+            return self.snapshot()
+
+        merged = {'counters': {}, 'histograms': {}, 'gauges': {}}
+        with locked(directory):
+            for path in archive_exited(directory):
+                values = read_values(path)
+                if values is not None:
+                    merge_values(merged, values, gauges=True)
+            archive = read_values(os.path.join(directory, ARCHIVE_FILE))
+            if archive is not None:
+                merge_values(merged, archive)
+        return merged
+
+
+def read_values(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_values(path, values):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(values, f)
+    os.replace(temporary, path)
+
+
+def merge_values(merged, values, gauges=False):
+    """Add the counters and histograms, and optionally gauges, of values"""
+    counters = merged['counters']
+    for key, value in values['counters'].items():
+        counters[key] = counters.get(key, 0) + value
+    for key, value in values['histograms'].items():
+        total = merged['histograms'].setdefault(key, [0] * len(value))
+        for index, count in enumerate(value):
+            total[index] += count
+    if gauges:
+        for key, value in values['gauges'].items():
+            merged['gauges'][key] = merged['gauges'].get(key, 0) + value
+
+
+@contextmanager
+def locked(directory):
+    """Hold an exclusive lock on METRICS_DIR across processes"""
+    with open(os.path.join(directory, LOCK_FILE), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def archive_exited(directory):
+    """Fold files of exited processes into ARCHIVE_FILE, return the others
+
+    Call with the directory locked. Of several files with one PID only
+    the newest can belong to a live process.
+    """
+    files = defaultdict(list)
+    for name in os.listdir(directory):
+        pid = name[:-5].partition('-')[0]
+        if not name.endswith('.json') or not pid.isdigit():
+            continue
+        path = os.path.join(directory, name)
+        try:
+            files[int(pid)].append((os.stat(path).st_mtime, path))
+        except OSError:
+            continue
+
+    live, exited = [], []
+    for pid, paths in files.items():
+        paths.sort()
+        if process_alive(pid):
+            live.append(paths.pop()[1])
+        exited.extend(path for _, path in paths)
+
+    if exited:
+        archive_path = os.path.join(directory, ARCHIVE_FILE)
+        archive = {'counters': {}, 'histograms': {}, 'gauges': {}}
+        for path in [archive_path] + exited:
+            values = read_values(path)
+            if values is not None:
+                merge_values(archive, values)
+        write_values(archive_path, archive)
+        for path in exited:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    return live
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def split_key(key):
+    name, brace, labels = key.partition('{')
+    return name, brace + labels
+
+
+def with_label(labels, name, value):
+    pair = f'{name}="{value}"'
+    if not labels:
+        return '{' + pair + '}'
+    return labels[:-1] + ',' + pair + '}'
+
+
+def render(values):
+    """Return merged values in the Prometheus text format"""
+    families = defaultdict(list)
+    for kind in ('counters', 'gauges'):
+        for key, value in values[kind].items():
+            families[split_key(key)[0]].append((key, value))
+    for key, value in values['histograms'].items():
+        families[split_key(key)[0]].append((key, value))
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key, value in sorted(families.get(name, ())):
+            if kind != 'histogram':
+                lines.append(f'{key} {format_value(value)}')
+                continue
+            labels = split_key(key)[1]
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket'
+                             f'{with_label(labels, "le", bound)} {cumulative}')
+            lines.append(f'{name}_sum{labels} {format_value(value[-1])}')
+            lines.append(f'{name}_count{labels} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def record_cache(cache_name, hit):
+    registry.inc('api_cache_requests_total',
+                 {'cache': cache_name, 'result': 'hit' if hit else 'miss'})
+
+
+def collect_pubsub(registry):
+    if broker._wrapped is empty:
+        subscriptions = queued = 0
+    else:
+        subscriptions, queued = broker.queue_depths()
+    registry.set_gauge('api_pubsub_subscriptions', {}, subscriptions)
+    registry.set_gauge('api_pubsub_queued_messages', {}, queued)
+
+
+registry.add_gauge_callback(collect_pubsub)
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMixin:
+    """Record request count, latency and queries per view action
+
+    Latency of a streaming response only covers building the response.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = super().dispatch(request, *args, **kwargs)
+        seconds = time.perf_counter() - started
+
+        action = getattr(self, 'action', None) or request.method.lower()
+        view = f'{type(self).__name__}.{action}'
+        registry.inc('api_requests_total', {
+            'view': view, 'method': request.method,
+            'status': response.status_code})
+        registry.observe('api_request_duration_seconds', {'view': view},
+                         seconds)
+        registry.observe('api_request_queries', {'view': view},
+                         counter.count)
+        registry.flush()
+        return response
+
+
+def metrics_view(request):
+    """Serve the metrics to a scraper holding METRICS_TOKEN
+
+    The endpoint does not exist while METRICS_TOKEN is empty.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if not constant_time_compare(authorization, f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(render(registry.collect()), content_type=CONTENT_TYPE)
@@ -0,0 +1,190 @@
+import re
+import zlib
+
+from django.conf import settings
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.messages.storage.base import BaseStorage
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Brotli quality for responses compressed per request, 11 is too slow
+BROTLI_QUALITY = 5
+# Streams are never buffered, so Server-Sent Events stay real time
+UNCOMPRESSED_CONTENT_TYPES = ('text/event-stream',)
+
+accept_encoding_re = re.compile(
+    r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def is_token_api_request(request):
+    """Return True if the request is API traffic authenticated by token"""
+    if not request.path_info.startswith(settings.API_PATH_PREFIX):
+        return False
+
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    return authorization.startswith('Token ')
+
+
+class NullMessageStorage(BaseStorage):
+    """Message storage that keeps nothing between requests"""
+
+    def _get(self, *args, **kwargs):
+        return [], True
+
+    def _store(self, messages, response, *args, **kwargs):
+        return []
+
+
+class TokenAPISessionMiddleware(SessionMiddleware):
+    """SessionMiddleware that does not load or save sessions for token API"""
+
+    def process_request(self, request):
+        if is_token_api_request(request):
+            # An empty store never hits the backend and keeps
+            # login/logout calls working without persisting anything.
+            request.session = self.SessionStore(None)
+            return
+        super().process_request(request)
+
+    def process_response(self, request, response):
+        if is_token_api_request(request):
+            return response
+        return super().process_response(request, response)
+
+
+class TokenAPIMessageMiddleware(MessageMiddleware):
+    """MessageMiddleware that does not store messages for token API"""
+
+    def process_request(self, request):
+        if is_token_api_request(request):
+            request._messages = NullMessageStorage(request)
+            return
+        super().process_request(request)
+
+    def process_response(self, request, response):
+        if is_token_api_request(request):
+            return response
+        return super().process_response(request, response)
+
+
+class TokenAPICsrfViewMiddleware(CsrfViewMiddleware):
+    """CsrfViewMiddleware that skips CSRF cookie handling for token API
+
+    Token authenticated requests never fall back to SessionAuthentication,
+    so there is no session for a forged request to ride on.
+    """
+
+    def process_request(self, request):
+        if is_token_api_request(request):
+            return
+        super().process_request(request)
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_token_api_request(request):
+            return None
+        return super().process_view(
+            request, callback, callback_args, callback_kwargs)
+
+    def process_response(self, request, response):
+        if is_token_api_request(request):
+            return response
+        return super().process_response(request, response)
+
+
+def negotiate_encoding(accept_encoding):
+    """Return 'br', 'gzip' or None for an Accept-Encoding header"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        match = accept_encoding_re.match(part)
+        if not match:
+            continue
+        coding, quality = match.groups()
+        try:
+            accepted[coding.lower()] = float(quality or 1)
+        except ValueError:
+            continue
+
+    for coding in ('br', 'gzip'):
+        if coding == 'br' and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+def compress_content(coding, content):
+    if coding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return compress_string(content)
+
+
+def compress_stream(coding, chunks):
+    """Compress chunks and flush each one so the client gets it at once"""
+    if coding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress API responses with brotli or gzip as the client accepts
+
+    Works like GZipMiddleware for paths under API_PATH_PREFIX, prefers
+    brotli when the package is installed and leaves responses shorter
+    than COMPRESSION_MIN_LENGTH alone.
+    """
+
+    def process_response(self, request, response):
+        if (not request.path_info.startswith(settings.API_PATH_PREFIX) or
+                response.has_header('Content-Encoding')):
+            return response
+
+        content_type = response.get('Content-Type', '')
+        if content_type.startswith(UNCOMPRESSED_CONTENT_TYPES):
+            return response
+
+        if not response.streaming and (
+                len(response.content) < settings.COMPRESSION_MIN_LENGTH):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = negotiate_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                coding, response.streaming_content)
+            del response['Content-Length']
+        else:
+            compressed = compress_content(coding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+        return response
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from core.search import create_event_search_index, drop_event_search_index
+
+
+def create_search_index(apps, schema_editor):
+    create_event_search_index(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    drop_event_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_eventcomment_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
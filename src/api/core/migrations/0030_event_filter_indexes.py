@@ -0,0 +1,21 @@
+# Generated by Django 3.0.8 on 2026-10-19 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_event_geohash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['event_time', 'status', 'is_active'], name='t_event_event_t_a39e2f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['fee'], name='t_event_fee_1e0f86_idx'),
+        ),
+    ]
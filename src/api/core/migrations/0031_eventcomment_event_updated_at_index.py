@@ -0,0 +1,17 @@
+# Generated by Django 3.0.8 on 2026-10-19 00:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_event_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventcomment',
+            index=models.Index(fields=['event', 'updated_at'], name='t_event_com_event_i_c908a0_idx'),
+        ),
+    ]
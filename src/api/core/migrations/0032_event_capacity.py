@@ -0,0 +1,40 @@
+# Generated by Django 3.0.8 on 2026-10-19 00:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_participants(apps, schema_editor):
+    Event = apps.get_model('core', 'Event')
+    Participant = apps.get_model('core', 'Participant')
+    joined = Participant.objects.filter(
+        event=OuterRef('pk'), status='1', is_active=True
+    ).order_by().values('event').annotate(count=Count('id')).values('count')
+    Event.objects.update(participant_count=Coalesce(Subquery(joined), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_eventcomment_event_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='participant_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='participant',
+            name='status',
+            field=models.CharField(choices=[('0', 'Cancel'), ('1', 'Join'), ('2', 'Waiting')], default='1', max_length=10),
+        ),
+        migrations.RunPython(count_participants, migrations.RunPython.noop),
+    ]
@@ -11,6 +11,8 @@ from django.utils import timezone
 from django.utils.timezone import localtime
 from django.utils.translation import gettext_lazy as _
 
+from core.geo import encode_geohash, get_geocoder
+
 
 def user_icon_file_path(instance, filename):
     """Generate file path for new user icon"""
@@ -143,6 +145,10 @@ class Event(BaseModel):
     class Meta:
         db_table = 't_event'
         ordering = ['event_time']
+        indexes = [
+            models.Index(fields=['event_time', 'status', 'is_active']),
+            models.Index(fields=['fee']),
+        ]
 
     class Status(models.TextChoices):
         PRIVATE = '0', 'Private'
@@ -176,12 +182,55 @@ class Event(BaseModel):
         default=Status.PRIVATE
     )
     is_active = models.BooleanField(default=True)
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    participant_count = models.IntegerField(default=0, editable=False)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.BigIntegerField(null=True, blank=True, db_index=True)
 
     DEFAULT_IMAGE_PATH = "/images/no_event_image.png"
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._geocoded_address = instance.__dict__.get('address')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Geocode the address when it has changed
+
+        participant_count is only written by core.admission, so updates
+        never overwrite it with the value read before the save.
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding:
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and
+                field.name != 'participant_count'
+            ]
+            kwargs['update_fields'] = update_fields
+        if (self.address != getattr(self, '_geocoded_address', None) and
+                (update_fields is None or 'address' in update_fields)):
+            self.geocode()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {
+                    'latitude', 'longitude', 'geohash'}
+        super().save(*args, **kwargs)
+
+    def geocode(self):
+        """Set coordinates and geohash from the address"""
+        coordinates = get_geocoder().geocode(self.address or '')
+        if coordinates is None:
+            self.latitude = self.longitude = self.geohash = None
+        else:
+            self.latitude, self.longitude = coordinates
+            self.geohash = encode_geohash(*coordinates)
+        self._geocoded_address = self.address
+
     @property
     def image_url(self):
         if self.image:
@@ -199,6 +248,11 @@ class Event(BaseModel):
         """Return the update time except millisecond"""
         return localtime(self.updated_at).strftime('%Y-%m-%d %H:%M:%S')
 
+    @property
+    def has_space(self):
+        """Return True if a new participant can join right away"""
+        return self.capacity is None or self.participant_count < self.capacity
+
     def is_valid_comment(self):
         """Return private status or other"""
         return bool(self.is_active and self.status != self.Status.PRIVATE)
@@ -209,6 +263,9 @@ class EventComment(BaseModel):
     class Meta:
         db_table = 't_event_comment'
         ordering = ['updated_at']
+        indexes = [
+            models.Index(fields=['event', 'updated_at']),
+        ]
 
     class Status(models.TextChoices):
         DEFAULT = '0', 'Default'
@@ -259,6 +316,7 @@ class Participant(BaseModel):
     class Status(models.TextChoices):
         CANCEL = '0', 'Cancel'
         JOIN = '1', 'Join'
+        WAITING = '2', 'Waiting'
 
     event = models.ForeignKey(
         Event,
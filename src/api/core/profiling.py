@@ -0,0 +1,242 @@
+import cProfile
+import datetime
+import json
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.crypto import constant_time_compare
+
+HOTSPOT_COUNT = 20
+SQL_GROUP_COUNT = 20
+
+_string_re = re.compile(r"'(?:[^']|'')*'")
+_number_re = re.compile(r'\b\d+(?:\.\d+)?\b')
+_in_list_re = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_space_re = re.compile(r'\s+')
+
+
+def fingerprint_sql(sql):
+    """Return the statement with literals and IN lists collapsed
+
+    Statements differing only in their values map to one fingerprint.
+    """
+    sql = _string_re.sub('?', sql)
+    sql = _number_re.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _in_list_re.sub('IN (...)', sql)
+    return _space_re.sub(' ', sql).strip()
+
+
+def is_serializer_code(filename):
+    return (filename.endswith('serializers.py') or
+            filename.endswith(os.path.join('rest_framework', 'fields.py')) or
+            filename.endswith(os.path.join('rest_framework', 'relations.py')))
+
+
+def serializer_seconds(stats):
+    """Return the time spent in serializers from pstats data
+
+    Only calls entering serializer code from outside it are summed, so
+    nested fields are not counted twice.
+    """
+    seconds = 0
+    for (filename, _, _), (_, _, _, _, callers) in stats.stats.items():
+        if not is_serializer_code(filename):
+            continue
+        for (caller_file, _, _), caller_stats in callers.items():
+            if not is_serializer_code(caller_file):
+                seconds += caller_stats[3]
+    return seconds
+
+
+def hotspots(stats, count=HOTSPOT_COUNT):
+    """Return the functions with the most own time"""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2],
+                  reverse=True)
+    return [
+        OrderedDict([
+            ('function', f'{filename}:{line}({name})'),
+            ('calls', calls),
+            ('own_ms', round(own * 1000, 3)),
+            ('cumulative_ms', round(cumulative * 1000, 3)),
+        ])
+        for (filename, line, name), (_, calls, own, cumulative, _)
+        in rows[:count]
+    ]
+
+
+class RequestProfile:
+    """Record the SQL, serializer time and hotspots of one request"""
+
+    def __init__(self, use_cprofile=True):
+        self.queries = []
+        self.profiler = cProfile.Profile() if use_cprofile else None
+
+    def __enter__(self):
+        self.stack = ExitStack()
+        for connection in connections.all():
+            self.stack.enter_context(
+                connection.execute_wrapper(self.record_query))
+        self.started = time.perf_counter()
+        if self.profiler:
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another profiler is running in this thread
+                self.profiler = None
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.profiler:
+            self.profiler.disable()
+        self.seconds = time.perf_counter() - self.started
+        self.stack.close()
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    def sql_groups(self):
+        """Return query count and time per fingerprint, slowest first"""
+        groups = {}
+        for sql, seconds in self.queries:
+            group = groups.setdefault(fingerprint_sql(sql), [0, 0])
+            group[0] += 1
+            group[1] += seconds
+        return [
+            OrderedDict([('sql', sql), ('count', count),
+                         ('ms', round(seconds * 1000, 3))])
+            for sql, (count, seconds) in sorted(
+                groups.items(), key=lambda item: item[1][1], reverse=True)
+        ][:SQL_GROUP_COUNT]
+
+    def stats(self):
+        if self.profiler is None:
+            return None
+        if not hasattr(self, '_stats'):
+            self._stats = pstats.Stats(self.profiler)
+        return self._stats
+
+    def summary(self):
+        stats = self.stats()
+        sql_seconds = sum(seconds for _, seconds in self.queries)
+        return OrderedDict([
+            ('total_ms', round(self.seconds * 1000, 3)),
+            ('sql_count', len(self.queries)),
+            ('sql_ms', round(sql_seconds * 1000, 3)),
+            ('serializer_ms', None if stats is None else
+             round(serializer_seconds(stats) * 1000, 3)),
+        ])
+
+    def server_timing(self):
+        """Return a Server-Timing header value of the summary"""
+        summary = self.summary()
+        metrics = [
+            f'total;dur={summary["total_ms"]}',
+            f'sql;dur={summary["sql_ms"]};desc="{summary["sql_count"]} '
+            f'queries"',
+        ]
+        if summary['serializer_ms'] is not None:
+            metrics.append(f'serializer;dur={summary["serializer_ms"]}')
+        return ', '.join(metrics)
+
+    def trace(self, request, response):
+        """Return the stored form of the profile"""
+        stats = self.stats()
+        return OrderedDict([
+            ('method', request.method),
+            ('path', request.get_full_path()),
+            ('status', response.status_code),
+            ('created_at', time.time()),
+            ('summary', self.summary()),
+            ('sql', self.sql_groups()),
+            ('hotspots', None if stats is None else hotspots(stats)),
+        ])
+
+
+def should_profile(request):
+    """Return True if the request asks for profiling or is sampled"""
+    key = settings.PROFILING_KEY
+    header = request.META.get('HTTP_X_PROFILE')
+    if key and header and constant_time_compare(header, key):
+        return True
+    rate = settings.PROFILING_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def trace_path(trace_id, extension='json'):
+    return os.path.join(settings.PROFILING_TRACE_DIR,
+                        f'{trace_id}.{extension}')
+
+
+def save_trace(profile, request, response):
+    """Write the trace and cProfile data, return the trace id
+
+    Only the newest PROFILING_MAX_TRACES traces are kept.
+    """
+    os.makedirs(settings.PROFILING_TRACE_DIR, exist_ok=True)
+    # Ids sort by creation time, the suffix keeps processes apart
+    trace_id = (datetime.datetime.now().strftime('%Y%m%dT%H%M%S%f-') +
+                uuid.uuid4().hex[:8])
+    with open(trace_path(trace_id), 'w') as f:
+        json.dump(profile.trace(request, response), f, indent=2)
+    if profile.profiler is not None:
+        profile.profiler.dump_stats(trace_path(trace_id, 'prof'))
+
+    for old_id in list_traces()[settings.PROFILING_MAX_TRACES:]:
+        for extension in ('json', 'prof'):
+            try:
+                os.remove(trace_path(old_id, extension))
+            except FileNotFoundError:
+                pass
+    return trace_id
+
+
+def list_traces():
+    """Return stored trace ids, newest first"""
+    try:
+        names = os.listdir(settings.PROFILING_TRACE_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted((name[:-5] for name in names if name.endswith('.json')),
+                  reverse=True)
+
+
+def load_trace(trace_id):
+    with open(trace_path(trace_id)) as f:
+        return json.load(f)
+
+
+class ProfilingMiddleware:
+    """Profile requests sent with the X-Profile key or sampled
+
+    Adds a Server-Timing summary and an X-Profile-Trace id to the
+    response and stores the trace under PROFILING_TRACE_DIR. The body of
+    a streaming response is produced later and is not included. Requests
+    that are not profiled only pay for a header lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+
+        with RequestProfile(settings.PROFILING_CPROFILE) as profile:
+            response = self.get_response(request)
+        trace_id = save_trace(profile, request, response)
+        response['Server-Timing'] = profile.server_timing()
+        response['X-Profile-Trace'] = trace_id
+        return response
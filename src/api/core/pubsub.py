@@ -0,0 +1,145 @@
+import asyncio
+import queue
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """Queue of messages published to one topic"""
+
+    def __init__(self, broker, topic, maxsize):
+        self.broker = broker
+        self.topic = topic
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # A slow consumer must reconnect and resume from its cursor
+            self.overflowed = True
+
+    def get(self, timeout=None):
+        """Return the next message or None if none arrived in time"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """Subscription read from an asyncio event loop
+
+    Idle subscribers cost one pending queue read, so a loop can hold
+    thousands of them.
+    """
+
+    def __init__(self, broker, topic, maxsize, loop):
+        self.broker = broker
+        self.topic = topic
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Broker:
+    """In-process publish/subscribe without an outside broker
+
+    Messages only reach subscribers of the same process.
+    """
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, topic):
+        subscription = Subscription(self, topic, self.maxsize)
+        self._add(subscription)
+        return subscription
+
+    def subscribe_async(self, topic):
+        """Subscribe from a coroutine running in an event loop"""
+        subscription = AsyncSubscription(
+            self, topic, self.maxsize, asyncio.get_running_loop())
+        self._add(subscription)
+        return subscription
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscriptions[subscription.topic].add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.topic)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.topic]
+
+    def publish(self, topic, message):
+        """Send a message to every subscriber and return how many got it"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(topic, ()))
+
+        # One callback per event loop fans out to all its subscribers
+        loops = defaultdict(list)
+        for subscription in subscriptions:
+            if isinstance(subscription, AsyncSubscription):
+                loops[subscription.loop].append(subscription)
+            else:
+                subscription.put(message)
+        for loop, loop_subscriptions in loops.items():
+            try:
+                loop.call_soon_threadsafe(
+                    _deliver, loop_subscriptions, message)
+            except RuntimeError:
+                # The loop has been closed without unsubscribing
+                pass
+        return len(subscriptions)
+
+    def subscriber_count(self, topic):
+        with self._lock:
+            return len(self._subscriptions.get(topic, ()))
+
+    def queue_depths(self):
+        """Return the number of subscriptions and of queued messages"""
+        with self._lock:
+            subscriptions = [subscription
+                             for topic in self._subscriptions.values()
+                             for subscription in topic]
+        return (len(subscriptions),
+                sum(subscription.queue.qsize()
+                    for subscription in subscriptions))
+
+
+def _deliver(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.put(message)
+
+
+broker = SimpleLazyObject(lambda: import_string(settings.PUBSUB_BACKEND)())
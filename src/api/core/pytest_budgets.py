@@ -0,0 +1,66 @@
+"""pytest plugin for request budgets
+
+Adds a `budget(queries=None, ms=None)` marker for pytest style tests,
+`--latency-budgets` (or LATENCY_BUDGETS=1) to also fail on the latency
+budgets, `--latency-budget-scale` to relax them on slow machines and
+`--budget-report` to list the heaviest request of every test, which
+helps when choosing budgets. TestCase methods use core.budgets.budget.
+"""
+import os
+
+import pytest
+
+from core import budgets
+
+REPORT_SIZE = 30
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('budgets')
+    group.addoption('--latency-budgets', action='store_true',
+                    default=bool(os.environ.get('LATENCY_BUDGETS')),
+                    help='Fail requests over their latency budget')
+    group.addoption('--latency-budget-scale', type=float, default=1.0,
+                    help='Multiply every latency budget')
+    group.addoption('--budget-report', action='store_true',
+                    help='Report the queries and time of each test request')
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers', 'budget(queries=None, ms=None): fail when a request of '
+                   'the test goes over the query count or latency')
+    budgets.enforce_latency = config.getoption('latency_budgets')
+    budgets.latency_scale = config.getoption('latency_budget_scale')
+    config.budget_report = []
+
+
+@pytest.fixture(autouse=True)
+def request_budget(request):
+    marker = request.node.get_closest_marker('budget')
+    report = request.config.getoption('budget_report')
+    if marker is None and not report:
+        yield
+        return
+
+    kwargs = marker.kwargs if marker else {}
+    recorder = budgets.RequestBudget(**kwargs)
+    with recorder:
+        yield
+    if report and recorder.requests:
+        heaviest = max(recorder.requests,
+                       key=lambda record: len(record.queries))
+        request.config.budget_report.append((
+            len(heaviest.queries),
+            max(record.ms for record in recorder.requests),
+            request.node.nodeid))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not config.getoption('budget_report'):
+        return
+    terminalreporter.section('request budgets')
+    for queries, ms, nodeid in sorted(config.budget_report,
+                                      reverse=True)[:REPORT_SIZE]:
+        terminalreporter.write_line(f'{queries:>4} queries {ms:>8.1f}ms  '
+                                    f'{nodeid}')
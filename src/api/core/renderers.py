@@ -0,0 +1,106 @@
+import math
+import re
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Datetimes go through JSONEncoder so the output keeps DRF's format
+    ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS |
+                      orjson.OPT_PASSTHROUGH_DATETIME)
+
+# A float written with an exponent, or the same text inside a string.
+# Starting with the literal `e` lets the regex engine skip ahead fast.
+EXPONENT_RE = re.compile(rb'e(?<=\de)[-\d]')
+
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+
+def has_non_finite_floats(data):
+    """Return whether data holds NaN or infinity"""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+def encode_json(data, default=JSONEncoder().default):
+    """Return compact UTF-8 JSON of data, or None if orjson cannot encode it
+
+    Types orjson does not know, such as Decimal and lazy strings, are
+    converted by DRF's JSONEncoder.
+    """
+    if orjson is None:
+        return None
+    try:
+        content = orjson.dumps(data, default=default, option=ORJSON_OPTIONS)
+    except TypeError:
+        # Integers over 64 bits and other edge cases
+        return None
+
+    # orjson writes exponents as 1e16 instead of 1e+16, and NaN and
+    # infinity as null where strict JSONRenderer raises
+    if EXPONENT_RE.search(content) or (
+            b'null' in content and has_non_finite_floats(data)):
+        return None
+
+    # Same escaping as JSONRenderer, keeps the output a JS subset
+    if LINE_SEPARATOR in content or PARAGRAPH_SEPARATOR in content:
+        content = content.replace(LINE_SEPARATOR, b'\\u2028')
+        content = content.replace(PARAGRAPH_SEPARATOR, b'\\u2029')
+    return content
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when it is installed
+
+    Falls back to JSONRenderer for indented or ASCII-only output and
+    for data orjson rejects or writes differently, such as NaN or floats
+    with exponents, so the bytes are the same either way.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if self.uses_fast_path(accepted_media_type, renderer_context):
+            content = encode_json(data)
+            if content is not None:
+                return content
+        return super().render(data, accepted_media_type, renderer_context)
+
+    def uses_fast_path(self, accepted_media_type, renderer_context):
+        return (orjson is not None and self.compact and
+                not self.ensure_ascii and
+                self.get_indent(accepted_media_type,
+                                renderer_context or {}) is None)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Renderer accepting `text/event-stream` for Server-Sent Events
+
+    Streams are sent by the view itself. Only responses that end the
+    request early, such as errors, are rendered, as one `error` event.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (b'event: error\ndata: ' +
+                FastJSONRenderer().render(data) + b'\n\n')
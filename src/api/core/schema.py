@@ -0,0 +1,158 @@
+import hashlib
+import os
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_safe
+
+SCHEMA_FORMATS = {
+    'yaml': 'application/vnd.oai.openapi',
+    'json': 'application/vnd.oai.openapi+json',
+}
+SKIPPED_DIRECTORIES = ('tests', 'migrations', 'media', '__pycache__')
+
+_schemas = {}
+_schema_lock = threading.Lock()
+
+
+def lazy_view(dotted_path, **initkwargs):
+    """Return a view importing its class-based view on the first request
+
+    Keeps rarely used views with heavy imports, such as the drf_spectacular
+    schema views, out of worker startup.
+    """
+    view = None
+
+    @csrf_exempt
+    def load_and_dispatch(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(dotted_path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+    return load_and_dispatch
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    """Return CODE_VERSION, else a hash of the project's Python sources"""
+    if settings.CODE_VERSION:
+        return settings.CODE_VERSION
+
+    digest = hashlib.sha1()
+    for root, directories, files in os.walk(settings.BASE_DIR):
+        directories[:] = sorted(
+            directory for directory in directories
+            if directory not in SKIPPED_DIRECTORIES and
+            not directory.startswith('.'))
+        for name in sorted(files):
+            if name.endswith('.py'):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, settings.BASE_DIR)
+                              .encode())
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def schema_path(version, schema_format):
+    return os.path.join(settings.SCHEMA_CACHE_DIR,
+                        f'{version}.{schema_format}')
+
+
+def generate_schema():
+    """Return the schema of the current code in every format"""
+    from drf_spectacular.generators import SchemaGenerator
+    from drf_spectacular.renderers import (
+        OpenApiJsonRenderer, OpenApiYamlRenderer
+    )
+    from drf_spectacular.settings import spectacular_settings
+
+    schema = SchemaGenerator().get_schema(
+        request=None, public=spectacular_settings.SERVE_PUBLIC)
+    return {
+        'yaml': OpenApiYamlRenderer().render(schema),
+        'json': OpenApiJsonRenderer().render(
+            schema, renderer_context={'indent': 4}),
+    }
+
+
+def write_schema(version, schemas):
+    """Store the schemas of a version and remove those of older ones"""
+    os.makedirs(settings.SCHEMA_CACHE_DIR, exist_ok=True)
+    for name in os.listdir(settings.SCHEMA_CACHE_DIR):
+        if not name.startswith(f'{version}.'):
+            try:
+                os.remove(os.path.join(settings.SCHEMA_CACHE_DIR, name))
+            except FileNotFoundError:
+                pass
+    for schema_format, content in schemas.items():
+        path = schema_path(version, schema_format)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(content)
+        os.replace(temporary, path)
+
+
+def read_schema(version):
+    try:
+        schemas = {}
+        for schema_format in SCHEMA_FORMATS:
+            with open(schema_path(version, schema_format), 'rb') as f:
+                schemas[schema_format] = f.read()
+        return schemas
+    except FileNotFoundError:
+        return None
+
+
+def get_schema(version):
+    """Return the schema of a code version from memory, disk or generated
+
+    Generated schemas are written to SCHEMA_CACHE_DIR, so each version is
+    generated once, at build time by the build_schema command or else by
+    the first request.
+    """
+    schemas = _schemas.get(version)
+    if schemas is None:
+        with _schema_lock:
+            schemas = _schemas.get(version)
+            if schemas is None:
+                schemas = read_schema(version)
+                if schemas is None:
+                    schemas = generate_schema()
+                    write_schema(version, schemas)
+                _schemas.clear()
+                _schemas[version] = schemas
+    return schemas
+
+
+def requested_format(request):
+    schema_format = request.GET.get('format')
+    if schema_format in SCHEMA_FORMATS:
+        return schema_format
+    if 'json' in request.META.get('HTTP_ACCEPT', ''):
+        return 'json'
+    return 'yaml'
+
+
+def schema_etag(request):
+    return f'{code_version()}-{requested_format(request)}'
+
+
+@require_safe
+@condition(etag_func=schema_etag)
+def schema_view(request):
+    """Serve the OpenAPI schema of the running code
+
+    Clients revalidate with the ETag, which changes with the code version.
+    """
+    schema_format = requested_format(request)
+    response = HttpResponse(get_schema(code_version())[schema_format],
+                            content_type=SCHEMA_FORMATS[schema_format])
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ['Accept'])
+    return response
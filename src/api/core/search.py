@@ -0,0 +1,202 @@
+import sqlite3
+
+from django.db import connection
+from django.db.models import Q
+
+EVENT_TABLE = 't_event'
+EVENT_FTS_TABLE = 't_event_fts'
+EVENT_SEARCH_COLUMNS = ('title', 'description', 'address')
+EVENT_FULLTEXT_INDEX = 't_event_fulltext'
+# bm25 weights for title, description and address
+SQLITE_BM25_WEIGHTS = (10.0, 1.0, 2.0)
+# Shortest terms the trigram tokenizer and MySQL's ngram parser (the
+# default ngram_token_size) match, shorter ones use LIKE
+SQLITE_TRIGRAM_LENGTH = 3
+MYSQL_NGRAM_TOKEN_SIZE = 2
+
+_columns = ', '.join(EVENT_SEARCH_COLUMNS)
+_new_columns = ', '.join('new.' + column for column in EVENT_SEARCH_COLUMNS)
+_old_columns = ', '.join('old.' + column for column in EVENT_SEARCH_COLUMNS)
+_MYSQL_MATCH = f'MATCH ({_columns}) AGAINST (%s IN BOOLEAN MODE)'
+
+SQLITE_TRIGGERS = {
+    't_event_fts_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS t_event_fts_ai
+        AFTER INSERT ON {EVENT_TABLE} BEGIN
+            INSERT INTO {EVENT_FTS_TABLE}(rowid, {_columns})
+            VALUES (new.id, {_new_columns});
+        END
+    """,
+    't_event_fts_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS t_event_fts_ad
+        AFTER DELETE ON {EVENT_TABLE} BEGIN
+            INSERT INTO {EVENT_FTS_TABLE}({EVENT_FTS_TABLE}, rowid, {_columns})
+            VALUES ('delete', old.id, {_old_columns});
+        END
+    """,
+    't_event_fts_au': f"""
+        CREATE TRIGGER IF NOT EXISTS t_event_fts_au
+        AFTER UPDATE ON {EVENT_TABLE} BEGIN
+            INSERT INTO {EVENT_FTS_TABLE}({EVENT_FTS_TABLE}, rowid, {_columns})
+            VALUES ('delete', old.id, {_old_columns});
+            INSERT INTO {EVENT_FTS_TABLE}(rowid, {_columns})
+            VALUES (new.id, {_new_columns});
+        END
+    """,
+}
+
+
+def sqlite_tokenizer():
+    """Return the FTS5 tokenizer, trigram matches CJK text like ngram"""
+    if sqlite3.sqlite_version_info >= (3, 34, 0):
+        return 'trigram'
+    return 'unicode61'
+
+
+def create_event_search_index(schema_editor):
+    """Create the full-text index of events for the current database"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            f'ALTER TABLE {EVENT_TABLE} ADD FULLTEXT INDEX '
+            f'{EVENT_FULLTEXT_INDEX} ({_columns}) WITH PARSER ngram'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {EVENT_FTS_TABLE} '
+            f"USING fts5({_columns}, content='{EVENT_TABLE}', "
+            f"content_rowid='id', tokenize='{sqlite_tokenizer()}')"
+        )
+        ensure_sqlite_triggers(schema_editor.connection)
+
+
+def drop_event_search_index(schema_editor):
+    """Drop the full-text index of events"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            f'ALTER TABLE {EVENT_TABLE} DROP INDEX {EVENT_FULLTEXT_INDEX}')
+    elif vendor == 'sqlite':
+        for name in SQLITE_TRIGGERS:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {EVENT_FTS_TABLE}')
+
+
+def ensure_sqlite_triggers(db_connection):
+    """Install missing sync triggers and rebuild the index if any were missing
+
+    SQLite drops triggers when a migration remakes t_event, so this runs
+    after every migrate as well.
+    """
+    with db_connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name = %s", [EVENT_FTS_TABLE])
+        if cursor.fetchone() is None:
+            return
+
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = %s", [EVENT_TABLE])
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(SQLITE_TRIGGERS[name])
+        if missing:
+            cursor.execute(
+                f"INSERT INTO {EVENT_FTS_TABLE}({EVENT_FTS_TABLE}) "
+                "VALUES ('rebuild')")
+
+
+def _sqlite_match_expression(terms):
+    """Quote every term so user input never reaches the FTS5 syntax"""
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _mysql_match_expression(terms):
+    """Require every term as a phrase, user input never reaches the syntax
+
+    Boolean mode has no escape for a quote inside a phrase, so quotes are
+    dropped.
+    """
+    return ' '.join('+"' + term.replace('"', '') + '"' for term in terms)
+
+
+def _split_terms(query):
+    """Return the terms the full-text index can match and the shorter ones
+
+    Every term must match, on each database. Without an index all terms
+    are short.
+    """
+    vendor = connection.vendor
+    if vendor == 'mysql':
+        min_length = MYSQL_NGRAM_TOKEN_SIZE
+    elif vendor == 'sqlite':
+        min_length = (SQLITE_TRIGRAM_LENGTH
+                      if sqlite_tokenizer() == 'trigram' else 1)
+    else:
+        return [], query.split()
+
+    terms, short_terms = [], []
+    for term in query.split():
+        if len(term.replace('"', '')) >= min_length:
+            terms.append(term)
+        else:
+            short_terms.append(term)
+    return terms, short_terms
+
+
+def _contains_terms(queryset, terms):
+    """Filter events containing every term in one of the search columns
+
+    A LIKE scan of the table, the fallback where the index cannot match.
+    """
+    for term in terms:
+        condition = Q()
+        for column in EVENT_SEARCH_COLUMNS:
+            condition |= Q(**{f'{column}__icontains': term})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def match_events(queryset, query):
+    """Filter an event queryset by full-text query, keeping its order"""
+    terms, short_terms = _split_terms(query)
+    queryset = _contains_terms(queryset, short_terms)
+    if not terms:
+        return queryset
+
+    if connection.vendor == 'sqlite':
+        return queryset.extra(
+            tables=[EVENT_FTS_TABLE],
+            where=[
+                f'{EVENT_FTS_TABLE}.rowid = {EVENT_TABLE}.id',
+                f'{EVENT_FTS_TABLE} MATCH %s',
+            ],
+            params=[_sqlite_match_expression(terms)],
+        )
+    return queryset.extra(
+        where=[_MYSQL_MATCH], params=[_mysql_match_expression(terms)])
+
+
+def search_events(queryset, query):
+    """Filter an event queryset by full-text query, best match first
+
+    Without an index to rank by, e.g. for a query of short terms only,
+    matches come in event time order.
+    """
+    terms = _split_terms(query)[0]
+    if not terms:
+        return match_events(queryset, query).order_by('event_time')
+
+    if connection.vendor == 'sqlite':
+        weights = ', '.join(str(weight) for weight in SQLITE_BM25_WEIGHTS)
+        return match_events(queryset, query).extra(
+            select={'rank': f'-bm25({EVENT_FTS_TABLE}, {weights})'},
+            order_by=['-rank', 'event_time'],
+        )
+    return match_events(queryset, query).extra(
+        select={'rank': _MYSQL_MATCH},
+        select_params=[_mysql_match_expression(terms)],
+        order_by=['-rank', 'event_time'],
+    )
@@ -0,0 +1,74 @@
+from rest_framework import serializers
+
+
+class SparseFieldsMixin:
+    """Serializer mixin for sparse fieldsets and expansions
+
+    `fields` keeps only the named fields, `expand` adds or replaces the
+    fields built by Meta.expandable_fields. Meta.field_columns and
+    Meta.expand_columns map them to the model columns they read, so
+    querysets can defer every other column.
+    """
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in expand:
+            self.fields[name] = self.Meta.expandable_fields[name]()
+
+        if fields is not None:
+            keep = set(fields) | set(expand)
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+    @classmethod
+    def get_columns(cls, fields=None, expand=()):
+        """Return the model columns read by the given fields"""
+        field_columns = getattr(cls.Meta, 'field_columns', {})
+        expand_columns = getattr(cls.Meta, 'expand_columns', {})
+        columns = {'pk'}
+        for name in (fields or cls.Meta.fields):
+            columns.update(field_columns.get(name, (name,)))
+        for name in expand:
+            columns.update(expand_columns.get(name, ()))
+        return columns
+
+    @classmethod
+    def optimize_queryset(cls, queryset, fields=None, expand=()):
+        """Select only the columns and relations the fields read"""
+        columns = cls.get_columns(fields, expand)
+        relations = {column.split('__')[0]
+                     for column in columns if '__' in column}
+        return queryset.select_related(*relations).only(
+            *sorted(columns | relations))
+
+
+class FieldsetQuerySerializer(serializers.Serializer):
+    """Validate comma separated `fields` and `expand` query parameters
+
+    Subclasses set `serializer_class` to the serializer being trimmed.
+    """
+    fields = serializers.CharField(required=False)
+    expand = serializers.CharField(required=False)
+    serializer_class = None
+
+    def validate_fields(self, value):
+        names = self._split(value)
+        unknown = set(names) - set(self.serializer_class.Meta.fields)
+        if unknown:
+            raise serializers.ValidationError(
+                'Unknown fields: ' + ', '.join(sorted(unknown)))
+        return names
+
+    def validate_expand(self, value):
+        names = self._split(value)
+        expandable = self.serializer_class.Meta.expandable_fields
+        unknown = set(names) - set(expandable)
+        if unknown:
+            raise serializers.ValidationError(
+                'Unknown expansions: ' + ', '.join(sorted(unknown)))
+        return names
+
+    @staticmethod
+    def _split(value):
+        return [name.strip() for name in value.split(',') if name.strip()]
@@ -0,0 +1,42 @@
+import uuid
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Event, User
+
+EVENT_COUNTS_VERSION_KEY = 'event:counts:version'
+USER_PROFILE_KEY = 'user:profile:{}'
+
+
+def get_event_counts_version():
+    """Return the version token of cached event counts"""
+    version = cache.get(EVENT_COUNTS_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(EVENT_COUNTS_VERSION_KEY, version, None)
+        version = cache.get(EVENT_COUNTS_VERSION_KEY, version)
+    return version
+
+
+@receiver([post_save, post_delete], sender=Event)
+def invalidate_event_counts(sender, **kwargs):
+    """Expire every cached event count when an event changes
+
+    The version lives in the cache, so other processes only see it with
+    a cache they share (CACHE_URL). With the local memory cache each
+    process may serve stale counts for COUNTS_CACHE_SECONDS.
+    """
+    cache.set(EVENT_COUNTS_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def user_profile_key(user_id):
+    """Return the cache key of a user's batch lookup profile"""
+    return USER_PROFILE_KEY.format(user_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_profile(sender, instance, **kwargs):
+    """Expire the cached profile when a user is edited or deleted"""
+    cache.delete(user_profile_key(instance.pk))
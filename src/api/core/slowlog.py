@@ -0,0 +1,166 @@
+import datetime
+import json
+import logging
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from core.profiling import fingerprint_sql
+
+logger = logging.getLogger('board.slow_queries')
+
+# Logged statements are cut to this length in the log
+MAX_SQL_LENGTH = 4000
+
+
+def params_shape(params, many):
+    """Return the parameter types of a query without their values"""
+    if params is None:
+        return None
+    if many:
+        params = list(params)
+        return {'rows': len(params),
+                'types': params_shape(params[0], False) if params else []}
+    if isinstance(params, dict):
+        return {name: type(value).__name__ for name, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or match._func_path
+
+
+class SlowQueryRecorder:
+    """execute_wrapper logging the queries of one request over the threshold
+
+    SELECTs are explained, but each fingerprint at most once per
+    SLOW_QUERY_EXPLAIN_SECONDS in a process so that a hot slow query does
+    not double the load it already causes.
+    """
+
+    # fingerprint: monotonic time of the last EXPLAIN, shared by threads
+    explained_at = {}
+
+    def __init__(self, request):
+        self.request = request
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.explaining:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            if ms >= settings.SLOW_QUERY_MS:
+                self.log(context['connection'], sql, params, many, ms)
+
+    def log(self, connection, sql, params, many, ms):
+        fingerprint = fingerprint_sql(sql)
+        entry = {
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'ms': round(ms, 3),
+            'database': connection.alias,
+            'view': view_name(self.request),
+            'method': self.request.method,
+            'fingerprint': fingerprint,
+            'sql': sql[:MAX_SQL_LENGTH],
+            'params': params_shape(params, many),
+            'explain': None,
+        }
+        if not many and self.should_explain(sql, fingerprint):
+            entry['explain'] = self.explain(connection, sql, params)
+        logger.warning(json.dumps(entry, default=str))
+
+    def should_explain(self, sql, fingerprint):
+        if sql.lstrip()[:6].upper() != 'SELECT':
+            return False
+        now = time.monotonic()
+        last = self.explained_at.get(fingerprint)
+        if (last is not None and
+                now - last < settings.SLOW_QUERY_EXPLAIN_SECONDS):
+            return False
+        self.explained_at[fingerprint] = now
+        return True
+
+    def explain(self, connection, sql, params):
+        prefix = connection.ops.explain_query_prefix()
+        self.explaining = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                return [list(row) for row in cursor.fetchall()]
+        except DatabaseError as e:
+            return f'EXPLAIN failed: {e}'
+        finally:
+            self.explaining = False
+
+
+class SlowQueryMiddleware:
+    """Log the queries of a request slower than SLOW_QUERY_MS
+
+    Entries are JSON lines on the board.slow_queries logger, which writes
+    to the rotating SLOW_QUERY_LOG. Summarize them with the slow_queries
+    command. Queries of management commands are not recorded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = SlowQueryRecorder(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            return self.get_response(request)
+
+
+def log_files(path):
+    """Return the log and its rotated backups, oldest first"""
+    backups = []
+    for index in range(1, settings.SLOW_QUERY_LOG_BACKUPS + 1):
+        backup = f'{path}.{index}'
+        if os.path.exists(backup):
+            backups.append(backup)
+    return backups[::-1] + ([path] if os.path.exists(path) else [])
+
+
+def read_entries(path):
+    for log_file in log_files(path):
+        with open(log_file) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def summarize(entries, sort='total_ms'):
+    """Group entries by fingerprint, largest `sort` value first
+
+    The EXPLAIN kept for a group is the latest one.
+    """
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry['fingerprint'], {
+            'fingerprint': entry['fingerprint'], 'count': 0, 'total_ms': 0,
+            'max_ms': 0, 'views': {}, 'explain': None, 'sql': entry['sql'],
+        })
+        group['count'] += 1
+        group['total_ms'] += entry['ms']
+        if entry['ms'] >= group['max_ms']:
+            group['max_ms'] = entry['ms']
+            group['sql'] = entry['sql']
+        views = group['views']
+        views[entry['view']] = views.get(entry['view'], 0) + 1
+        if entry['explain'] is not None:
+            group['explain'] = entry['explain']
+    return sorted(groups.values(), key=lambda group: group[sort],
+                  reverse=True)
@@ -0,0 +1,216 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from itertools import islice
+
+from django.core.paginator import InvalidPage
+from django.http import StreamingHttpResponse
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+
+from core.renderers import FastJSONRenderer, encode_json
+
+# Bytes buffered before a chunk of the stream is sent
+STREAM_BUFFER_SIZE = 16 * 1024
+
+
+class StreamSlots:
+    """Count the long-lived streams a process is serving
+
+    Each open stream of a WSGI server holds a request thread, so streams
+    are capped below the thread count to keep threads free for the rest
+    of the API.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+
+    def acquire(self, limit):
+        """Take a slot and return True, or False if `limit` are taken"""
+        with self._lock:
+            if self.open >= limit:
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open -= 1
+
+
+class ReleasingIterator(Iterator):
+    """Iterate over a stream and call `release` once when it is closed
+
+    Django closes the iterator of a streaming response when the request
+    ends, even if it was never started.
+    """
+
+    def __init__(self, iterable, release):
+        self.iterator = iter(iterable)
+        self.release = release
+
+    def __next__(self):
+        return next(self.iterator)
+
+    def close(self):
+        if self.release is None:
+            return
+        release, self.release = self.release, None
+        try:
+            if hasattr(self.iterator, 'close'):
+                self.iterator.close()
+        finally:
+            release()
+
+
+class AsyncStreamingHttpResponse(StreamingHttpResponse):
+    """Streaming response whose content is an async iterator of bytes
+
+    core.asgi.ASGIHandler sends it from the event loop, so a stream
+    waiting for data holds no thread. Middleware rewriting
+    `streaming_content` does not apply to it.
+    """
+
+    def __init__(self, async_streaming_content, *args, **kwargs):
+        super().__init__((), *args, **kwargs)
+        self.async_streaming_content = async_streaming_content
+
+
+class StreamingJSONRenderer(FastJSONRenderer):
+    """JSON renderer that can yield a document in chunks
+
+    Iterators inside the data are written as arrays one row at a time,
+    so only one row is held in memory however long the array is.
+    """
+
+    def render_stream(self, data):
+        """Yield the data as JSON bytes chunks"""
+        separators = SHORT_SEPARATORS if self.compact else LONG_SEPARATORS
+        encoder = self.encoder_class(
+            ensure_ascii=self.ensure_ascii, allow_nan=not self.strict,
+            separators=separators)
+        fast = self.uses_fast_path(None, None)
+
+        def encode(value):
+            content = encode_json(value) if fast else None
+            if content is None:
+                # Same escaping as JSONRenderer, keeps the output a JS subset
+                text = encoder.encode(value)
+                text = text.replace('\u2028', '\\u2028')
+                content = text.replace('\u2029', '\\u2029').encode()
+            return content
+
+        buffer = []
+        size = 0
+        for piece in self._iterencode(data, encode, separators):
+            buffer.append(piece)
+            size += len(piece)
+            if size >= STREAM_BUFFER_SIZE:
+                yield b''.join(buffer)
+                buffer = []
+                size = 0
+        if buffer:
+            yield b''.join(buffer)
+
+    def _iterencode(self, data, encode, separators):
+        item_separator, key_separator = (
+            separator.encode() for separator in separators)
+        if isinstance(data, dict):
+            yield b'{'
+            for index, (key, value) in enumerate(data.items()):
+                if index:
+                    yield item_separator
+                yield encode(str(key))
+                yield key_separator
+                yield from self._iterencode(value, encode, separators)
+            yield b'}'
+        elif isinstance(data, Iterator):
+            yield b'['
+            for index, row in enumerate(data):
+                if index:
+                    yield item_separator
+                yield encode(row)
+            yield b']'
+        else:
+            yield encode(data)
+
+
+class LazyPageNumberPagination(PageNumberPagination):
+    """PageNumberPagination that can leave a page as a queryset"""
+
+    def paginate_queryset(self, queryset, request, view=None, lazy=False):
+        """Paginate as usual, or return the unevaluated page if lazy"""
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        page_number = request.query_params.get(self.page_query_param, 1)
+        if page_number in self.last_page_strings:
+            page_number = paginator.num_pages
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        self.request = request
+        if lazy:
+            return self.page.object_list
+        return list(self.page)
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('count', self.page.paginator.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ])
+
+
+class StreamingListMixin:
+    """Send large lists as a JSON stream instead of one rendered string
+
+    Lists longer than `stream_min_rows` are read with a server-side
+    iterator and serialized in batches of `stream_chunk_size`, so memory
+    does not grow with the page size. Shorter lists and non-JSON
+    renderers use a normal Response.
+    """
+    stream_min_rows = 100
+    stream_chunk_size = 100
+
+    def should_stream(self, rows):
+        return (rows is not None and rows > self.stream_min_rows and
+                self.request.accepted_renderer.format == 'json')
+
+    def get_read_serializer(self):
+        """Return a values based read serializer for the request or None"""
+        return None
+
+    def iter_serialized(self, queryset):
+        reader = self.get_read_serializer()
+        if reader is not None:
+            rows = reader.get_rows(queryset).iterator(
+                chunk_size=self.stream_chunk_size)
+            for batch in iter(
+                    lambda: list(islice(rows, self.stream_chunk_size)), []):
+                yield from reader.serialize(batch)
+            return
+
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+        for instance in queryset.iterator(chunk_size=self.stream_chunk_size):
+            yield serializer_class(instance, context=context).data
+
+    def streaming_response(self, data):
+        renderer = StreamingJSONRenderer()
+        return StreamingHttpResponse(renderer.render_stream(data),
+                                     content_type=renderer.media_type)
@@ -0,0 +1,85 @@
+import json
+import logging
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.accesslog import QueueingHandler
+from core.factorys import EventFactory, UserFactory
+
+
+class RecordingHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class QueueingHandlerTests(SimpleTestCase):
+
+    def test_write_in_background(self):
+        """Test records are written by the listener thread"""
+        target = RecordingHandler()
+        handler = QueueingHandler(target)
+        handler.handle(logging.makeLogRecord({'msg': 'one'}))
+        handler.stop()
+
+        self.assertEqual(target.messages, ['one'])
+
+    def test_drop_when_full(self):
+        """Test records are dropped instead of blocking when full"""
+        handler = QueueingHandler(RecordingHandler(), maxsize=1)
+        with mock.patch.object(handler, 'start_listener'):
+            for message in ('one', 'two'):
+                handler.handle(logging.makeLogRecord({'msg': message}))
+
+        self.assertEqual(handler.queue.qsize(), 1)
+        self.assertEqual(handler.dropped, 1)
+
+
+@override_settings(ACCESS_LOG_SAMPLE_RATE=1.0)
+class AccessLogMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.event = EventFactory(organizer=self.user)
+
+    def get(self, url):
+        with self.assertLogs('board.access') as logs:
+            res = self.client.get(url)
+        return res, [json.loads(record.getMessage())
+                     for record in logs.records]
+
+    def test_log_request(self):
+        """Test a request is logged with its view, user and timings"""
+        res, entries = self.get(reverse('event:event-detail',
+                                        args=[self.event.id]))
+
+        entry = entries[0]
+        self.assertEqual(entry['view'], 'event:event-detail')
+        self.assertEqual(entry['action'], 'retrieve')
+        self.assertEqual(entry['user_id'], self.user.id)
+        self.assertEqual(entry['status'], 200)
+        self.assertEqual(entry['bytes'], len(res.content))
+        self.assertGreater(entry['ms'], 0)
+        self.assertGreater(entry['db_ms'], 0)
+        self.assertEqual(entry['sample_rate'], 1.0)
+
+    @override_settings(ACCESS_LOG_SAMPLE_RATES={'event:event-detail': 0.5})
+    def test_sampling(self):
+        """Test sampled views are only logged for part of the requests"""
+        url = reverse('event:event-detail', args=[self.event.id])
+        with mock.patch('core.accesslog.random.random', return_value=0.9), \
+                self.assertRaises(AssertionError):
+            self.get(url)
+        with mock.patch('core.accesslog.random.random', return_value=0.1):
+            _, entries = self.get(url)
+
+        self.assertEqual(entries[0]['sample_rate'], 0.5)
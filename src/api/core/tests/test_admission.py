@@ -0,0 +1,93 @@
+import random
+import threading
+import time
+
+from django.db import OperationalError, connection, transaction
+from django.test import TransactionTestCase
+
+from core.admission import admission_status, release_seat
+from core.factorys import EventFactory, ParticipantFactory, UserFactory
+from core.models import Event, Participant
+
+
+class AdmissionTests(TransactionTestCase):
+    """Test seats are never given out beyond the capacity
+
+    Joins are committed from many threads at once against the configured
+    database, MySQL on CI, so the conditional UPDATE races for real.
+    """
+    CAPACITY = 50
+    USERS = 300
+    # One connection each, under the 151 max_connections of MySQL
+    WORKERS = 100
+    JOIN_SECONDS = 60
+
+    def setUp(self):
+        self.event = EventFactory(
+            organizer=UserFactory(email='organizer@matsuda.com'),
+            capacity=self.CAPACITY)
+        self.users = UserFactory.create_batch(self.USERS)
+
+    def join(self, user):
+        deadline = time.monotonic() + self.JOIN_SECONDS
+        while True:
+            try:
+                with transaction.atomic():
+                    Participant.objects.create(
+                        event=self.event, user=user,
+                        status=admission_status(self.event.id))
+                return
+            except OperationalError:
+                # SQLite serializes writers with "database is locked" and
+                # MySQL may pick the transaction as a deadlock victim
+                if time.monotonic() > deadline:
+                    raise
+                connection.close()
+                time.sleep(random.uniform(0.001, 0.02))
+
+    def join_all(self, users, start):
+        start.wait()
+        try:
+            for user in users:
+                self.join(user)
+        finally:
+            connection.close()
+
+    def test_concurrent_joins_respect_capacity(self):
+        """Test concurrent joins fill the capacity and wait for the rest"""
+        start = threading.Barrier(self.WORKERS)
+        threads = [
+            threading.Thread(target=self.join_all,
+                             args=(self.users[index::self.WORKERS], start))
+            for index in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        joined = Participant.objects.filter(
+            event=self.event, status=Participant.Status.JOIN).count()
+        waiting = Participant.objects.filter(
+            event=self.event, status=Participant.Status.WAITING).count()
+        self.event.refresh_from_db()
+        self.assertEqual(joined, self.CAPACITY)
+        self.assertEqual(waiting, self.USERS - self.CAPACITY)
+        self.assertEqual(self.event.participant_count, self.CAPACITY)
+
+    def test_release_seat_promotes_in_order(self):
+        """Test a released seat goes to the longest waiting participant"""
+        Event.objects.filter(id=self.event.id).update(
+            capacity=1, participant_count=1)
+        ParticipantFactory(event=self.event, user=self.users[0])
+        first = ParticipantFactory(event=self.event, user=self.users[1],
+                                   status=Participant.Status.WAITING)
+        second = ParticipantFactory(event=self.event, user=self.users[2],
+                                    status=Participant.Status.WAITING)
+
+        with transaction.atomic():
+            self.assertEqual(release_seat(self.event.id), 1)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, Participant.Status.JOIN)
+        self.assertEqual(second.status, Participant.Status.WAITING)
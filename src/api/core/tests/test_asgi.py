@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+
+from django.http import StreamingHttpResponse
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from core.asgi import ASGIHandler, ResponseSender, lifespan
+from core.factorys import EventFactory, UserFactory
+from core.models import Event
+
+
+def http_scope(path):
+    return {'type': 'http', 'method': 'GET', 'path': path,
+            'query_string': b'', 'headers': []}
+
+
+async def read_body(communicator):
+    """Return the status and body of a response"""
+    start = await communicator.receive_output(timeout=1)
+    body = b''
+    while True:
+        message = await communicator.receive_output(timeout=1)
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return start['status'], body
+
+
+async def stream_response(response, messages=()):
+    """Send a response through the handler, return the ASGI messages"""
+    sent = []
+    received = asyncio.Queue()
+    for message in messages:
+        received.put_nowait(message)
+
+    async def send(message):
+        sent.append(message)
+
+    await ASGIHandler().send_response(
+        response, ResponseSender(send, received.get))
+    return sent
+
+
+class ASGIHandlerTests(TransactionTestCase):
+    """Test serving Django over ASGI"""
+
+    def setUp(self):
+        self.event = EventFactory(organizer=UserFactory())
+
+    def test_serve_request(self):
+        """Test serving an API request"""
+        path = reverse('event:event-detail', args=[self.event.id])
+
+        async def scenario():
+            communicator = ApplicationCommunicator(
+                ASGIHandler(), http_scope(path))
+            await communicator.send_input({'type': 'http.request'})
+            return await read_body(communicator)
+
+        status, body = async_to_sync(scenario)()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['id'], self.event.id)
+
+    def test_stream_lazy_queries(self):
+        """Test a sync stream runs its queries outside the event loop"""
+        def content():
+            yield b'['
+            for event in Event.objects.all():
+                yield str(event.id).encode()
+            yield b']'
+
+        sent = async_to_sync(stream_response)(
+            StreamingHttpResponse(content()))
+
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(b''.join(m.get('body', b'') for m in sent[1:]),
+                         f'[{self.event.id}]'.encode())
+        self.assertFalse(sent[-1].get('more_body'))
+
+    def test_stream_async_content(self):
+        """Test streaming async content"""
+        async def content():
+            yield b'first'
+            await asyncio.sleep(0)
+            yield b'second'
+
+        response = StreamingHttpResponse()
+        response.async_streaming_content = content()
+        sent = async_to_sync(stream_response)(response)
+
+        self.assertEqual([m.get('body') for m in sent[1:]],
+                         [b'first', b'second', None])
+
+    def test_stop_stream_on_disconnect(self):
+        """Test a stream stops and is closed once the client disconnects"""
+        closed = []
+
+        async def content():
+            try:
+                while True:
+                    yield b'data'
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.append(True)
+
+        response = StreamingHttpResponse()
+        response.async_streaming_content = content()
+        sent = async_to_sync(stream_response)(
+            response, [{'type': 'http.disconnect'}])
+
+        self.assertEqual(closed, [True])
+        self.assertTrue(all(m.get('more_body', True) for m in sent))
+
+    def test_lifespan(self):
+        """Test the lifespan protocol starts and stops the server"""
+        async def scenario():
+            communicator = ApplicationCommunicator(
+                lifespan, {'type': 'lifespan'})
+            await communicator.send_input({'type': 'lifespan.startup'})
+            startup = await communicator.receive_output(timeout=1)
+            await communicator.send_input({'type': 'lifespan.shutdown'})
+            shutdown = await communicator.receive_output(timeout=1)
+            await communicator.wait(timeout=1)
+            return startup, shutdown
+
+        startup, shutdown = async_to_sync(scenario)()
+
+        self.assertEqual(startup['type'], 'lifespan.startup.complete')
+        self.assertEqual(shutdown['type'], 'lifespan.shutdown.complete')
@@ -0,0 +1,28 @@
+from django.test import TestCase
+
+from core.benchmark import (build_cases, compare, run_benchmark,
+                            seed_dataset)
+
+TINY_DATASET = {'users': 20, 'events': 30, 'participants': 100,
+                'comments': 50}
+
+
+class BenchmarkTests(TestCase):
+
+    def test_run_cases(self):
+        """Test every case is served and measured"""
+        seed_dataset(TINY_DATASET)
+        results = run_benchmark(build_cases(), runs=1)
+
+        for name, result in results.items():
+            self.assertEqual(result['status'], 200, name)
+            self.assertGreater(result['warm_median_ms'], 0)
+
+    def test_compare(self):
+        """Test slower medians and extra queries are regressions"""
+        baseline = {'list': {'warm_median_ms': 10, 'queries': 3}}
+
+        self.assertEqual(compare(
+            {'list': {'warm_median_ms': 12, 'queries': 3}}, baseline), [])
+        self.assertEqual(len(compare(
+            {'list': {'warm_median_ms': 13, 'queries': 4}}, baseline)), 2)
@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import budgets
+from core.budgets import BudgetExceeded, RequestBudget, budget
+from core.factorys import EventFactory, UserFactory
+
+
+class RequestBudgetTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.event = EventFactory(organizer=UserFactory())
+        self.url = reverse('event:event-detail', args=[self.event.id])
+
+    def test_within_budget(self):
+        """Test requests within the budget pass and are recorded"""
+        with RequestBudget(queries=1, ms=1000) as recorder:
+            self.client.get(self.url)
+            UserFactory()
+
+        self.assertEqual(len(recorder.requests), 1)
+        self.assertEqual(len(recorder.requests[0].queries), 1)
+
+    def test_over_query_budget(self):
+        """Test extra queries fail with the SQL of the request"""
+        with self.assertRaises(BudgetExceeded) as raised:
+            with RequestBudget(queries=0):
+                self.client.get(self.url)
+
+        message = str(raised.exception)
+        self.assertIn(f'GET {self.url}: 1 queries (budget 0)', message)
+        self.assertIn('SELECT', message)
+
+    @mock.patch.object(budgets, 'enforce_latency', True)
+    def test_over_latency_budget(self):
+        """Test slow requests fail and the scale relaxes the budget"""
+        with self.assertRaises(BudgetExceeded):
+            with RequestBudget(ms=0):
+                self.client.get(self.url)
+
+        with mock.patch.object(budgets, 'latency_scale', 1e6):
+            with RequestBudget(ms=0.001):
+                self.client.get(self.url)
+
+    @mock.patch.object(budgets, 'enforce_latency', False)
+    def test_latency_budget_not_enforced(self):
+        """Test latency budgets only fail once enabled, queries always"""
+        with RequestBudget(ms=0) as recorder:
+            self.client.get(self.url)
+        self.assertIsNotNone(recorder.requests[0].ms)
+
+        with self.assertRaises(BudgetExceeded):
+            with RequestBudget(queries=0, ms=0):
+                self.client.get(self.url)
+
+    def test_class_budget_keeps_method_budget(self):
+        """Test a class budget does not replace a method budget"""
+        @budget(queries=1)
+        class Tests:
+            @budget(queries=5)
+            def test_own(self):
+                pass
+
+            def test_default(self):
+                pass
+
+        self.assertEqual(Tests.test_own.request_budget, (5, None))
+        self.assertEqual(Tests.test_default.request_budget, (1, None))
@@ -0,0 +1,26 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db.backends.mysql.operations import DatabaseOperations
+from django.test import SimpleTestCase
+
+from core.functions import LocalDate
+
+
+class LocalDateTests(SimpleTestCase):
+
+    def test_mysql_without_time_zone_tables(self):
+        """Test MySQL gets the date without CONVERT_TZ"""
+        connection = mock.Mock(timezone_name='UTC')
+        connection.ops = DatabaseOperations(connection)
+        compiler = mock.Mock()
+        compiler.compile.return_value = (
+            '(`t_event`.`event_time` + INTERVAL %s MICROSECOND)',
+            [32400000000])
+
+        sql, params = LocalDate('event_time', timedelta(hours=9)).as_sql(
+            compiler, connection)
+
+        self.assertEqual(
+            sql, 'DATE((`t_event`.`event_time` + INTERVAL %s MICROSECOND))')
+        self.assertEqual(params, [32400000000])
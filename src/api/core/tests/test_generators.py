@@ -0,0 +1,75 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Q
+from django.test import TestCase
+
+from core.factorys import EventFactory, UserFactory
+from core.generators import DatasetGenerator
+from core.models import Event, EventComment, Participant
+
+TINY_DATASET = {'users': 40, 'events': 30, 'participants': 200,
+                'comments': 100}
+
+
+class DatasetGeneratorTests(TestCase):
+
+    def generate(self, seed=0):
+        return DatasetGenerator(
+            seed, start=datetime.date(2021, 3, 1), months=2
+        ).generate(TINY_DATASET)
+
+    def test_generate_counts(self):
+        """Test the requested rows are inserted"""
+        counts = self.generate()
+
+        self.assertEqual(counts['users'], 40)
+        self.assertEqual(counts['events'], 30)
+        self.assertEqual(counts['participants'], Participant.objects.count())
+        self.assertEqual(counts['comments'], EventComment.objects.count())
+        self.assertAlmostEqual(counts['participants'], 200, delta=30)
+
+    def test_participant_counts_match(self):
+        """Test participant_count equals the joined participants"""
+        self.generate()
+
+        joined = Q(participant__status=Participant.Status.JOIN)
+        mismatched = Event.objects.annotate(
+            joined=Count('participant', filter=joined)
+        ).exclude(joined=F('participant_count'))
+        self.assertFalse(mismatched.exists())
+
+    def test_capacity_respected(self):
+        """Test events never have more joined participants than capacity"""
+        self.generate()
+
+        self.assertFalse(Event.objects.filter(
+            participant_count__gt=F('capacity')).exists())
+
+    def test_events_within_months(self):
+        """Test event times fall within the requested months"""
+        self.generate()
+
+        months = set(Event.objects.dates('event_time', 'month'))
+        self.assertLessEqual(
+            months, {datetime.date(2021, 3, 1), datetime.date(2021, 4, 1)})
+
+    def test_generate_into_existing_data(self):
+        """Test a second run adds rows without clashing"""
+        self.generate()
+        self.generate(seed=1)
+
+        self.assertEqual(get_user_model().objects.count(), 80)
+        self.assertEqual(Event.objects.count(), 60)
+
+
+class FactoryTests(TestCase):
+
+    def test_instances_differ(self):
+        """Test faker fields are evaluated per instance"""
+        organizer = UserFactory()
+        first = EventFactory(organizer=organizer)
+        second = EventFactory(organizer=organizer)
+
+        self.assertNotEqual(first.description, second.description)
+        self.assertNotEqual(UserFactory().email, organizer.email)
@@ -0,0 +1,80 @@
+import random
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core import geo
+from core.factorys import UserFactory, EventFactory
+from core.models import Event
+
+
+class StaticGeocoder(geo.BaseGeocoder):
+
+    def geocode(self, address):
+        return {'here': (35.6895, 139.6917)}.get(address)
+
+
+class GeoTests(TestCase):
+
+    def tearDown(self):
+        geo.get_geocoder.cache_clear()
+
+    def test_gazetteer_geocoder(self):
+        """Test the gazetteer resolves the most specific place"""
+        geocoder = geo.GazetteerGeocoder()
+
+        self.assertEqual(geocoder.geocode('東京都渋谷区神南1-1'),
+                         (35.6640, 139.6982))
+        self.assertEqual(geocoder.geocode('京都'), (35.0214, 135.7556))
+        self.assertEqual(geocoder.geocode('1-1 Shibuya, Tokyo'),
+                         (35.6640, 139.6982))
+        self.assertIsNone(geocoder.geocode('Kitakyushu'))
+        self.assertIsNone(geocoder.geocode('nowhere'))
+
+    def test_geohash_ranges_cover_radius(self):
+        """Test points within the radius always fall in a covering cell"""
+        rand = random.Random(0)
+        for _ in range(200):
+            lat = rand.uniform(-80, 80)
+            lng = rand.uniform(-180, 180)
+            radius = rand.uniform(0.1, 50)
+            ranges = geo.geohash_ranges(lat, lng, radius)
+            self.assertLessEqual(len(ranges), 9)
+            for _ in range(20):
+                d_lat = rand.uniform(-1, 1) * radius / 111.2
+                d_lng = rand.uniform(-1, 1) * radius / 111.2
+                p_lat, p_lng = lat + d_lat, (lng + d_lng + 180) % 360 - 180
+                if geo.haversine_km(lat, lng, p_lat, p_lng) > radius:
+                    continue
+                code = geo.encode_geohash(p_lat, p_lng)
+                self.assertTrue(
+                    any(low <= code < high for low, high in ranges))
+
+    @override_settings(EVENT_GEOCODER='core.tests.test_geo.StaticGeocoder')
+    def test_event_geocoded_on_address_change(self):
+        """Test an event is geocoded when its address changes"""
+        geo.get_geocoder.cache_clear()
+        event = EventFactory(organizer=UserFactory(), address='here')
+
+        self.assertEqual(event.latitude, 35.6895)
+        self.assertEqual(event.geohash, geo.encode_geohash(35.6895, 139.6917))
+
+        event = Event.objects.get(id=event.id)
+        event.address = 'unknown'
+        event.save()
+        event.refresh_from_db()
+
+        self.assertIsNone(event.latitude)
+        self.assertIsNone(event.geohash)
+
+    def test_geocode_events_command(self):
+        """Test geocoding events without coordinates"""
+        event = EventFactory(organizer=UserFactory(), address='Shinjuku')
+        Event.objects.filter(id=event.id).update(
+            latitude=None, longitude=None, geohash=None)
+
+        call_command('geocode_events', stdout=StringIO())
+        event.refresh_from_db()
+
+        self.assertEqual(event.latitude, 35.6938)
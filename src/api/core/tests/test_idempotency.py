@@ -0,0 +1,108 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from core.factorys import EventFactory, UserFactory
+from core.models import EventComment, Participant
+from event.views import EventCommentView
+
+
+def comment_url(event_id):
+    return reverse('event:eventComment', args=[event_id])
+
+
+def participant_url(event_id):
+    return reverse('event:listCreateParticipant', args=[event_id])
+
+
+class IdempotencyKeyTests(TestCase):
+    """Test replaying responses of retried requests"""
+
+    def setUp(self):
+        cache.clear()
+        self.organizer = UserFactory(email='testorganizer@matsuda.com')
+        self.user = UserFactory(email='testuser@matsuda.com')
+        self.event = EventFactory(organizer=self.organizer)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, url, data=None, key='retry-1'):
+        return self.client.post(url, data, HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retried_comment_is_created_once(self):
+        """Test retrying a comment replays the first response"""
+        first = self.post(comment_url(self.event.id), {'comment': 'hi'})
+        second = self.post(comment_url(self.event.id), {'comment': 'hi'})
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(EventComment.objects.count(), 1)
+
+    def test_retried_join_replays_result(self):
+        """Test retrying a join does not hit the unique constraint"""
+        first = self.post(participant_url(self.event.id))
+        second = self.post(participant_url(self.event.id))
+
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(Participant.objects.count(), 1)
+
+    def test_returned_error_is_not_replayed(self):
+        """Test a key is free again after the view returned a 4xx"""
+        first = self.post(comment_url(self.event.id), {'comment': 'x' * 501})
+        second = self.post(comment_url(self.event.id), {'comment': 'hi'})
+
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', second)
+        self.assertEqual(EventComment.objects.count(), 1)
+
+    def test_raised_error_is_not_replayed(self):
+        """Test a key is free again after the view raised a 4xx"""
+        with patch.object(EventCommentView, 'get_serializer',
+                          side_effect=ValidationError('invalid')):
+            first = self.post(comment_url(self.event.id), {'comment': 'hi'})
+        second = self.post(comment_url(self.event.id), {'comment': 'hi'})
+
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', second)
+        self.assertEqual(EventComment.objects.count(), 1)
+
+    def test_new_key_runs_request_again(self):
+        """Test a different key is a different request"""
+        self.post(comment_url(self.event.id), {'comment': 'hi'})
+        self.post(comment_url(self.event.id), {'comment': 'hi'}, key='retry-2')
+
+        self.assertEqual(EventComment.objects.count(), 2)
+
+    def test_reused_key_with_other_body_is_rejected(self):
+        """Test reusing a key for a different body fails"""
+        self.post(comment_url(self.event.id), {'comment': 'hi'})
+        res = self.post(comment_url(self.event.id), {'comment': 'bye'})
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(EventComment.objects.count(), 1)
+
+    def test_key_is_scoped_to_user(self):
+        """Test the same key from another user runs the request"""
+        self.post(comment_url(self.event.id), {'comment': 'hi'})
+        self.client.force_authenticate(self.organizer)
+        self.post(comment_url(self.event.id), {'comment': 'hi'})
+
+        self.assertEqual(EventComment.objects.count(), 2)
+
+    def test_too_long_key_is_rejected(self):
+        """Test rejecting an Idempotency-Key over the length limit"""
+        res = self.post(comment_url(self.event.id), {'comment': 'hi'},
+                        key='x' * 256)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(EventComment.objects.count(), 0)
@@ -0,0 +1,51 @@
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core.importtime import group_by_owner, measure_startup, parse_importtime
+
+IMPORTTIME_OUTPUT = '''\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     allauth.account.utils
+import time:       300 |        420 |   allauth.account
+import time:        80 |        500 | allauth
+import time:      1000 |       1000 |   yaml.reader
+import time:        50 |       1050 | yaml
+'''
+
+
+class ImportTimeTests(SimpleTestCase):
+
+    def test_parse(self):
+        """Test -X importtime lines are parsed with their nesting"""
+        rows = parse_importtime(IMPORTTIME_OUTPUT)
+
+        self.assertEqual(rows[0], ('allauth.account.utils', 120, 120, 2))
+        self.assertEqual(rows[2], ('allauth', 80, 500, 0))
+        self.assertEqual(len(rows), 5)
+
+    def test_group_by_owner(self):
+        """Test own time is summed per installed app or package"""
+        groups = group_by_owner(parse_importtime(IMPORTTIME_OUTPUT),
+                                ['allauth', 'allauth.account'])
+
+        self.assertEqual(groups, [('yaml', 1.05), ('allauth.account', 0.42),
+                                  ('allauth', 0.08)])
+
+    def test_schema_views_not_loaded_at_startup(self):
+        """Test a fresh worker does not import the schema views"""
+        timings, _ = measure_startup()
+
+        self.assertGreater(timings['total_ms'], 0)
+        self.assertIn('event.views', timings['modules'])
+        self.assertNotIn('drf_spectacular.views', timings['modules'])
+        self.assertNotIn('drf_spectacular.generators', timings['modules'])
+
+
+class LazySchemaViewTests(TestCase):
+
+    def test_swagger_ui(self):
+        """Test the lazily loaded swagger-ui view is served"""
+        res = self.client.get(reverse('swagger-ui'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(reverse('schema').encode(), res.content)
@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+import time
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.factorys import EventFactory, UserFactory
+from core.metrics import Registry, registry, render
+
+DEAD_PID = 999999999
+
+
+class RenderTests(SimpleTestCase):
+
+    def test_render(self):
+        """Test counters and histograms use the Prometheus text format"""
+        metrics = Registry()
+        metrics.inc('api_cache_requests_total',
+                    {'cache': 'event_counts', 'result': 'hit'}, 3)
+        metrics.observe('api_request_queries', {'view': 'V.list'}, 2)
+        metrics.observe('api_request_queries', {'view': 'V.list'}, 30)
+
+        text = render(metrics.snapshot())
+
+        self.assertIn('# TYPE api_cache_requests_total counter\n'
+                      'api_cache_requests_total{cache="event_counts",'
+                      'result="hit"} 3\n', text)
+        self.assertIn('api_request_queries_bucket{view="V.list",le="1"} 0\n'
+                      'api_request_queries_bucket{view="V.list",le="2"} 1\n',
+                      text)
+        self.assertIn('api_request_queries_bucket{view="V.list",le="50"} 2\n'
+                      'api_request_queries_bucket{view="V.list",le="100"} 2\n'
+                      'api_request_queries_bucket{view="V.list",le="+Inf"} 2\n'
+                      'api_request_queries_sum{view="V.list"} 32\n'
+                      'api_request_queries_count{view="V.list"} 2\n', text)
+
+    def write_process_file(self, directory, name, count, mtime=None):
+        path = os.path.join(directory, name)
+        with open(path, 'w') as f:
+            json.dump({
+                'counters': {'api_requests_total{status="200"}': count},
+                'histograms': {},
+                'gauges': {'api_pubsub_subscriptions': 5},
+            }, f)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def test_merge_processes(self):
+        """Test counters of all processes are summed, gauges of live ones"""
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_DIR=directory):
+            self.write_process_file(directory, f'{DEAD_PID}-a1b2c3d4.json', 2)
+            metrics = Registry()
+            metrics.inc('api_requests_total', {'status': 200})
+            metrics.set_gauge('api_pubsub_subscriptions', {}, 1)
+
+            values = metrics.collect()
+            names = sorted(os.listdir(directory))
+            self.assertEqual(metrics.collect()['counters'],
+                             values['counters'])
+
+        self.assertEqual(values['counters'],
+                         {'api_requests_total{status="200"}': 3})
+        self.assertEqual(values['gauges'], {'api_pubsub_subscriptions': 1})
+        self.assertEqual(names, ['.lock', metrics.file_name(),
+                                 'archive.json'])
+
+    def test_reused_pid(self):
+        """Test a file left with this PID by an exited process is kept"""
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_DIR=directory):
+            self.write_process_file(directory, f'{os.getpid()}-a1b2c3d4.json',
+                                    2, mtime=time.time() - 60)
+            metrics = Registry()
+            metrics.inc('api_requests_total', {'status': 200})
+
+            values = metrics.collect()
+
+        self.assertEqual(values['counters'],
+                         {'api_requests_total{status="200"}': 3})
+        self.assertEqual(values['gauges'], {})
+
+
+class MetricsViewTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.event = EventFactory(organizer=UserFactory())
+
+    def scrape(self, token='secret', **headers):
+        with override_settings(METRICS_TOKEN=token):
+            return self.client.get(reverse('metrics'), **headers)
+
+    def test_request_recorded(self):
+        """Test API requests are counted per view action and status"""
+        key = ('api_requests_total{method="GET",status="200",'
+               'view="EventViewSet.retrieve"}')
+        before = registry.snapshot()['counters'].get(key, 0)
+
+        self.client.get(reverse('event:event-detail', args=[self.event.id]))
+
+        self.assertEqual(registry.snapshot()['counters'][key], before + 1)
+        res = self.scrape(HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(f'{key} ', res.content.decode())
+        self.assertIn('api_request_queries_bucket{'
+                      'view="EventViewSet.retrieve",le="+Inf"}',
+                      res.content.decode())
+
+    def test_token_required(self):
+        """Test scrapes need the token and the endpoint is off without one"""
+        self.assertEqual(self.scrape().status_code, 401)
+        self.assertEqual(
+            self.scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.assertEqual(
+            self.scrape(token='',
+                        HTTP_AUTHORIZATION='Bearer ').status_code, 404)
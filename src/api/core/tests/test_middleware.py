@@ -0,0 +1,129 @@
+import gzip
+import json
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import localtime
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.factorys import EventFactory, UserFactory
+from core.middleware import brotli
+from event.views import EventViewSet
+
+EVENT_URL = reverse('event:event-list')
+
+
+class TokenAPIMiddlewareTests(TestCase):
+    """Test the token API fast path middleware"""
+
+    def setUp(self):
+        self.user = UserFactory(first_name='taro')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+
+    def test_token_request_skips_session_and_csrf(self):
+        """Test token requests do not touch session or CSRF cookies"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'stale'
+        url = reverse('user:user-shortname', args=[self.user.id])
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['short_name'], 'taro')
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, res.cookies)
+        self.assertNotIn(settings.CSRF_COOKIE_NAME, res.cookies)
+        self.assertNotIn('Cookie', res.get('Vary', ''))
+
+    def test_token_request_authenticates_user(self):
+        """Test token requests are still authenticated"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        url = reverse('user:user-email', args=[self.user.id])
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_token_logout_successful(self):
+        """Test logout works without a loaded session"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        res = self.client.post(reverse('user:rest_logout'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_session_login_keeps_session(self):
+        """Test session login still sets a session cookie"""
+        self.user.set_password('testpass123')
+        self.user.save()
+        res = self.client.post(reverse('user:rest_login'), {
+            'email': self.user.email,
+            'password': 'testpass123'
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(settings.SESSION_COOKIE_NAME, res.cookies)
+
+    def test_admin_uses_session(self):
+        """Test admin pages keep the session stack"""
+        res = self.client.get(reverse('admin:login'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(settings.CSRF_COOKIE_NAME, res.cookies)
+
+
+class CompressionMiddlewareTests(TestCase):
+    """Test compressing API responses"""
+
+    def setUp(self):
+        organizer = UserFactory(email='testorganizer@matsuda.com')
+        for _ in range(10):
+            EventFactory(organizer=organizer)
+        today = localtime().date()
+        self.params = {'start': today, 'end': today}
+        self.client = APIClient()
+
+    def get_events(self, encoding, **params):
+        return self.client.get(EVENT_URL, {**self.params, **params},
+                               HTTP_ACCEPT_ENCODING=encoding)
+
+    def test_gzip_large_response(self):
+        """Test large responses are gzipped when accepted"""
+        res = self.get_events('gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(res.content))[
+            'results']), 10)
+
+    @skipIf(brotli is None, 'brotli is not installed')
+    def test_prefer_brotli(self):
+        """Test brotli is preferred when the client accepts it"""
+        res = self.get_events('gzip, br')
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(len(json.loads(brotli.decompress(res.content))[
+            'results']), 10)
+
+    def test_not_compressing_refused_encoding(self):
+        """Test encodings with zero quality are not used"""
+        res = self.get_events('gzip;q=0, br;q=0')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_not_compressing_small_response(self):
+        """Test responses under the threshold are sent as is"""
+        res = self.get_events('gzip', page_size=1)
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    @mock.patch.object(EventViewSet, 'stream_min_rows', 5)
+    def test_gzip_streaming_response(self):
+        """Test streamed responses are compressed chunk by chunk"""
+        res = self.get_events('gzip', page_size=10)
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(res.streaming_content))
+        self.assertEqual(len(json.loads(content)['results']), 10)
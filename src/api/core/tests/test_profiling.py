@@ -0,0 +1,82 @@
+import tempfile
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.factorys import EventFactory, ParticipantFactory, UserFactory
+from core.profiling import fingerprint_sql, list_traces, load_trace
+
+
+class FingerprintSqlTests(SimpleTestCase):
+
+    def test_collapse_values(self):
+        """Test literals, placeholders and IN lists are collapsed"""
+        self.assertEqual(
+            fingerprint_sql("SELECT * FROM t WHERE a = 'x''y' AND b = 10 "
+                            "AND c IN (%s, %s, %s)\n LIMIT 21"),
+            'SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...) LIMIT ?')
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.trace_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.trace_dir.cleanup)
+        self.client = APIClient()
+        self.event = EventFactory(organizer=UserFactory())
+        for _ in range(3):
+            ParticipantFactory(event=self.event, user=UserFactory())
+        self.url = reverse('event:listCreateParticipant',
+                           args=[self.event.id])
+
+    def get(self, **headers):
+        with override_settings(PROFILING_KEY='secret',
+                               PROFILING_TRACE_DIR=self.trace_dir.name):
+            return self.client.get(self.url, **headers)
+
+    def test_profile_with_key(self):
+        """Test the profile key adds a summary and stores a trace"""
+        res = self.get(HTTP_X_PROFILE='secret')
+
+        self.assertRegex(res['Server-Timing'],
+                         r'^total;dur=[\d.]+, sql;dur=[\d.]+;desc="\d+ '
+                         r'queries", serializer;dur=[\d.]+$')
+        with override_settings(PROFILING_TRACE_DIR=self.trace_dir.name):
+            trace = load_trace(res['X-Profile-Trace'])
+        self.assertEqual(trace['path'], self.url)
+        self.assertEqual(trace['summary']['sql_count'],
+                         sum(group['count'] for group in trace['sql']))
+        self.assertTrue(trace['hotspots'])
+
+    def test_not_profiling_without_key(self):
+        """Test requests without the right key are not profiled"""
+        for headers in ({}, {'HTTP_X_PROFILE': 'wrong'}):
+            res = self.get(**headers)
+            self.assertNotIn('Server-Timing', res)
+        with override_settings(PROFILING_TRACE_DIR=self.trace_dir.name):
+            self.assertEqual(list_traces(), [])
+
+    def test_sampled_requests(self):
+        """Test sampled requests are profiled and old traces pruned"""
+        with override_settings(PROFILING_SAMPLE_RATE=1,
+                               PROFILING_MAX_TRACES=2):
+            for _ in range(3):
+                res = self.get()
+                self.assertIn('Server-Timing', res)
+
+        with override_settings(PROFILING_TRACE_DIR=self.trace_dir.name):
+            self.assertEqual(len(list_traces()), 2)
+            self.assertIn(res['X-Profile-Trace'], list_traces())
+
+    def test_show_profile(self):
+        """Test the command prints the SQL of a trace"""
+        res = self.get(HTTP_X_PROFILE='secret')
+
+        with override_settings(PROFILING_TRACE_DIR=self.trace_dir.name):
+            with tempfile.TemporaryFile('w+') as output:
+                call_command('show_profile', res['X-Profile-Trace'],
+                             stdout=output)
+                output.seek(0)
+                self.assertIn('t_participant', output.read())
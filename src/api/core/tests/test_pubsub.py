@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+from django.test import SimpleTestCase
+
+from core.pubsub import Broker
+
+
+class BrokerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.broker = Broker(maxsize=2)
+
+    def test_publish_to_subscribers_of_topic(self):
+        """Test messages reach only subscribers of the topic"""
+        with self.broker.subscribe('a') as first, \
+                self.broker.subscribe('b') as second:
+            self.assertEqual(self.broker.publish('a', 'hello'), 1)
+
+            self.assertEqual(first.get(timeout=0), 'hello')
+            self.assertIsNone(second.get(timeout=0))
+
+    def test_unsubscribe_on_close(self):
+        """Test closed subscriptions stop receiving messages"""
+        subscription = self.broker.subscribe('a')
+        subscription.close()
+
+        self.assertEqual(self.broker.publish('a', 'hello'), 0)
+        self.assertEqual(self.broker.subscriber_count('a'), 0)
+
+    def test_slow_subscriber_overflows(self):
+        """Test a full subscriber is flagged instead of blocking"""
+        with self.broker.subscribe('a') as subscription:
+            for message in range(3):
+                self.broker.publish('a', message)
+
+            self.assertTrue(subscription.overflowed)
+            self.assertEqual(subscription.get(timeout=0), 0)
+
+    def test_publish_to_async_subscribers(self):
+        """Test one publish reaches thousands of idle async subscribers"""
+        async def listen():
+            subscriptions = [
+                self.broker.subscribe_async('a') for _ in range(2000)]
+            readers = [asyncio.ensure_future(subscription.get())
+                       for subscription in subscriptions]
+            await asyncio.sleep(0)
+            thread = threading.Thread(
+                target=self.broker.publish, args=('a', 'hello'))
+            thread.start()
+            messages = await asyncio.gather(*readers)
+            thread.join()
+            for subscription in subscriptions:
+                subscription.close()
+            return messages
+
+        messages = asyncio.run(listen())
+
+        self.assertEqual(messages, ['hello'] * 2000)
+        self.assertEqual(self.broker.subscriber_count('a'), 0)
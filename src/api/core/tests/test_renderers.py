@@ -0,0 +1,71 @@
+import datetime
+import io
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def assertRendersLikeDRF(self, data, media_type=None):
+        self.assertEqual(FastJSONRenderer().render(data, media_type),
+                         JSONRenderer().render(data, media_type))
+
+    def test_render_drf_types_like_json_renderer(self):
+        """Test datetimes, decimals and lazy strings match JSONRenderer"""
+        self.assertRendersLikeDRF({
+            'time': datetime.datetime(2021, 3, 1, 9, 30, 15, 123456,
+                                      tzinfo=timezone.utc),
+            'date': datetime.date(2021, 3, 1),
+            'fee': Decimal('500.50'),
+            'label': gettext_lazy('Join'),
+            1: 'integer key',
+        })
+
+    def test_escape_line_separators(self):
+        """Test U+2028 and U+2029 are escaped like JSONRenderer"""
+        self.assertRendersLikeDRF({'comment': 'a\u2028b\u2029c'})
+
+    def test_fall_back_for_big_integers(self):
+        """Test integers orjson cannot encode use JSONRenderer"""
+        self.assertRendersLikeDRF({'id': 2 ** 70})
+
+    def test_render_floats_like_json_renderer(self):
+        """Test floats with and without exponents match JSONRenderer"""
+        self.assertRendersLikeDRF({
+            'lat': 35.6640, 'distance': 0.0, 'tiny': 1.5e-7,
+            'huge': [1e16, -1e22], 'code': 'v1e2', 'image': None,
+        })
+
+    def test_reject_non_finite_floats(self):
+        """Test NaN and infinity raise like JSONRenderer"""
+        for value in (float('nan'), float('inf')):
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({'distances': [1.0, value]})
+
+    def test_fall_back_for_indent(self):
+        """Test indented output uses JSONRenderer"""
+        self.assertRendersLikeDRF({'id': 1}, 'application/json; indent=4')
+
+
+class FastJSONParserTests(SimpleTestCase):
+
+    def parse(self, content):
+        return FastJSONParser().parse(io.BytesIO(content))
+
+    def test_parse_json(self):
+        """Test parsing a UTF-8 body"""
+        self.assertEqual(self.parse('{"comment": "浅草"}'.encode()),
+                         {'comment': '浅草'})
+
+    def test_parse_error(self):
+        """Test invalid bodies raise ParseError"""
+        with self.assertRaises(ParseError):
+            self.parse(b'{"comment": ')
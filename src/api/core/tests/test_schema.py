@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import schema
+
+
+class SchemaViewTests(TestCase):
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = cache_dir.name
+        self.version = 'v1'
+        for clear in (schema._schemas.clear, schema.code_version.cache_clear):
+            clear()
+            self.addCleanup(clear)
+
+    def get(self, data=None, **headers):
+        with override_settings(CODE_VERSION=self.version,
+                               SCHEMA_CACHE_DIR=self.cache_dir):
+            schema.code_version.cache_clear()
+            return self.client.get(reverse('schema'), data, **headers)
+
+    def test_schema_generated_once(self):
+        """Test the schema is generated once, stored and revalidated"""
+        with mock.patch('core.schema.generate_schema',
+                        wraps=schema.generate_schema) as generate:
+            res = self.get()
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res['ETag'], '"v1-yaml"')
+            self.assertEqual(res['Content-Type'],
+                             'application/vnd.oai.openapi')
+            self.assertIn(b'openapi:', res.content)
+
+            cached = self.get(HTTP_IF_NONE_MATCH='"v1-yaml"')
+            self.assertEqual(cached.status_code, 304)
+
+            res = self.get({'format': 'json'})
+            self.assertEqual(res['ETag'], '"v1-json"')
+            self.assertIn('/api/events/', json.loads(res.content)['paths'])
+
+        generate.assert_called_once()
+        self.assertEqual(sorted(os.listdir(self.cache_dir)),
+                         ['v1.json', 'v1.yaml'])
+
+    def test_regenerate_on_new_version(self):
+        """Test a new code version replaces the stored schema"""
+        self.get()
+        schema._schemas.clear()
+        with mock.patch('core.schema.generate_schema') as generate:
+            self.get()
+            generate.assert_not_called()
+
+        self.version = 'v2'
+        res = self.get(HTTP_IF_NONE_MATCH='"v1-yaml"')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['ETag'], '"v2-yaml"')
+        self.assertEqual(sorted(os.listdir(self.cache_dir)),
+                         ['v2.json', 'v2.yaml'])
+
+    @override_settings(CODE_VERSION='')
+    def test_code_version_hashes_sources(self):
+        """Test the version defaults to a stable hash of the sources"""
+        version = schema.code_version()
+
+        schema.code_version.cache_clear()
+        self.assertEqual(schema.code_version(), version)
+        self.assertRegex(version, r'^[0-9a-f]{16}$')
@@ -0,0 +1,29 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+from core.models import Event
+from core.search import search_events
+
+
+class MySQLSearchTests(SimpleTestCase):
+
+    def search(self, query):
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            return search_events(Event.objects.all(), query).query
+
+    def test_require_every_term(self):
+        """Test every term is a required, quoted boolean mode phrase"""
+        sql, params = self.search('yoga "park" OR*').sql_with_params()
+
+        self.assertIn('IN BOOLEAN MODE', sql)
+        self.assertEqual(params[0], '+"yoga" +"park" +"OR*"')
+
+    def test_short_terms_use_contains(self):
+        """Test terms shorter than an ngram are matched with LIKE"""
+        sql, params = self.search('京 yoga').sql_with_params()
+
+        self.assertIn('LIKE', sql)
+        self.assertIn('+"yoga"', params)
+        self.assertIn('%京%', params)
@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.factorys import EventFactory, UserFactory
+from core.slowlog import SlowQueryRecorder, params_shape, summarize
+
+
+def entry(fingerprint, ms, view='event:event-list', explain=None):
+    return {'fingerprint': fingerprint, 'sql': fingerprint, 'ms': ms,
+            'view': view, 'explain': explain}
+
+
+class SlowQueryMiddlewareTests(TestCase):
+
+    def setUp(self):
+        SlowQueryRecorder.explained_at.clear()
+        self.client = APIClient()
+        self.event = EventFactory(organizer=UserFactory())
+        self.url = reverse('event:event-detail', args=[self.event.id])
+
+    def test_log_slow_queries(self):
+        """Test queries over the threshold are logged with an EXPLAIN"""
+        with override_settings(SLOW_QUERY_MS=0), \
+                self.assertLogs('board.slow_queries') as logs:
+            self.client.get(self.url)
+            self.client.get(self.url)
+
+        entries = [json.loads(record.getMessage())
+                   for record in logs.records]
+        first = [entry for entry in entries
+                 if 'FROM "t_event"' in entry['sql']][0]
+        self.assertEqual(first['view'], 'event:event-detail')
+        self.assertEqual(first['method'], 'GET')
+        self.assertIn('int', first['params'])
+        self.assertTrue(first['explain'])
+        # Each statement is explained once per SLOW_QUERY_EXPLAIN_SECONDS
+        explained = [entry['fingerprint'] for entry in entries
+                     if entry['explain'] is not None]
+        self.assertEqual(len(explained), len(set(explained)))
+        self.assertEqual(len(entries), 2 * len(explained))
+
+    def test_fast_queries_not_logged(self):
+        """Test queries under the threshold are not logged"""
+        with override_settings(SLOW_QUERY_MS=10000), \
+                self.assertRaises(AssertionError):
+            with self.assertLogs('board.slow_queries'):
+                self.client.get(self.url)
+
+
+class SummaryTests(SimpleTestCase):
+
+    def test_params_shape(self):
+        """Test parameter values are reduced to their types"""
+        self.assertEqual(params_shape((1, 'a', None), False),
+                         ['int', 'str', 'NoneType'])
+        self.assertEqual(params_shape([(1, 'a'), (2, 'b')], True),
+                         {'rows': 2, 'types': ['int', 'str']})
+
+    def test_summarize(self):
+        """Test entries are grouped by fingerprint, worst first"""
+        groups = summarize([
+            entry('SELECT a', 300), entry('SELECT b', 250, explain=[[1]]),
+            entry('SELECT b', 250, view='user:user-detail'),
+        ])
+
+        self.assertEqual([group['fingerprint'] for group in groups],
+                         ['SELECT b', 'SELECT a'])
+        self.assertEqual(groups[0]['count'], 2)
+        self.assertEqual(groups[0]['views'],
+                         {'event:event-list': 1, 'user:user-detail': 1})
+        self.assertEqual(groups[0]['explain'], [[1]])
+        self.assertEqual(summarize([entry('SELECT a', 300),
+                                    entry('SELECT b', 250),
+                                    entry('SELECT b', 250)],
+                                   sort='max_ms')[0]['fingerprint'],
+                         'SELECT a')
+
+    def test_command(self):
+        """Test the command reads the log and its rotated backups"""
+        with tempfile.TemporaryDirectory() as directory:
+            log = os.path.join(directory, 'slow.log')
+            for path, ms in ((log, 300), (f'{log}.1', 400)):
+                with open(path, 'w') as f:
+                    f.write(json.dumps(entry('SELECT a', ms,
+                                             explain=[['SCAN t']])) + '\n')
+            out = StringIO()
+            call_command('slow_queries', log=log, explain=True, stdout=out)
+
+        self.assertIn('2 queries', out.getvalue())
+        self.assertIn('700.0ms total', out.getvalue())
+        self.assertIn('event:event-list (2)', out.getvalue())
+        self.assertIn('["SCAN t"]', out.getvalue())
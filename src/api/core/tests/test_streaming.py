@@ -0,0 +1,84 @@
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.timezone import localtime
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.factorys import EventFactory, ParticipantFactory, UserFactory
+from core.streaming import StreamingJSONRenderer
+from event.views import EventViewSet, ParticipantView
+
+EVENT_URL = reverse('event:event-list')
+
+
+def stream_json(response):
+    return json.loads(b''.join(response.streaming_content))
+
+
+class StreamingJSONRendererTests(SimpleTestCase):
+
+    def test_render_iterators_as_arrays(self):
+        """Test iterators are written as arrays row by row"""
+        data = {'count': 2, 'results': iter([{'id': 1}, {'id': '\u2028'}])}
+        chunks = list(StreamingJSONRenderer().render_stream(data))
+
+        self.assertEqual(b''.join(chunks),
+                         b'{"count":2,"results":[{"id":1},{"id":"\\u2028"}]}')
+
+    def test_render_in_bounded_chunks(self):
+        """Test long arrays are sent as several chunks"""
+        rows = ({'text': 'x' * 1000} for _ in range(100))
+        chunks = list(StreamingJSONRenderer().render_stream(rows))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(len(json.loads(b''.join(chunks))), 100)
+
+
+class StreamingListApiTests(TestCase):
+    """Test large lists are streamed"""
+
+    def setUp(self):
+        self.organizer = UserFactory(email='testorganizer@matsuda.com')
+        self.events = [EventFactory(organizer=self.organizer)
+                       for _ in range(3)]
+        today = localtime().date()
+        self.params = {'start': today, 'end': today}
+        self.client = APIClient()
+
+    @mock.patch.object(EventViewSet, 'stream_min_rows', 2)
+    def test_stream_large_event_page(self):
+        """Test a page larger than the limit is streamed"""
+        res = self.client.get(EVENT_URL, {**self.params, 'page_size': 3})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        data = stream_json(res)
+        self.assertEqual(data['count'], 3)
+        self.assertCountEqual([event['id'] for event in data['results']],
+                              [event.id for event in self.events])
+
+    @mock.patch.object(EventViewSet, 'stream_min_rows', 2)
+    def test_not_streaming_small_event_page(self):
+        """Test a page within the limit is a normal response"""
+        res = self.client.get(EVENT_URL, {**self.params, 'page_size': 2})
+
+        self.assertFalse(res.streaming)
+        self.assertEqual(len(res.data['results']), 2)
+
+    @mock.patch.object(ParticipantView, 'stream_min_rows', 1)
+    def test_stream_participants(self):
+        """Test the unpaginated participant list is streamed"""
+        event = self.events[0]
+        users = [UserFactory(email=f'user{i}@matsuda.com') for i in range(2)]
+        for user in users:
+            ParticipantFactory(event=event, user=user)
+
+        res = self.client.get(
+            reverse('event:listCreateParticipant', args=[event.id]))
+
+        self.assertTrue(res.streaming)
+        self.assertEqual([row['user'] for row in stream_json(res)],
+                         [user.id for user in users])
@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import localtime
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.factorys import EventFactory, UserFactory
+
+EVENT_URL = reverse('event:event-list')
+
+REST_FRAMEWORK = {
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {
+        'event_list': '2/min',
+        'comment_post': '2/min',
+    }
+}
+
+
+def comment_url(event_id):
+    return reverse('event:eventComment', args=[event_id])
+
+
+@override_settings(REST_FRAMEWORK=REST_FRAMEWORK)
+class TokenBucketThrottleTests(TestCase):
+    """Test rate limiting with token buckets"""
+
+    def setUp(self):
+        self.user = UserFactory(email='testuser@matsuda.com')
+        self.other_user = UserFactory(email='testother@matsuda.com')
+        self.event = EventFactory(organizer=self.user)
+        today = localtime().date()
+        self.params = {'start': today, 'end': today}
+        self.client = APIClient()
+
+    def post_comment(self):
+        return self.client.post(comment_url(self.event.id), {'comment': 'hi'})
+
+    def test_throttle_comment_post_per_user(self):
+        """Test posting comments over the rate is throttled per user"""
+        self.client.force_authenticate(self.user)
+        for _ in range(2):
+            self.assertEqual(self.post_comment().status_code,
+                             status.HTTP_201_CREATED)
+
+        res = self.post_comment()
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '30')
+
+        self.client.force_authenticate(self.other_user)
+        self.assertEqual(self.post_comment().status_code,
+                         status.HTTP_201_CREATED)
+
+    def test_throttle_event_list_per_ip(self):
+        """Test anonymous event list requests are throttled by IP"""
+        for _ in range(2):
+            res = self.client.get(EVENT_URL, self.params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(EVENT_URL, self.params)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = self.client.get(EVENT_URL, self.params,
+                              REMOTE_ADDR='192.0.2.1')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_not_throttling_unscoped_requests(self):
+        """Test requests without a scope are never throttled"""
+        for _ in range(3):
+            res = self.client.get(comment_url(self.event.id))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_tokens_refill_over_time(self):
+        """Test a spent bucket refills at the configured rate"""
+        self.client.force_authenticate(self.user)
+        with mock.patch('core.throttling.time.time', return_value=1000.0):
+            self.post_comment()
+            self.post_comment()
+            self.assertEqual(self.post_comment().status_code,
+                             status.HTTP_429_TOO_MANY_REQUESTS)
+
+        with mock.patch('core.throttling.time.time', return_value=1030.0):
+            self.assertEqual(self.post_comment().status_code,
+                             status.HTTP_201_CREATED)
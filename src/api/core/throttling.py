@@ -0,0 +1,67 @@
+import math
+import time
+
+from django.core.cache import cache as default_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """Return (requests, seconds) of a rate like '60/min'"""
+    requests, period = rate.split('/')
+    return int(requests), DURATIONS[period[0]]
+
+
+class ScopedTokenBucketThrottle(BaseThrottle):
+    """Throttle clients with a token bucket per scope
+
+    Views map actions or lowercase HTTP methods to scopes in
+    `throttle_scopes`, rates come from DEFAULT_THROTTLE_RATES. Users are
+    limited by id and anonymous clients by IP. A bucket is one cache
+    entry read and written per request.
+    """
+    cache = default_cache
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def get_scope(self, request, view):
+        scopes = getattr(view, 'throttle_scopes', {})
+        action = getattr(view, 'action', None) or request.method.lower()
+        return scopes.get(action)
+
+    def get_cache_key(self, request, scope):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return self.cache_format % {'scope': scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+
+        capacity, duration = parse_rate(rate)
+        key = self.get_cache_key(request, scope)
+        now = time.time()
+        tokens, updated_at = self.cache.get(key, (capacity, now))
+        refill = (now - updated_at) * capacity / duration
+        tokens = min(capacity, tokens + refill)
+
+        # Concurrent requests may both spend the last token, which only
+        # lets a burst slightly over the limit and needs no lock
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+            self.wait_seconds = None
+        else:
+            self.wait_seconds = (1 - tokens) * duration / capacity
+        self.cache.set(key, (tokens, now), duration)
+        return allowed
+
+    def wait(self):
+        if self.wait_seconds is None:
+            return None
+        return math.ceil(self.wait_seconds)
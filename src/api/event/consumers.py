@@ -0,0 +1,128 @@
+import asyncio
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, transaction
+
+from core.models import Event, Participant
+from core.pubsub import broker
+
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+CLOSE_OVERFLOWED = 4408
+
+
+def participant_topic(event_id):
+    return f'event:{event_id}:participants'
+
+
+def joined_count(event_id):
+    return Participant.objects.filter(
+        event=event_id,
+        status=Participant.Status.JOIN,
+        is_active=True
+    ).count()
+
+
+def publish_participant_delta(event_id, delta):
+    """Broadcast a join (+1) or cancel (-1) after commit
+
+    The current count is sent along so clients can resync.
+    """
+    topic = participant_topic(event_id)
+
+    def publish():
+        if broker.subscriber_count(topic):
+            broker.publish(topic, {
+                'type': 'delta',
+                'delta': delta,
+                'count': joined_count(event_id),
+            })
+
+    transaction.on_commit(publish)
+
+
+def _initial_count(event_id):
+    """Return the joined count, or None if the event is not open"""
+    close_old_connections()
+    try:
+        event = Event.objects.get(pk=event_id)
+        if not event.is_valid_comment():
+            return None
+        return joined_count(event_id)
+    finally:
+        close_old_connections()
+
+
+async def _send_json(send, data):
+    await send({'type': 'websocket.send', 'text': json.dumps(data)})
+
+
+async def participant_count_consumer(scope, receive, send, event_id):
+    """Send the participant count of an event, then every join/cancel"""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    # Subscribe before counting so no change is missed in between
+    subscription = broker.subscribe_async(participant_topic(event_id))
+    receive_task = None
+    try:
+        try:
+            count = await sync_to_async(_initial_count)(event_id)
+        except Event.DoesNotExist:
+            await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+            return
+        if count is None:
+            await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+            return
+
+        await send({'type': 'websocket.accept'})
+        await _send_json(send, {'type': 'count', 'count': count})
+
+        receive_task = asyncio.ensure_future(receive())
+        while True:
+            get_task = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait(
+                {receive_task, get_task},
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if get_task not in done:
+                get_task.cancel()
+            else:
+                await _send_json(send, get_task.result())
+
+            if subscription.overflowed:
+                await send(
+                    {'type': 'websocket.close', 'code': CLOSE_OVERFLOWED})
+                return
+
+            if receive_task in done:
+                if receive_task.result()['type'] == 'websocket.disconnect':
+                    receive_task = None
+                    return
+                # Clients have nothing to say, ignore what they send
+                receive_task = asyncio.ensure_future(receive())
+    finally:
+        subscription.close()
+        if receive_task is not None:
+            receive_task.cancel()
+
+
+websocket_urlpatterns = [
+    (re.compile(r'^/ws/events/(?P<pk>\d+)/participants/$'),
+     participant_count_consumer),
+]
+
+
+async def websocket_application(scope, receive, send):
+    """Route a WebSocket connection to its consumer"""
+    for pattern, consumer in websocket_urlpatterns:
+        match = pattern.match(scope['path'])
+        if match:
+            await consumer(scope, receive, send, int(match['pk']))
+            return
+
+    await receive()
+    await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
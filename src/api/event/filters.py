@@ -0,0 +1,57 @@
+from django.db.models import Count, F, Q
+from django_filters import rest_framework as filters
+
+from core.models import Event
+from core.search import match_events
+
+FEE_FACETS = (
+    ('free', Q(fee=0)),
+    ('1-1000', Q(fee__gte=1, fee__lte=1000)),
+    ('1001-3000', Q(fee__gte=1001, fee__lte=3000)),
+    ('3001-', Q(fee__gte=3001)),
+)
+ORGANIZER_FACET_SIZE = 10
+
+
+class EventFilter(filters.FilterSet):
+    """Filter for the event list"""
+    fee_min = filters.NumberFilter(field_name='fee', lookup_expr='gte')
+    fee_max = filters.NumberFilter(field_name='fee', lookup_expr='lte')
+    free = filters.BooleanFilter(method='filter_free')
+    organizer = filters.NumberFilter(field_name='organizer_id')
+    text = filters.CharFilter(method='filter_text')
+    has_space = filters.BooleanFilter(method='filter_has_space')
+
+    class Meta:
+        model = Event
+        fields = ('fee_min', 'fee_max', 'free', 'organizer', 'text',
+                  'has_space')
+
+    def filter_free(self, queryset, name, value):
+        if value:
+            return queryset.filter(fee=0)
+        return queryset.exclude(fee=0)
+
+    def filter_has_space(self, queryset, name, value):
+        space = (Q(capacity__isnull=True) |
+                 Q(participant_count__lt=F('capacity')))
+        if value:
+            return queryset.filter(space)
+        return queryset.exclude(space)
+
+    def filter_text(self, queryset, name, value):
+        return match_events(queryset, value)
+
+
+def event_facets(queryset):
+    """Return facet counts of the events in two grouped queries"""
+    queryset = queryset.order_by()
+    fee = queryset.aggregate(**{
+        name: Count('id', filter=condition) for name, condition in FEE_FACETS
+    })
+    organizer = queryset.values('organizer').annotate(
+        count=Count('id')).order_by('-count', 'organizer')
+    return {
+        'fee': fee,
+        'organizer': list(organizer[:ORGANIZER_FACET_SIZE]),
+    }
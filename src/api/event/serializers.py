@@ -1,7 +1,13 @@
+import datetime
+
 from django.contrib.auth import get_user_model
+from django.utils.timezone import make_aware
 from rest_framework import serializers
 
 from core.models import Event, EventComment, Participant
+from core.serializers import FieldsetQuerySerializer, SparseFieldsMixin
+from event.read_serializers import ParticipantReadSerializer
+from user.serializers import ShowUserSerializer
 
 
 class ListEventCommentSerializer(serializers.ModelSerializer):
@@ -69,6 +75,9 @@ class ListCreateParticipantSerializer(serializers.ModelSerializer):
 
 class UpdateParticipantSerializer(serializers.ModelSerializer):
     """Serializer for Participant objects"""
+    # Waiting is only ever assigned by admission, never requested
+    status = serializers.ChoiceField(choices=(
+        Participant.Status.CANCEL, Participant.Status.JOIN), required=False)
 
     class Meta:
         model = Participant
@@ -82,7 +91,7 @@ class CreateEventSerializer(serializers.ModelSerializer):
         model = Event
         fields = (
             'id', 'title', 'description', 'organizer', 'image', 'event_time',
-            'address', 'fee', 'status'
+            'address', 'fee', 'status', 'capacity'
         )
         extra_kwargs = {'fee': {'default': 0}, }
 
@@ -94,15 +103,19 @@ class UpdateEventSerializer(serializers.ModelSerializer):
         model = Event
         fields = (
             'id', 'title', 'description', 'image', 'event_time', 'address',
-            'fee', 'status'
+            'fee', 'status', 'capacity'
         )
         extra_kwargs = {
             'fee': {'default': 0},
         }
 
 
-class RetrieveEventSerializer(serializers.ModelSerializer):
+class RetrieveEventSerializer(SparseFieldsMixin,
+                              serializers.ModelSerializer):
     """Serialize for Event object"""
+    PARTICIPANTS_PREVIEW_SIZE = 5
+
+    has_space = serializers.ReadOnlyField()
     organizer_full_name = serializers.ReadOnlyField(
         source="organizer.full_name")
     organizer_icon = serializers.SerializerMethodField()
@@ -115,12 +128,29 @@ class RetrieveEventSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'title', 'description', 'organizer', 'organizer_full_name',
             'organizer_icon', 'image', 'event_time', 'address', 'fee',
-            'status', 'brief_updated_at'
+            'status', 'brief_updated_at', 'capacity', 'has_space'
         )
+        expandable_fields = {
+            'organizer': lambda: ShowUserSerializer(read_only=True),
+            'participants_preview': serializers.SerializerMethodField,
+        }
+        field_columns = {
+            'organizer_full_name': (
+                'organizer__first_name', 'organizer__family_name',
+                'organizer__is_active'),
+            'organizer_icon': ('organizer__icon',),
+            'brief_updated_at': ('updated_at',),
+            'has_space': ('capacity', 'participant_count'),
+        }
+        expand_columns = {
+            'organizer': (
+                'organizer__first_name', 'organizer__family_name',
+                'organizer__is_active', 'organizer__icon',
+                'organizer__introduction', 'organizer__is_guide'),
+        }
 
     def get_organizer_icon(self, event):
-        user = get_user_model().objects.get(pk=event.organizer.id)
-        return user.icon_url
+        return event.organizer.icon_url
 
     def get_image(self, event):
         return event.image_url
@@ -131,6 +161,22 @@ class RetrieveEventSerializer(serializers.ModelSerializer):
     def get_brief_updated_at(self, event):
         return event.brief_updated_at
 
+    def get_participants_preview(self, event):
+        participants = Participant.objects.filter(
+            event=event, status=Participant.Status.JOIN, is_active=True
+        ).order_by('updated_at')
+        reader = ParticipantReadSerializer()
+        rows = reader.get_rows(participants[:self.PARTICIPANTS_PREVIEW_SIZE])
+        return {
+            'count': participants.count(),
+            'participants': reader.serialize(rows),
+        }
+
+
+class RetrieveEventQuerySerializer(FieldsetQuerySerializer):
+    """Serializer for sparse fields and expansions of an event"""
+    serializer_class = RetrieveEventSerializer
+
 
 class BriefEventSerializer(serializers.ModelSerializer):
     """Serialize for brief event object"""
@@ -158,3 +204,68 @@ class BriefEventSerializer(serializers.ModelSerializer):
                 is_active=True
             )
         return participant.count()
+
+
+class NearbyEventSerializer(BriefEventSerializer):
+    """Serialize for brief event object with its distance"""
+    # The counter kept by core.admission, not a COUNT per event
+    participant_count = serializers.IntegerField(read_only=True)
+    distance = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Event
+        fields = BriefEventSerializer.Meta.fields + (
+            'latitude', 'longitude', 'distance'
+        )
+
+
+def local_day_range(start, end):
+    """Return aware [start, end + 1 day) bounds of local dates"""
+    end = end + datetime.timedelta(days=1)
+    return (make_aware(datetime.datetime.combine(start, datetime.time())),
+            make_aware(datetime.datetime.combine(end, datetime.time())))
+
+
+class EventDateRangeSerializer(serializers.Serializer):
+    """Serializer for event date range query parameters
+
+    Adds the aware `start_time` and `end_time` bounds to compare
+    `event_time` with as a half-open interval.
+    """
+    MAX_DAYS = 93
+
+    start = serializers.DateField()
+    end = serializers.DateField()
+
+    def validate(self, data):
+        if 'start' not in data and 'end' not in data:
+            return data
+        if ('start' in data) != ('end' in data):
+            raise serializers.ValidationError(
+                'start and end must be given together')
+
+        days = (data['end'] - data['start']).days
+        if days < 0:
+            raise serializers.ValidationError('end must not be before start')
+        if days >= self.MAX_DAYS:
+            raise serializers.ValidationError(
+                f'date range must be shorter than {self.MAX_DAYS} days')
+
+        data['start_time'], data['end_time'] = local_day_range(
+            data['start'], data['end'])
+        return data
+
+
+class EventCountsQuerySerializer(EventDateRangeSerializer):
+    """Serializer for per-day event counts query parameters"""
+    MAX_DAYS = 366
+
+
+class NearbyEventQuerySerializer(EventDateRangeSerializer):
+    """Serializer for nearby event query parameters"""
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(
+        min_value=0.1, max_value=50, default=5, help_text='km')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
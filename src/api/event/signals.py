@@ -0,0 +1,74 @@
+import datetime
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import EventComment
+from core.pubsub import broker
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def comment_topic(event_id):
+    return f'event:{event_id}:comments'
+
+
+def comment_cursor(comment):
+    """Return the (updated_at in microseconds, id) position of a change"""
+    micros = (comment.updated_at - EPOCH) // datetime.timedelta(microseconds=1)
+    return micros, comment.id
+
+
+def time_cursor(when):
+    """Return the cursor before every change made from `when` on"""
+    return (when - EPOCH) // datetime.timedelta(microseconds=1), 0
+
+
+def format_cursor(cursor):
+    return '%d-%d' % cursor
+
+
+def parse_cursor(value):
+    """Return the cursor tuple of a Last-Event-ID or raise ValueError"""
+    micros, comment_id = value.split('-')
+    return int(micros), int(comment_id)
+
+
+def cursor_time(cursor):
+    return EPOCH + datetime.timedelta(microseconds=cursor[0])
+
+
+def comment_change_type(comment, created):
+    """Return the change type, clients upsert comments by id on any type"""
+    if not comment.is_active:
+        return 'deleted'
+    if created:
+        return 'created'
+    if comment.status == EventComment.Status.EDITED:
+        return 'edited'
+    return 'updated'
+
+
+def comment_message(comment, change_type):
+    from event.serializers import ListEventCommentSerializer
+
+    return {
+        'type': change_type,
+        'cursor': comment_cursor(comment),
+        'comment': ListEventCommentSerializer(comment).data,
+    }
+
+
+@receiver(post_save, sender=EventComment)
+def publish_comment(sender, instance, created, **kwargs):
+    """Publish a comment change to stream subscribers after commit"""
+    topic = comment_topic(instance.event_id)
+
+    def publish():
+        if broker.subscriber_count(topic):
+            change_type = comment_change_type(instance, created)
+            broker.publish(topic, comment_message(instance, change_type))
+
+    transaction.on_commit(publish)
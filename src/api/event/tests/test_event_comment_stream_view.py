@@ -0,0 +1,262 @@
+import json
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from faker import Faker
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.asgi import ASGIHandler
+from core.factorys import UserFactory, EventFactory, EventCommentFactory
+from core.models import EventComment
+from core.pubsub import broker
+from core.streaming import StreamSlots
+from event.signals import (comment_cursor, comment_message, comment_topic,
+                           format_cursor)
+from event.views import EventCommentStreamView
+
+
+fake = Faker()
+
+
+def stream_url(event_id):
+    """Return stream event comment URL"""
+    return reverse('event:streamComment', args=[event_id])
+
+
+def parse_events(chunks):
+    """Return (id, event, data) of the messages in SSE chunks"""
+    events = []
+    for chunk in chunks:
+        fields = dict(
+            line.split(': ', 1) for line in chunk.decode().splitlines()
+            if line and not line.startswith(':')
+        )
+        if 'data' in fields:
+            events.append(
+                (fields['id'], fields['event'], json.loads(fields['data'])))
+    return events
+
+
+@patch.object(EventCommentStreamView, 'HEARTBEAT_SECONDS', 0.01)
+@patch.object(EventCommentStreamView, 'MAX_STREAM_SECONDS', 0.05)
+class EventCommentStreamApiTests(TestCase):
+    """Test the event comment stream API"""
+
+    def setUp(self):
+        slots = patch.object(EventCommentStreamView, 'slots', StreamSlots())
+        slots.start()
+        self.addCleanup(slots.stop)
+        self.user = UserFactory(first_name=fake.first_name())
+        self.event = EventFactory(organizer=self.user)
+        self.old_comment = EventCommentFactory(
+            event=self.event, user=self.user)
+        self.client = APIClient()
+
+    def test_stream_published_comments(self):
+        """Test streaming comments published while connected"""
+        res = self.client.get(stream_url(self.event.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/event-stream')
+
+        content = iter(res.streaming_content)
+        next(content)
+        new_comment = EventCommentFactory(event=self.event, user=self.user)
+        broker.publish(comment_topic(self.event.id),
+                       comment_message(new_comment, 'created'))
+
+        events = parse_events(content)
+        self.assertEqual(len(events), 1)
+        cursor, change_type, data = events[0]
+        self.assertEqual(cursor, format_cursor(comment_cursor(new_comment)))
+        self.assertEqual(change_type, 'created')
+        self.assertEqual(data['id'], new_comment.id)
+        self.assertEqual(broker.subscriber_count(
+            comment_topic(self.event.id)), 0)
+
+    def test_stream_to_event_source(self):
+        """Test EventSource requests are accepted, and errors rendered"""
+        res = self.client.get(stream_url(self.event.id),
+                              HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/event-stream')
+        self.assertEqual(next(iter(res.streaming_content)),
+                         b'retry: 3000\n\n')
+
+        self.event.status = self.event.Status.PRIVATE.value
+        self.event.save()
+        self.client.force_authenticate(self.user)
+        res = self.client.get(stream_url(self.event.id),
+                              HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(res.content.startswith(b'event: error\ndata: {'))
+
+    def test_resume_from_last_event_id(self):
+        """Test reconnecting only sends comments changed after the cursor"""
+        new_comment = EventCommentFactory(event=self.event, user=self.user)
+        deleted_comment = EventCommentFactory(
+            event=self.event, user=self.user)
+        last_id = format_cursor(comment_cursor(self.old_comment))
+        deleted_comment.delete()
+
+        res = self.client.get(
+            stream_url(self.event.id), HTTP_LAST_EVENT_ID=last_id)
+
+        events = parse_events(res.streaming_content)
+        self.assertEqual(
+            [(data['id'], change_type) for _, change_type, data in events],
+            [(new_comment.id, 'created'), (deleted_comment.id, 'deleted')]
+        )
+
+    @patch.object(EventCommentStreamView, 'BACKLOG_LIMIT', 2)
+    def test_resume_with_backlog_over_a_page(self):
+        """Test a backlog longer than a page is sent in full"""
+        last_id = format_cursor(comment_cursor(self.old_comment))
+        new_comments = [
+            EventCommentFactory(event=self.event, user=self.user)
+            for _ in range(5)]
+
+        res = self.client.get(
+            stream_url(self.event.id), HTTP_LAST_EVENT_ID=last_id)
+
+        events = parse_events(res.streaming_content)
+        self.assertEqual([data['id'] for _, _, data in events],
+                         [comment.id for comment in new_comments])
+
+    def test_resume_from_list_cursor(self):
+        """Test a stream opened with the list cursor replays later comments"""
+        res = self.client.get(reverse('event:eventComment',
+                                      args=[self.event.id]))
+        new_comment = EventCommentFactory(event=self.event, user=self.user)
+
+        res = self.client.get(stream_url(self.event.id),
+                              {'last_id': res.data['stream_cursor']})
+
+        events = parse_events(res.streaming_content)
+        self.assertIn((new_comment.id, 'created'),
+                      [(data['id'], change_type)
+                       for _, change_type, data in events])
+
+    def test_skip_messages_already_sent(self):
+        """Test live messages older than the cursor are not sent again"""
+        last_id = format_cursor(comment_cursor(self.old_comment))
+        res = self.client.get(stream_url(self.event.id), {'last_id': last_id})
+
+        content = iter(res.streaming_content)
+        next(content)
+        broker.publish(comment_topic(self.event.id),
+                       comment_message(self.old_comment, 'created'))
+
+        self.assertEqual(parse_events(content), [])
+
+    @override_settings(COMMENT_STREAM_LIMIT=1)
+    def test_reject_streams_over_limit(self):
+        """Test streams over the limit get 503 until one is closed"""
+        first = self.client.get(stream_url(self.event.id))
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(stream_url(self.event.id))
+        self.assertEqual(res.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '30')
+
+        first.close()
+        res = self.client.get(stream_url(self.event.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res.close()
+        self.assertEqual(EventCommentStreamView.slots.open, 0)
+
+    def test_not_streaming_by_wrong_last_event_id(self):
+        """Test not streaming by a wrong Last-Event-ID"""
+        res = self.client.get(
+            stream_url(self.event.id), HTTP_LAST_EVENT_ID='test')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_not_streaming_private_event(self):
+        """Test not streaming comments of a private event"""
+        self.event.status = self.event.Status.PRIVATE.value
+        self.event.save()
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(stream_url(self.event.id))
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_publish_comment_after_commit(self):
+        """Test saving a comment publishes it once committed"""
+        with broker.subscribe(comment_topic(self.event.id)) as subscription:
+            with patch('event.signals.transaction.on_commit',
+                       lambda func: func()):
+                comment = EventCommentFactory(
+                    event=self.event, user=self.user)
+                comment.status = EventComment.Status.EDITED
+                comment.save()
+
+            created = subscription.get(timeout=0)
+            edited = subscription.get(timeout=0)
+
+        self.assertEqual(created['type'], 'created')
+        self.assertEqual(edited['type'], 'edited')
+        self.assertEqual(edited['comment']['id'], comment.id)
+
+
+@patch.object(EventCommentStreamView, 'HEARTBEAT_SECONDS', 0.01)
+class EventCommentAsyncStreamApiTests(TransactionTestCase):
+    """Test the event comment stream API served over ASGI"""
+
+    def setUp(self):
+        self.user = UserFactory(first_name=fake.first_name())
+        self.event = EventFactory(organizer=self.user)
+        self.old_comment = EventCommentFactory(
+            event=self.event, user=self.user)
+
+    @override_settings(COMMENT_STREAM_LIMIT=0)
+    def test_stream_without_slot(self):
+        """Test streaming the backlog then live comments in the loop"""
+        new_comment = EventCommentFactory(event=self.event, user=self.user)
+        last_id = format_cursor(comment_cursor(self.old_comment))
+        topic = comment_topic(self.event.id)
+        sent_message = comment_message(new_comment, 'created')
+
+        async def receive_events(communicator, count):
+            events = []
+            while len(events) < count:
+                message = await communicator.receive_output(timeout=1)
+                events += parse_events([message['body']])
+            return events
+
+        async def scenario():
+            communicator = ApplicationCommunicator(ASGIHandler(), {
+                'type': 'http', 'method': 'GET',
+                'path': stream_url(self.event.id),
+                'query_string': f'last_id={last_id}'.encode(),
+                'headers': [],
+            })
+            await communicator.send_input({'type': 'http.request'})
+            start = await communicator.receive_output(timeout=1)
+            backlog = await receive_events(communicator, 1)
+            broker.publish(topic, sent_message)
+            live_comment = await sync_to_async(EventCommentFactory)(
+                event=self.event, user=self.user)
+            live = await receive_events(communicator, 1)
+            subscribers = broker.subscriber_count(topic)
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait(timeout=1)
+            return start, backlog, live_comment, live, subscribers
+
+        start, backlog, live_comment, live, subscribers = async_to_sync(
+            scenario)()
+
+        self.assertEqual(start['status'], status.HTTP_200_OK)
+        self.assertIn((b'Content-Type', b'text/event-stream'),
+                      start['headers'])
+        self.assertEqual([data['id'] for _, _, data in backlog],
+                         [new_comment.id])
+        self.assertEqual([(change_type, data['id'])
+                          for _, change_type, data in live],
+                         [('created', live_comment.id)])
+        self.assertEqual(subscribers, 1)
+        self.assertEqual(broker.subscriber_count(topic), 0)
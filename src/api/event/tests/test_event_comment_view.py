@@ -1,15 +1,19 @@
 import datetime
+from unittest.mock import patch
 
 from faker import Faker
 
 from django.test import TestCase
 from django.urls import reverse
-from django.utils.timezone import localtime, make_aware
+from django.utils.timezone import localtime, make_aware, now
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core.budgets import budget
 from core.models import Event, EventComment
 from core.factorys import UserFactory, EventFactory, EventCommentFactory
+from event.signals import format_cursor, time_cursor
+from event.views import EventCommentListSetPagination
 
 
 fake = Faker()
@@ -63,10 +67,13 @@ class PublicEventCommentApiTests(TestCase):
         self.deleted_comment.refresh_from_db()
         self.client = APIClient()
 
+    @budget(queries=3)
     def test_retrieve_event_comment_success(self):
         """Test retrieving event comments"""
         url = detail_url(self.event.id)
-        res = self.client.get(url, {'page': 1})
+        read_at = now()
+        with patch('event.views.now', return_value=read_at):
+            res = self.client.get(url, {'page': 1})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
         event_comments = EventComment.objects.all().order_by('updated_at')
@@ -88,10 +95,13 @@ class PublicEventCommentApiTests(TestCase):
             "count": len(event_comments),
             "next": None,
             "previous": None,
+            "stream_cursor": format_cursor(time_cursor(
+                read_at - EventCommentListSetPagination.STREAM_CURSOR_MARGIN)),
             "results": expected_json_dict_list
         }
         self.assertJSONEqual(res.content, expected_json)
 
+    @budget(queries=3)
     def test_retrieve_event_comment_pagination_success(self):
         """Test retrieving event comments with pagination"""
         count = 0
@@ -110,6 +120,19 @@ class PublicEventCommentApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(len(res.data['results']), 2)
 
+    @budget(queries=3)
+    def test_retrieve_comments_of_many_users(self):
+        """Test a page of comments by different users takes no more queries"""
+        for _ in range(15):
+            EventCommentFactory(event=self.event,
+                                user=UserFactory(email=fake.safe_email()))
+
+        res = self.client.get(detail_url(self.event.id), {'page': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len({comment['user']
+                              for comment in res.data['results']}), 14)
+
     def test_retrieve_event_comment_pagination_false(self):
         """Test retrieving event comments false with pagination"""
         url = detail_url(self.event.id)
@@ -179,6 +202,7 @@ class PrivateEventCommentApiTests(TestCase):
         )
         self.client.force_authenticate(self.organizer)
 
+    @budget(queries=4)
     def test_create_event_comment_successful(self):
         """Test creating a new event comment"""
         str_comment = fake.text(max_nb_chars=500)
@@ -1,21 +1,28 @@
 import datetime
 import tempfile
 from datetime import timedelta
+from unittest import mock
 
 from faker import Faker
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from django.utils.timezone import make_aware
+from django.utils.timezone import localtime, make_aware
 from PIL import Image
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core.budgets import budget
 from core.models import Event
-from core.factorys import UserFactory, EventFactory
+from core.factorys import UserFactory, EventFactory, ParticipantFactory
 
 EVENT_URL = reverse('event:event-list')
+SEARCH_URL = reverse('event:event-search')
+NEARBY_URL = reverse('event:event-nearby')
+COUNTS_URL = reverse('event:event-counts')
 
 
 fake = Faker()
@@ -46,6 +53,7 @@ def get_event_by_json(**params):
     return expected_json_dict
 
 
+@budget(queries=3, ms=300)
 class PublicParticipantApiTests(TestCase):
     """Test that publcly available participant API"""
 
@@ -177,6 +185,34 @@ class PublicParticipantApiTests(TestCase):
         res = self.client.get(EVENT_URL, {'start': today})
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_retrieving_events_by_local_day_boundaries(self):
+        """Test the range includes whole local days and nothing after"""
+        day = datetime.date(2021, 3, 1)
+        last_event = EventFactory(
+            organizer=self.organizer,
+            event_time=make_aware(datetime.datetime(2021, 3, 1, 23, 59, 59))
+        )
+        EventFactory(
+            organizer=self.organizer,
+            event_time=make_aware(datetime.datetime(2021, 3, 2, 0, 0, 0))
+        )
+        res = self.client.get(EVENT_URL, {'start': day, 'end': day})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [event['id'] for event in res.data['results']]
+        self.assertEqual(ids, [last_event.id])
+
+    def test_not_retrieving_events_by_too_long_range(self):
+        """Test not retrieving events by a too long or reversed range"""
+        today = datetime.date.today()
+        res = self.client.get(
+            EVENT_URL, {'start': today, 'end': today + timedelta(days=93)})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(
+            EVENT_URL, {'start': today, 'end': today - timedelta(days=1)})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_retrieve_event_success(self):
         """Test retrieving event"""
         url = detail_url(self.second_event.id)
@@ -198,7 +234,9 @@ class PublicParticipantApiTests(TestCase):
             'address': event.address,
             'fee': event.fee,
             'status': event.status,
-            'brief_updated_at': event.brief_updated_at
+            'brief_updated_at': event.brief_updated_at,
+            'capacity': None,
+            'has_space': True
         }
         self.assertJSONEqual(res.content, expected_json_dict)
 
@@ -238,6 +276,7 @@ class PublicParticipantApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+@budget(queries=3, ms=500)
 class PrivateParticipantApiTests(TestCase):
     """Test the authorized user event API"""
 
@@ -307,6 +346,7 @@ class PrivateParticipantApiTests(TestCase):
         res = self.client.delete(url)
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
 
+    @budget(queries=6, ms=500)
     def test_update_event_successful(self):
         """Test updating an event successful"""
         with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
@@ -344,3 +384,442 @@ class PrivateParticipantApiTests(TestCase):
         url = detail_url(self.event.id)
         res = self.client.patch(url, payload)
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@budget(queries=3, ms=300)
+class EventSearchApiTests(TransactionTestCase):
+    """Test the event full-text search API
+
+    InnoDB only indexes committed rows for FULLTEXT search, so the events
+    must be committed.
+    """
+
+    def setUp(self):
+        self.organizer = UserFactory(email='testorganizer@matsuda.com')
+        self.title_event = EventFactory(
+            organizer=self.organizer,
+            title='Morning yoga in the park',
+            description='Bring your own mat',
+            address='Yoyogi park'
+        )
+        self.description_event = EventFactory(
+            organizer=self.organizer,
+            title='Sunday meetup',
+            description='We walk and then do some yoga together',
+            address='Shibuya'
+        )
+        self.other_event = EventFactory(
+            organizer=self.organizer,
+            title='Board game night',
+            description='Play board games',
+            address='Shinjuku'
+        )
+        self.client = APIClient()
+
+    def test_search_events_ranked_by_title(self):
+        """Test searching events ranks title matches first"""
+        res = self.client.get(SEARCH_URL, {'q': 'yoga'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 2)
+        ids = [event['id'] for event in res.data['results']]
+        self.assertEqual(ids, [self.title_event.id,
+                               self.description_event.id])
+
+    def test_search_events_by_address(self):
+        """Test searching events by address"""
+        res = self.client.get(SEARCH_URL, {'q': 'Shinjuku'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [event['id'] for event in res.data['results']]
+        self.assertEqual(ids, [self.other_event.id])
+
+    def test_search_excludes_private_and_deleted_events(self):
+        """Test not searching private or deleted events"""
+        self.title_event.status = Event.Status.PRIVATE.value
+        self.title_event.save()
+        self.description_event.delete()
+
+        res = self.client.get(SEARCH_URL, {'q': 'yoga'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 0)
+
+    def test_search_index_follows_updates(self):
+        """Test the index is updated with the event"""
+        self.other_event.title = 'Karaoke night'
+        self.other_event.save()
+
+        res = self.client.get(SEARCH_URL, {'q': 'karaoke'})
+        ids = [event['id'] for event in res.data['results']]
+        self.assertEqual(ids, [self.other_event.id])
+
+        self.other_event.title = 'Board game night'
+        self.other_event.save()
+        res = self.client.get(SEARCH_URL, {'q': 'karaoke'})
+        self.assertEqual(res.data['count'], 0)
+
+    def test_search_index_follows_physical_delete(self):
+        """Test the index forgets physically deleted events"""
+        Event.objects.filter(id=self.other_event.id).delete()
+
+        res = self.client.get(SEARCH_URL, {'q': 'board'})
+
+        self.assertEqual(res.data['count'], 0)
+
+    def test_search_with_syntax_characters(self):
+        """Test search terms are not parsed as query syntax"""
+        res = self.client.get(SEARCH_URL, {'q': 'yoga" OR *'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_search_short_terms(self):
+        """Test searching terms shorter than a trigram"""
+        event = EventFactory(organizer=self.organizer, title='朝ヨガ')
+
+        res = self.client.get(SEARCH_URL, {'q': 'ヨガ'})
+        ids = [event['id'] for event in res.data['results']]
+        self.assertEqual(ids, [event.id])
+
+        res = self.client.get(SEARCH_URL, {'q': 'yoga ヨガ'})
+        self.assertEqual(res.data['count'], 0)
+
+    def test_search_without_full_text_index(self):
+        """Test searching falls back to contains on other databases"""
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                CaptureQueriesContext(connection) as queries:
+            res = self.client.get(SEARCH_URL, {'q': 'YOGA park'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('t_event_fts', queries[0]['sql'])
+        ids = [event['id'] for event in res.data['results']]
+        self.assertEqual(ids, [self.title_event.id])
+
+    def test_search_pagination(self):
+        """Test searching events with pagination"""
+        res = self.client.get(SEARCH_URL, {'q': 'yoga', 'page_size': 1})
+
+        self.assertEqual(res.data['count'], 2)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_search_without_query(self):
+        """Test not searching events without query"""
+        res = self.client.get(SEARCH_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(SEARCH_URL, {'q': 'a' * 101})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@budget(queries=1, ms=300)
+class EventNearbyApiTests(TestCase):
+    """Test the nearby event API"""
+
+    def setUp(self):
+        self.organizer = UserFactory(email='testorganizer@matsuda.com')
+        self.shibuya_event = EventFactory(
+            organizer=self.organizer, address='Shibuya')
+        self.shinjuku_event = EventFactory(
+            organizer=self.organizer, address='Shinjuku')
+        self.osaka_event = EventFactory(
+            organizer=self.organizer, address='Osaka')
+        self.unknown_event = EventFactory(
+            organizer=self.organizer, address='nowhere')
+        self.client = APIClient()
+
+    def test_retrieve_nearby_events_ordered_by_distance(self):
+        """Test retrieving events within a radius by distance"""
+        res = self.client.get(
+            NEARBY_URL, {'lat': 35.6640, 'lng': 139.6982, 'radius': 10})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [event['id'] for event in res.data['results']]
+        self.assertEqual(ids, [self.shibuya_event.id,
+                               self.shinjuku_event.id])
+        self.assertEqual(res.data['results'][0]['distance'], 0)
+        self.assertAlmostEqual(
+            res.data['results'][1]['distance'], 3.3, delta=0.1)
+
+    def test_retrieve_nearby_events_with_participant_count(self):
+        """Test nearby events report their joined participant count"""
+        Event.objects.filter(id=self.shibuya_event.id).update(
+            participant_count=2)
+
+        res = self.client.get(
+            NEARBY_URL, {'lat': 35.6640, 'lng': 139.6982, 'radius': 10})
+
+        self.assertEqual(
+            [event['participant_count'] for event in res.data['results']],
+            [2, 0])
+
+    def test_retrieve_nearby_events_in_date_range(self):
+        """Test combining nearby events with a date range"""
+        self.shinjuku_event.event_time = make_aware(
+            datetime.datetime.now() + datetime.timedelta(days=3))
+        self.shinjuku_event.save()
+        today = localtime().date()
+        res = self.client.get(NEARBY_URL, {
+            'lat': 35.6640, 'lng': 139.6982, 'radius': 10,
+            'start': today, 'end': today
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [event['id'] for event in res.data['results']]
+        self.assertEqual(ids, [self.shibuya_event.id])
+
+    def test_not_retrieving_private_nearby_events(self):
+        """Test not retrieving private or deleted events"""
+        self.shibuya_event.status = Event.Status.PRIVATE.value
+        self.shibuya_event.save()
+        self.shinjuku_event.delete()
+
+        res = self.client.get(
+            NEARBY_URL, {'lat': 35.6640, 'lng': 139.6982, 'radius': 10})
+
+        self.assertEqual(res.data['count'], 0)
+
+    def test_not_retrieving_nearby_events_by_wrong_parameters(self):
+        """Test not retrieving nearby events by wrong parameters"""
+        res = self.client.get(NEARBY_URL, {'lat': 35.6640})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(
+            NEARBY_URL, {'lat': 35.6640, 'lng': 139.6982, 'radius': 500})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(NEARBY_URL, {
+            'lat': 35.6640, 'lng': 139.6982, 'start': datetime.date.today()
+        })
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@budget(queries=3, ms=300)
+class EventFilterApiTests(TransactionTestCase):
+    """Test filtering the event list
+
+    Committed like EventSearchApiTests, as the text filter is full-text.
+    """
+
+    def setUp(self):
+        self.organizer = UserFactory(email='testorganizer@matsuda.com')
+        self.other_organizer = UserFactory(email='testother@matsuda.com')
+        self.free_event = EventFactory(
+            organizer=self.organizer, fee=0, title='Free walk')
+        self.cheap_event = EventFactory(
+            organizer=self.organizer, fee=800, title='Tea ceremony')
+        self.expensive_event = EventFactory(
+            organizer=self.other_organizer, fee=5000, title='Sushi dinner')
+        today = localtime().date()
+        self.params = {'start': today, 'end': today}
+        self.client = APIClient()
+
+    def get_ids(self, **params):
+        res = self.client.get(EVENT_URL, {**self.params, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [event['id'] for event in res.data['results']]
+
+    def test_filter_events_by_fee_range(self):
+        """Test filtering events by fee range"""
+        self.assertEqual(self.get_ids(fee_min=500, fee_max=1000),
+                         [self.cheap_event.id])
+
+    def test_filter_free_events(self):
+        """Test filtering free events"""
+        self.assertEqual(self.get_ids(free='true'), [self.free_event.id])
+
+    def test_filter_events_by_organizer(self):
+        """Test filtering events by organizer"""
+        self.assertEqual(self.get_ids(organizer=self.other_organizer.id),
+                         [self.expensive_event.id])
+
+    def test_filter_events_by_text(self):
+        """Test filtering events by contained text"""
+        self.assertEqual(self.get_ids(text='sushi'),
+                         [self.expensive_event.id])
+
+    @budget(queries=5, ms=300)
+    def test_filter_events_by_text_and_facets(self):
+        """Test text filtered events are counted in the facets"""
+        res = self.client.get(
+            EVENT_URL, {**self.params, 'text': 'ceremony', 'facets': 'true'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['id'] for event in res.data['results']],
+                         [self.cheap_event.id])
+        self.assertEqual(res.data['facets']['fee']['1-1000'], 1)
+
+    def test_not_filtering_retrieved_event(self):
+        """Test list filters are ignored when retrieving an event"""
+        res = self.client.get(detail_url(self.free_event.id),
+                              {'fee_min': 99999})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], self.free_event.id)
+
+    def test_filter_events_with_space(self):
+        """Test filtering events that still have free seats"""
+        Event.objects.filter(id=self.free_event.id).update(
+            capacity=1, participant_count=1)
+        Event.objects.filter(id=self.cheap_event.id).update(
+            capacity=2, participant_count=1)
+
+        self.assertCountEqual(self.get_ids(has_space='true'),
+                              [self.cheap_event.id, self.expensive_event.id])
+        self.assertEqual(self.get_ids(has_space='false'),
+                         [self.free_event.id])
+
+    def test_not_filtering_events_by_wrong_value(self):
+        """Test not filtering events by wrong value"""
+        res = self.client.get(EVENT_URL, {**self.params, 'fee_min': 'test'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @budget(queries=5, ms=300)
+    def test_retrieve_event_facets(self):
+        """Test retrieving facet counts with the event list"""
+        res = self.client.get(
+            EVENT_URL, {**self.params, 'fee_max': 1000, 'facets': 'true'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['facets']['fee'], {
+            'free': 1, '1-1000': 1, '1001-3000': 0, '3001-': 0
+        })
+        self.assertEqual(res.data['facets']['organizer'], [
+            {'organizer': self.organizer.id, 'count': 2}
+        ])
+
+
+@budget(queries=1, ms=300)
+class EventCountsApiTests(TestCase):
+    """Test the per-day event counts API"""
+
+    def setUp(self):
+        self.organizer = UserFactory(email='testorganizer@matsuda.com')
+        self.today = localtime().date()
+        self.tomorrow = self.today + timedelta(days=1)
+        EventFactory(organizer=self.organizer)
+        EventFactory(organizer=self.organizer)
+        EventFactory(
+            organizer=self.organizer,
+            event_time=localtime() + timedelta(days=1)
+        )
+        EventFactory(
+            organizer=self.organizer,
+            status=Event.Status.PRIVATE.value
+        )
+        self.client = APIClient()
+
+    def test_retrieve_event_counts_per_day(self):
+        """Test retrieving the number of events per day"""
+        res = self.client.get(
+            COUNTS_URL, {'start': self.today, 'end': self.tomorrow})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'date': self.today.isoformat(), 'count': 2},
+            {'date': self.tomorrow.isoformat(), 'count': 1},
+        ])
+        self.assertIn('max-age', res['Cache-Control'])
+
+    def test_retrieve_event_counts_by_local_date(self):
+        """Test events around midnight are counted on their local date"""
+        day = self.today + timedelta(days=10)
+        midnight = make_aware(datetime.datetime.combine(day, datetime.time()))
+        EventFactory(organizer=self.organizer,
+                     event_time=midnight - timedelta(minutes=30))
+        EventFactory(organizer=self.organizer,
+                     event_time=midnight + timedelta(minutes=30))
+
+        res = self.client.get(
+            COUNTS_URL, {'start': day - timedelta(days=1), 'end': day})
+
+        self.assertEqual(res.data, [
+            {'date': (day - timedelta(days=1)).isoformat(), 'count': 1},
+            {'date': day.isoformat(), 'count': 1},
+        ])
+
+    def test_event_counts_follow_event_changes(self):
+        """Test cached counts are refreshed when an event changes"""
+        params = {'start': self.today, 'end': self.today}
+        res = self.client.get(COUNTS_URL, params)
+        self.assertEqual(res.data[0]['count'], 2)
+        with self.assertNumQueries(0):
+            self.client.get(COUNTS_URL, params)
+
+        EventFactory(organizer=self.organizer)
+        res = self.client.get(COUNTS_URL, params)
+        self.assertEqual(res.data[0]['count'], 3)
+
+    def test_not_retrieving_event_counts_by_wrong_range(self):
+        """Test not retrieving counts by a wrong or too long range"""
+        res = self.client.get(
+            COUNTS_URL, {'start': self.tomorrow, 'end': self.today})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(COUNTS_URL, {
+            'start': self.today, 'end': self.today + timedelta(days=400)
+        })
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(COUNTS_URL, {'start': 'test', 'end': 'test'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@budget(queries=1, ms=300)
+class EventFieldsetApiTests(TestCase):
+    """Test sparse fieldsets and expansions of an event"""
+
+    def setUp(self):
+        self.organizer = UserFactory(email='testorganizer@matsuda.com',
+                                     first_name='taro')
+        self.user = UserFactory(email='testuser@matsuda.com')
+        self.event = EventFactory(organizer=self.organizer)
+        ParticipantFactory(event=self.event, user=self.user)
+        self.client = APIClient()
+
+    def test_retrieve_sparse_fields(self):
+        """Test retrieving only the requested fields"""
+        res = self.client.get(detail_url(self.event.id),
+                              {'fields': 'title,event_time'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'title': self.event.title,
+            'event_time': self.event.brief_event_time,
+        })
+
+    def test_retrieve_event_in_one_query(self):
+        """Test organizer fields are read in the event query"""
+        with self.assertNumQueries(1):
+            res = self.client.get(detail_url(self.event.id), {
+                'fields': 'title,organizer_full_name,organizer_icon'})
+
+        self.assertEqual(res.data['organizer_full_name'], 'taro')
+
+    def test_expand_organizer(self):
+        """Test embedding the organizer"""
+        res = self.client.get(detail_url(self.event.id),
+                              {'fields': 'id', 'expand': 'organizer'})
+
+        self.assertEqual(res.data['organizer']['id'], self.organizer.id)
+        self.assertEqual(res.data['organizer']['short_name'], 'taro')
+
+    @budget(queries=3, ms=300)
+    def test_expand_participants_preview(self):
+        """Test embedding a preview of the participants"""
+        res = self.client.get(detail_url(self.event.id),
+                              {'expand': 'participants_preview'})
+
+        preview = res.data['participants_preview']
+        self.assertEqual(preview['count'], 1)
+        self.assertEqual([row['user'] for row in preview['participants']],
+                         [self.user.id])
+
+    def test_not_retrieving_unknown_fields(self):
+        """Test unknown fields and expansions are rejected"""
+        res = self.client.get(detail_url(self.event.id),
+                              {'fields': 'title,secret'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(detail_url(self.event.id), {'expand': 'fee'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
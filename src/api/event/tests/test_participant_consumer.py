@@ -0,0 +1,107 @@
+import json
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from faker import Faker
+
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.factorys import UserFactory, EventFactory, ParticipantFactory
+from core.models import Event
+from core.pubsub import broker
+from event.consumers import (CLOSE_FORBIDDEN, CLOSE_NOT_FOUND,
+                             participant_topic, websocket_application)
+
+
+fake = Faker()
+
+
+def participant_path(event_id):
+    """Return participant count WebSocket path"""
+    return f'/ws/events/{event_id}/participants/'
+
+
+async def connect(path):
+    communicator = ApplicationCommunicator(
+        websocket_application, {'type': 'websocket', 'path': path})
+    await communicator.send_input({'type': 'websocket.connect'})
+    return communicator
+
+
+async def receive_json(communicator):
+    message = await communicator.receive_output(timeout=1)
+    return json.loads(message['text'])
+
+
+class ParticipantConsumerTests(TransactionTestCase):
+    """Test the participant count WebSocket channel"""
+
+    def setUp(self):
+        self.organizer = UserFactory(email=fake.safe_email())
+        self.follower = UserFactory(email=fake.safe_email())
+        self.event = EventFactory(organizer=self.organizer)
+        ParticipantFactory(event=self.event, user=self.organizer)
+        self.client = APIClient()
+        self.client.force_authenticate(self.follower)
+
+    def test_receive_count_and_deltas(self):
+        """Test receiving the count then join and cancel deltas"""
+        join_url = reverse('event:listCreateParticipant', args=[self.event.id])
+        cancel_url = reverse('event:cancelParticipant', args=[self.event.id])
+
+        async def scenario():
+            communicator = await connect(participant_path(self.event.id))
+            accept = await communicator.receive_output(timeout=1)
+            count = await receive_json(communicator)
+
+            await sync_to_async(self.client.post)(join_url)
+            joined = await receive_json(communicator)
+            await sync_to_async(self.client.patch)(cancel_url)
+            canceled = await receive_json(communicator)
+
+            await communicator.send_input(
+                {'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait(timeout=1)
+            return accept, count, joined, canceled
+
+        accept, count, joined, canceled = async_to_sync(scenario)()
+
+        self.assertEqual(accept, {'type': 'websocket.accept'})
+        self.assertEqual(count, {'type': 'count', 'count': 1})
+        self.assertEqual(joined, {'type': 'delta', 'delta': 1, 'count': 2})
+        self.assertEqual(canceled, {'type': 'delta', 'delta': -1, 'count': 1})
+        self.assertEqual(
+            broker.subscriber_count(participant_topic(self.event.id)), 0)
+
+    def test_not_broadcasting_unchanged_status(self):
+        """Test joining again does not send a delta"""
+        self.client.force_authenticate(self.organizer)
+        url = reverse('event:joinParticipant', args=[self.event.id])
+        with patch('event.views.publish_participant_delta') as publish:
+            self.client.patch(url)
+
+        publish.assert_not_called()
+
+    def test_close_private_event(self):
+        """Test closing the channel of a private event"""
+        self.event.status = Event.Status.PRIVATE.value
+        self.event.save()
+
+        async def scenario():
+            communicator = await connect(participant_path(self.event.id))
+            return await communicator.receive_output(timeout=1)
+
+        self.assertEqual(async_to_sync(scenario)(),
+                         {'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+
+    def test_close_unknown_path(self):
+        """Test closing a connection to an unknown path"""
+        async def scenario():
+            communicator = await connect('/ws/unknown/')
+            return await communicator.receive_output(timeout=1)
+
+        self.assertEqual(async_to_sync(scenario)(),
+                         {'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
@@ -236,3 +236,79 @@ class PrivateParticipantApiTests(TestCase):
 
         self.assertEqual(self.participant.status,
                         Participant.Status.JOIN.value)
+
+
+class ParticipantCapacityApiTests(TestCase):
+    """Test joining events with a capacity"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.organizer = UserFactory(email=fake.safe_email())
+        self.first_user = UserFactory(email=fake.safe_email())
+        self.second_user = UserFactory(email=fake.safe_email())
+        self.event = EventFactory(organizer=self.organizer, capacity=1)
+
+    def join(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(listCreate_url(self.event.id))
+
+    def test_join_full_event_waits(self):
+        """Test joining a full event puts the user on the waitlist"""
+        res = self.join(self.first_user)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['status'], Participant.Status.JOIN)
+
+        res = self.join(self.second_user)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['status'], Participant.Status.WAITING)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participant_count, 1)
+        self.assertFalse(self.event.has_space)
+
+    def test_cancel_promotes_waiting_participant(self):
+        """Test canceling a seat admits the first waiting participant"""
+        self.join(self.first_user)
+        self.join(self.second_user)
+
+        self.client.force_authenticate(self.first_user)
+        res = self.client.patch(cancel_url(self.event.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        waiting = Participant.objects.get(
+            event=self.event, user=self.second_user)
+        self.assertEqual(waiting.status, Participant.Status.JOIN)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participant_count, 1)
+
+    def test_rejoin_full_event_waits(self):
+        """Test joining again after canceling waits if the event is full"""
+        self.join(self.first_user)
+        self.client.patch(cancel_url(self.event.id))
+        self.join(self.second_user)
+
+        self.client.force_authenticate(self.first_user)
+        res = self.client.patch(join_url(self.event.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], Participant.Status.WAITING)
+
+    def test_raising_capacity_promotes_waiting_participant(self):
+        """Test raising the capacity admits waiting participants"""
+        self.join(self.first_user)
+        self.join(self.second_user)
+
+        self.client.force_authenticate(self.organizer)
+        res = self.client.patch(
+            reverse('event:event-detail', args=[self.event.id]), {
+                'title': self.event.title,
+                'description': self.event.description,
+                'event_time': self.event.event_time,
+                'address': self.event.address,
+                'fee': self.event.fee,
+                'capacity': 2
+            })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        waiting = Participant.objects.get(
+            event=self.event, user=self.second_user)
+        self.assertEqual(waiting.status, Participant.Status.JOIN)
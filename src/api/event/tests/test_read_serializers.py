@@ -0,0 +1,74 @@
+from django.test import TestCase
+
+from core.factorys import (EventCommentFactory, EventFactory,
+                           ParticipantFactory, UserFactory)
+from core.models import Event, EventComment, Participant
+from event.read_serializers import (BriefEventReadSerializer,
+                                    EventCommentReadSerializer,
+                                    ParticipantReadSerializer,
+                                    ValuesSerializer)
+from event.serializers import (BriefEventSerializer,
+                               ListCreateParticipantSerializer,
+                               ListEventCommentSerializer)
+
+
+class ReadSerializerTests(TestCase):
+    """Test read serializers match the model serializers"""
+
+    def setUp(self):
+        self.organizer = UserFactory(email='testorganizer@matsuda.com',
+                                     first_name='taro')
+        self.family_only = UserFactory(email='testfamily@matsuda.com',
+                                       family_name='yamada')
+        self.deleted_user = UserFactory(email='testdeleted@matsuda.com',
+                                        first_name='jiro', is_active=False)
+        self.event = EventFactory(organizer=self.organizer)
+        self.image_event = EventFactory(organizer=self.organizer,
+                                        image='event/test.jpg')
+        for user in (self.organizer, self.family_only, self.deleted_user):
+            ParticipantFactory(event=self.event, user=user)
+            EventCommentFactory(event=self.event, user=user)
+        ParticipantFactory(event=self.image_event, user=self.organizer,
+                           status=Participant.Status.CANCEL)
+        comment = EventComment.objects.filter(user=self.organizer).get()
+        comment.status = EventComment.Status.EDITED
+        comment.save()
+
+    def assertSameOutput(self, reader, serializer_class, queryset):
+        rows = list(reader.get_rows(queryset))
+        self.assertEqual(
+            reader.serialize(rows),
+            [dict(data) for data in serializer_class(queryset, many=True).data]
+        )
+
+    def test_brief_event_output(self):
+        """Test events match BriefEventSerializer"""
+        self.assertSameOutput(BriefEventReadSerializer(),
+                              BriefEventSerializer, Event.objects.all())
+
+    def test_event_comment_output(self):
+        """Test comments match ListEventCommentSerializer"""
+        self.assertSameOutput(EventCommentReadSerializer(),
+                              ListEventCommentSerializer,
+                              EventComment.objects.all())
+
+    def test_participant_output(self):
+        """Test participants match ListCreateParticipantSerializer"""
+        self.assertSameOutput(ParticipantReadSerializer(),
+                              ListCreateParticipantSerializer,
+                              Participant.objects.filter(event=self.event))
+
+    def test_brief_event_queries(self):
+        """Test a batch of events takes one query for participant counts"""
+        rows = list(BriefEventReadSerializer().get_rows(Event.objects.all()))
+        with self.assertNumQueries(1):
+            BriefEventReadSerializer().serialize(rows)
+
+    def test_values_output(self):
+        """Test rows are returned as they are by default"""
+        reader = ValuesSerializer()
+        reader.values = ('id', 'title')
+        rows = reader.get_rows(Event.objects.filter(id=self.event.id))
+
+        self.assertEqual(reader.serialize(rows),
+                         [{'id': self.event.id, 'title': self.event.title}])
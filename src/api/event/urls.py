@@ -18,6 +18,8 @@ urlpatterns = [
          views.ParticipantView.as_view(), name='joinParticipant'),
     path('<int:pk>/comments/',
          views.EventCommentView.as_view(), name='eventComment'),
+    path('<int:pk>/comments/stream/',
+         views.EventCommentStreamView.as_view(), name='streamComment'),
     path('<int:event_id>/comments/<int:comment_id>/status/',
          views.EventCommentView.as_view(), name='statusComment'),
     path('<int:event_id>/comments/<int:comment_id>/delete/',
@@ -1,25 +1,88 @@
+import asyncio
 import datetime
-
+import json
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, Q
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.timezone import localtime, now
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, mixins, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAdminUser 
 from rest_framework.response import Response
 
+from core.admission import admission_status, admit_waitlist, release_seat
+from core.functions import LocalDate
+from core.geo import nearby_events
+from core.idempotency import idempotent
+from core.metrics import MetricsMixin, record_cache
 from core.models import Event, EventComment, Participant
+from core.pubsub import broker
+from core.renderers import EventStreamRenderer, FastJSONRenderer
+from core.signals import get_event_counts_version
 from core.permissions import (IsEventAttributeOwnerOnly, IsEventOwnerOnly,
                               IsGuideOnly, IsValidEvent)
-from event import serializers
-
-
-class EventListSetPagination(PageNumberPagination):
+from core.search import search_events
+from core.streaming import (AsyncStreamingHttpResponse,
+                            LazyPageNumberPagination, ReleasingIterator,
+                            StreamingListMixin, StreamSlots)
+from event import read_serializers, serializers
+from event.consumers import publish_participant_delta
+from event.filters import EventFilter, event_facets
+from event.signals import (comment_change_type, comment_message,
+                           comment_topic, cursor_time, format_cursor,
+                           parse_cursor, time_cursor)
+
+
+class EventListSetPagination(LazyPageNumberPagination):
     page_size = 30
     page_size_query_param = 'page_size'
 
 
 class EventCommentListSetPagination(PageNumberPagination):
+    """Paginate comments with the cursor to open their stream from
+
+    A stream opened with `last_id` set to `stream_cursor` replays the
+    comments changed since the list was read. The cursor is set back by
+    STREAM_CURSOR_MARGIN for comments committed after they were saved,
+    clients upsert comments by id so those arrive twice harmlessly.
+    """
     page_size = 15
     page_size_query_param = 'page_size'
+    STREAM_CURSOR_MARGIN = datetime.timedelta(seconds=5)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Taken before the comments are read
+        self.stream_cursor = format_cursor(
+            time_cursor(now() - self.STREAM_CURSOR_MARGIN))
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('stream_cursor', self.stream_cursor),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['stream_cursor'] = {
+            'type': 'string',
+            'example': '1603000000000000-0',
+        }
+        return schema
 
 
 class UnlimitedtPagination(PageNumberPagination):
@@ -27,13 +90,19 @@ class UnlimitedtPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
 
 
-class ParticipantView(generics.GenericAPIView,
+class ParticipantView(MetricsMixin, StreamingListMixin,
+                      generics.GenericAPIView,
                       mixins.ListModelMixin,
                       mixins.CreateModelMixin,
                       mixins.UpdateModelMixin,
                       mixins.DestroyModelMixin
                       ):
+    """Manage participants of an event"""
     pagination_class = UnlimitedtPagination
+    throttle_scopes = {
+        'post': 'participant_join',
+        'patch': 'participant_join',
+    }
 
     def get_permissions(self):
         """Return appropriate permission class"""
@@ -55,8 +124,11 @@ class ParticipantView(generics.GenericAPIView,
             status=Participant.Status.JOIN, is_active=True
         ).order_by('updated_at')
 
-    def get_object(self):
-        obj = get_object_or_404(Participant,
+    def get_object(self, lock=False):
+        queryset = Participant.objects.all()
+        if lock:
+            queryset = queryset.select_for_update()
+        obj = get_object_or_404(queryset,
                                 event=self.kwargs["pk"],
                                 user=self.request.user.id,
                                 is_active=True
@@ -64,9 +136,26 @@ class ParticipantView(generics.GenericAPIView,
         self.check_object_permissions(self.request, obj)
         return obj
 
+    def get_read_serializer(self):
+        return read_serializers.ParticipantReadSerializer()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if (self.paginator.get_page_size(request) is None and
+                self.should_stream(queryset.count())):
+            return self.streaming_response(self.iter_serialized(queryset))
+
+        reader = self.get_read_serializer()
+        rows = reader.get_rows(queryset)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.serialize(page))
+        return Response(reader.serialize(rows))
+
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         """Create a new participant in the system"""
         event = Event.objects.get(pk=kwargs['pk'])
@@ -78,41 +167,69 @@ class ParticipantView(generics.GenericAPIView,
             'user': self.request.user.id
         }
         serializer = self.get_serializer(data=data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(status=status.HTTP_201_CREATED)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status.HTTP_400_BAD_REQUEST)
 
-        return Response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+        try:
+            with transaction.atomic():
+                participant = serializer.save(
+                    status=admission_status(kwargs['pk']))
+        except IntegrityError:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
 
-    def patch(self, request, *args, **kwargs):
-        participant = self.get_object()
+        if participant.status == Participant.Status.JOIN:
+            publish_participant_delta(kwargs['pk'], 1)
+        return Response({'status': participant.status},
+                        status=status.HTTP_201_CREATED)
 
-        data = {}
+    def patch(self, request, *args, **kwargs):
         url = self.request.path
         if 'join' in url:
-            data['status'] = Participant.Status.JOIN
+            requested_status = Participant.Status.JOIN
         elif 'cancel' in url:
-            data['status'] = Participant.Status.CANCEL
+            requested_status = Participant.Status.CANCEL
         else:
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = self.get_serializer(
-            instance=participant, data=data, partial=True)
-        if not serializer.is_valid():
-            Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-        serializer.save()
-        return Response(status=status.HTTP_200_OK)
+        with transaction.atomic():
+            participant = self.get_object(lock=True)
+            previous_status = participant.status
+            delta = 0
+            if requested_status == Participant.Status.CANCEL:
+                new_status = Participant.Status.CANCEL
+                if previous_status == Participant.Status.JOIN:
+                    delta = release_seat(kwargs['pk']) - 1
+            elif previous_status == Participant.Status.CANCEL:
+                new_status = admission_status(kwargs['pk'])
+                delta = int(new_status == Participant.Status.JOIN)
+            else:
+                new_status = previous_status
+
+            serializer = self.get_serializer(
+                instance=participant, data={'status': requested_status},
+                partial=True)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(status=new_status)
+
+        if delta:
+            publish_participant_delta(kwargs['pk'], delta)
+        return Response({'status': new_status}, status=status.HTTP_200_OK)
 
     def delete(self, request, *arts, **kwargs):
         """Logical Delete a participant"""
-        participant = self.get_object()
-        participant.delete()
-
+        with transaction.atomic():
+            participant = self.get_object(lock=True)
+            participant.delete()
+            delta = 0
+            if participant.status == Participant.Status.JOIN:
+                delta = release_seat(kwargs['pk']) - 1
+
+        if delta:
+            publish_participant_delta(kwargs['pk'], delta)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class EventCommentView(generics.GenericAPIView,
+class EventCommentView(MetricsMixin, generics.GenericAPIView,
                        mixins.ListModelMixin,
                        mixins.CreateModelMixin,
                        mixins.UpdateModelMixin,
@@ -122,6 +239,7 @@ class EventCommentView(generics.GenericAPIView,
     pagination_class = EventCommentListSetPagination
     queryset = EventComment.objects.all()
     ordering = ['updated_at']
+    throttle_scopes = {'post': 'comment_post'}
 
     def get_permissions(self):
         """Return appropriate permission class"""
@@ -148,9 +266,18 @@ class EventCommentView(generics.GenericAPIView,
         self.check_object_permissions(self.request, obj)
         return obj
 
+    def list(self, request, *args, **kwargs):
+        reader = read_serializers.EventCommentReadSerializer()
+        rows = reader.get_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.serialize(page))
+        return Response(reader.serialize(rows))
+
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         data = {
             'event': kwargs['pk'],
@@ -186,26 +313,187 @@ class EventCommentView(generics.GenericAPIView,
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventCommentStreamView(generics.GenericAPIView):
+    """Stream comment changes of an event as Server-Sent Events
+
+    Open it with `last_id` set to the `stream_cursor` of the comment list
+    so the comments changed in between are replayed first.
+    """
+    permission_classes = [IsValidEvent]
+    renderer_classes = [FastJSONRenderer, EventStreamRenderer]
+    serializer_class = serializers.ListEventCommentSerializer
+    HEARTBEAT_SECONDS = 15
+    MAX_STREAM_SECONDS = 300
+    RETRY_MILLISECONDS = 3000
+    BUSY_RETRY_SECONDS = 30
+    BACKLOG_LIMIT = 500
+    # Open WSGI streams of this process, capped by COMMENT_STREAM_LIMIT
+    slots = StreamSlots()
+
+    def get(self, request, *args, **kwargs):
+        last_id = (request.META.get('HTTP_LAST_EVENT_ID') or
+                   request.query_params.get('last_id'))
+        cursor = None
+        if last_id:
+            try:
+                cursor = parse_cursor(last_id)
+            except ValueError:
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+
+        if isinstance(request._request, ASGIRequest):
+            # Waits in the event loop, so it holds no thread nor slot
+            response = AsyncStreamingHttpResponse(
+                self.async_stream(kwargs['pk'], cursor),
+                content_type='text/event-stream'
+            )
+        elif self.slots.acquire(settings.COMMENT_STREAM_LIMIT):
+            response = StreamingHttpResponse(
+                ReleasingIterator(self.stream(kwargs['pk'], cursor),
+                                  self.slots.release),
+                content_type='text/event-stream'
+            )
+        else:
+            return Response(
+                {'detail': 'Too many open comment streams.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(self.BUSY_RETRY_SECONDS)})
+
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def stream(self, event_id, cursor):
+        # Subscribe before reading the backlog so no change falls between
+        subscription = broker.subscribe(comment_topic(event_id))
+        try:
+            yield f'retry: {self.RETRY_MILLISECONDS}\n\n'
+            more = cursor is not None
+            while more:
+                chunks, cursor, more = self.read_backlog(event_id, cursor)
+                yield from chunks
+
+            deadline = time.monotonic() + self.MAX_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                message = subscription.get(timeout=self.HEARTBEAT_SECONDS)
+                if subscription.overflowed:
+                    break
+                if message is None:
+                    yield ': keepalive\n\n'
+                elif cursor is None or message['cursor'] > cursor:
+                    cursor = message['cursor']
+                    yield self.format_message(message)
+        finally:
+            subscription.close()
+
+    async def async_stream(self, event_id, cursor):
+        """stream() for an ASGI server, waiting without a thread"""
+        subscription = broker.subscribe_async(comment_topic(event_id))
+        try:
+            yield f'retry: {self.RETRY_MILLISECONDS}\n\n'.encode()
+            more = cursor is not None
+            while more:
+                chunks, cursor, more = await sync_to_async(
+                    self.read_backlog_in_thread)(event_id, cursor)
+                for chunk in chunks:
+                    yield chunk.encode()
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.MAX_STREAM_SECONDS
+            while loop.time() < deadline:
+                try:
+                    message = await asyncio.wait_for(
+                        subscription.get(), self.HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    message = None
+                if subscription.overflowed:
+                    break
+                if message is None:
+                    yield b': keepalive\n\n'
+                elif cursor is None or message['cursor'] > cursor:
+                    cursor = message['cursor']
+                    yield self.format_message(message).encode()
+        finally:
+            subscription.close()
+
+    def read_backlog(self, event_id, cursor):
+        """Return a backlog page as messages, the cursor after it and
+        whether more may follow"""
+        backlog = list(self.get_backlog(event_id, cursor))
+        chunks = []
+        for comment in backlog:
+            created = cursor_time(cursor) < comment.created_at
+            message = comment_message(
+                comment, comment_change_type(comment, created))
+            cursor = message['cursor']
+            chunks.append(self.format_message(message))
+        return chunks, cursor, len(backlog) == self.BACKLOG_LIMIT
+
+    def read_backlog_in_thread(self, event_id, cursor):
+        """read_backlog() on a pool thread, closing its connection"""
+        close_old_connections()
+        try:
+            return self.read_backlog(event_id, cursor)
+        finally:
+            close_old_connections()
+
+    def get_backlog(self, event_id, cursor):
+        """Return a page of comments changed after the cursor"""
+        updated_at = cursor_time(cursor)
+        return EventComment.objects.filter(
+                Q(updated_at__gt=updated_at) |
+                Q(updated_at=updated_at, id__gt=cursor[1]),
+                event=event_id
+            ).order_by('updated_at', 'id')[:self.BACKLOG_LIMIT]
+
+    def format_message(self, message):
+        data = json.dumps(message['comment'], ensure_ascii=False)
+        return (f'id: {format_cursor(message["cursor"])}\n'
+                f'event: {message["type"]}\n'
+                f'data: {data}\n\n')
+
+
+class EventViewSet(MetricsMixin, StreamingListMixin,
+                   viewsets.ModelViewSet):
     """Manage Event in the event"""
     pagination_class = EventListSetPagination
     queryset = Event.objects.all()
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = EventFilter
+    throttle_scopes = {'list': 'event_list'}
+    SEARCH_QUERY_MAX_LENGTH = 100
+    COUNTS_CACHE_SECONDS = 60
 
     def get_queryset(self):
         if self.action == 'list':
-            start = self.request.query_params['start'] + ' 00:00:00'
-            end = self.request.query_params['end'] + ' 23:59:59'
             return Event.objects.filter(
                     is_active=True,
                     status=Event.Status.PUBLIC,
-                    event_time__range=(start, end)
+                    event_time__gte=self.date_range['start_time'],
+                    event_time__lt=self.date_range['end_time']
                 )
+        elif self.action == 'search':
+            events = Event.objects.filter(
+                    is_active=True,
+                    status=Event.Status.PUBLIC
+                )
+            return search_events(events, self.request.query_params['q'])
+        elif self.action == 'retrieve':
+            return serializers.RetrieveEventSerializer.optimize_queryset(
+                Event.objects.filter(is_active=True), **self.fieldset)
 
         return Event.objects.filter(is_active=True)
 
+    def filter_queryset(self, queryset):
+        # EventFilter narrows the event list only
+        if self.action != 'list':
+            return queryset
+        return super().filter_queryset(queryset)
+
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action == 'list' or self.action == 'search':
             return serializers.BriefEventSerializer
+        elif self.action == 'nearby':
+            return serializers.NearbyEventSerializer
         elif self.action == 'retrieve':
             return serializers.RetrieveEventSerializer
         elif self.action == 'create':
@@ -213,12 +501,17 @@ class EventViewSet(viewsets.ModelViewSet):
         else:
             return serializers.UpdateEventSerializer
 
+    def get_read_serializer(self):
+        if self.action in ('list', 'search'):
+            return read_serializers.BriefEventReadSerializer()
+        return None
+
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that
         this view requires.
         """
-        if self.action == 'list' or self.action == 'retrieve':
+        if self.action in ('list', 'retrieve', 'search', 'nearby', 'counts'):
             permission_class_list = [IsAuthenticatedOrReadOnly]
         elif self.action == 'create':
             permission_class_list = [IsAuthenticatedOrReadOnly, IsGuideOnly]
@@ -239,23 +532,103 @@ class EventViewSet(viewsets.ModelViewSet):
 
     def list(self, request):
         query_params = self.request.query_params
-        try:
-            datetime.datetime.strptime(query_params['start'], "%Y-%m-%d")
-            datetime.datetime.strptime(query_params['end'], "%Y-%m-%d")
-        except ValueError:
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-        except KeyError:
+        query = serializers.EventDateRangeSerializer(data=query_params)
+        if not query.is_valid():
+            return Response(query.errors, status.HTTP_400_BAD_REQUEST)
+        self.date_range = query.validated_data
+
+        events = self.filter_queryset(self.get_queryset())
+        if self.should_stream(self.paginator.get_page_size(request)):
+            page = self.paginator.paginate_queryset(
+                events, request, view=self, lazy=True)
+            data = self.paginator.get_paginated_data(
+                self.iter_serialized(page))
+            if query_params.get('facets') in ('1', 'true'):
+                data['facets'] = event_facets(events)
+            return self.streaming_response(data)
+
+        reader = self.get_read_serializer()
+        page = self.paginate_queryset(reader.get_rows(events))
+        if page is not None:
+            response = self.get_paginated_response(reader.serialize(page))
+            if query_params.get('facets') in ('1', 'true'):
+                response.data['facets'] = event_facets(events)
+            return response
+
+        rows = list(reader.get_rows(events))
+        return Response(reader.serialize(rows), status=status.HTTP_200_OK)
+
+    @action(methods=['get'], detail=False)
+    def search(self, request):
+        """Search public events by title, description and address"""
+        query = self.request.query_params.get('q', '').strip()
+        if not query or len(query) > self.SEARCH_QUERY_MAX_LENGTH:
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        events = self.get_queryset()
+        reader = self.get_read_serializer()
+        page = self.paginate_queryset(reader.get_rows(self.get_queryset()))
+        return self.get_paginated_response(reader.serialize(page))
+
+    @action(methods=['get'], detail=False)
+    def nearby(self, request):
+        """List public events within a radius ordered by distance"""
+        query = serializers.NearbyEventQuerySerializer(
+            data=self.request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status.HTTP_400_BAD_REQUEST)
+
+        params = query.validated_data
+        events = Event.objects.filter(
+                is_active=True,
+                status=Event.Status.PUBLIC
+            )
+        if 'start_time' in params:
+            events = events.filter(
+                event_time__gte=params['start_time'],
+                event_time__lt=params['end_time']
+            )
+
+        events = nearby_events(
+            events, params['lat'], params['lng'], params['radius'])
         page = self.paginate_queryset(events)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(instance=events, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(methods=['get'], detail=False)
+    def counts(self, request):
+        """Count public events per day for a calendar month view"""
+        query = serializers.EventCountsQuerySerializer(
+            data=self.request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status.HTTP_400_BAD_REQUEST)
+
+        params = query.validated_data
+        key = (f'event:counts:{get_event_counts_version()}:'
+               f'{params["start"]}:{params["end"]}')
+        counts = cache.get(key)
+        record_cache('event_counts', counts is not None)
+        if counts is None:
+            events = Event.objects.filter(
+                    is_active=True,
+                    status=Event.Status.PUBLIC,
+                    event_time__gte=params['start_time'],
+                    event_time__lt=params['end_time']
+                )
+            offset = localtime(params['start_time']).utcoffset()
+            counts = [
+                {'date': row['date'].isoformat(), 'count': row['count']}
+                for row in events.annotate(
+                    date=LocalDate('event_time', offset))
+                .values('date').annotate(count=Count('id')).order_by('date')
+                if row['date'] is not None
+            ]
+            cache.set(key, counts, self.COUNTS_CACHE_SECONDS)
+
+        response = Response(counts, status=status.HTTP_200_OK)
+        patch_cache_control(response, max_age=self.COUNTS_CACHE_SECONDS)
+        return response
+
+    @idempotent
     def create(self, request):
         if request.data['organizer'] != str(self.request.user.id):
             return Response(status=status.HTTP_400_BAD_REQUEST)
@@ -266,8 +639,17 @@ class EventViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_201_CREATED)
 
     def retrieve(self, request, pk=None):
+        query = serializers.RetrieveEventQuerySerializer(
+            data=self.request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status.HTTP_400_BAD_REQUEST)
+        self.fieldset = {
+            'fields': query.validated_data.get('fields'),
+            'expand': query.validated_data.get('expand', []),
+        }
+
         event = self.get_object()
-        serializer = self.get_serializer(instance=event)
+        serializer = self.get_serializer(instance=event, **self.fieldset)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def partial_update(self, request, pk=None):
@@ -277,8 +659,12 @@ class EventViewSet(viewsets.ModelViewSet):
 
         serializer = self.get_serializer(instance=event, data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
+            promoted = admit_waitlist(event.id)
 
+        if promoted:
+            publish_participant_delta(event.id, promoted)
         return Response(status=status.HTTP_200_OK)
 
     def destroy(self, request, pk=None):
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
 from rest_framework import serializers
 
 from core.models import Event, Participant
@@ -50,6 +51,47 @@ class UserShortNameSerializer(serializers.ModelSerializer):
         return user.short_name
 
 
+class UserProfileSerializer(serializers.ModelSerializer):
+    """Serializer for a user profile of the batch lookup"""
+    short_name = serializers.SerializerMethodField()
+    icon_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = get_user_model()
+        fields = ('id', 'short_name', 'icon_url')
+
+    def get_short_name(self, user):
+        return user.short_name
+
+    def get_icon_url(self, user):
+        if not user.is_active:
+            return staticfiles_storage.url(user.DEFAULT_ICON_PATH)
+        return user.icon_url
+
+
+class UserProfilesQuerySerializer(serializers.Serializer):
+    """Serializer for batch user profile query parameters"""
+    MAX_IDS = 100
+
+    ids = serializers.CharField(help_text='Comma separated user ids')
+
+    def validate_ids(self, value):
+        try:
+            ids = [int(user_id) for user_id in value.split(',')
+                   if user_id.strip()]
+        except ValueError:
+            raise serializers.ValidationError(
+                'ids must be comma separated integers')
+        # Drop duplicates, keeping the order
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            raise serializers.ValidationError('ids must not be empty')
+        if len(ids) > self.MAX_IDS:
+            raise serializers.ValidationError(
+                f'at most {self.MAX_IDS} ids can be looked up at once')
+        return ids
+
+
 class UserEmailSerializer(serializers.ModelSerializer):
     """Serializer for a user email object"""
 
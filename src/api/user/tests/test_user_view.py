@@ -5,6 +5,8 @@ import tempfile
 from faker import Faker
 
 from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 from django.utils.timezone import make_aware
@@ -12,12 +14,14 @@ from PIL import Image
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core.budgets import RequestBudget, budget
 from core.models import Event, Participant, EventComment
 from core.factorys import (
     UserFactory, EventFactory, ParticipantFactory, EventCommentFactory
 )
 
 USER_URL = reverse('user:user-list')
+PROFILES_URL = reverse('user:user-profiles')
 
 
 fake = Faker()
@@ -58,6 +62,7 @@ def joined_event_url(user_id):
     return reverse('user:user-joinedEvents', args=[user_id])
 
 
+@budget(queries=3, ms=300)
 class PublicUserApiTests(TestCase):
     """Test the users API (public)"""
 
@@ -215,6 +220,7 @@ class PublicUserApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+@budget(queries=3, ms=500)
 class PrivateUserApiTests(TestCase):
     """Test API requests that require authentication"""
 
@@ -326,6 +332,7 @@ class PrivateUserApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @budget(queries=12, ms=500)
     def test_delete_user_successful(self):
         """Test logically deleting the user"""
         self.user.is_guide = True
@@ -345,6 +352,27 @@ class PrivateUserApiTests(TestCase):
         self.assertFalse(self.participant.is_active)
         self.assertFalse(self.event_comment.is_active)
 
+    @budget(queries=12, ms=500)
+    def test_delete_user_after_leaving_event(self):
+        """Test deleting a user who left an event keeps its seat count"""
+        self.user.is_staff = True
+        self.user.save()
+        event = EventFactory(organizer=self.another_user, capacity=1)
+        participants_url = reverse('event:listCreateParticipant',
+                                   args=[event.id])
+        self.client.post(participants_url)
+        self.client.delete(participants_url)
+        self.client.force_authenticate(self.another_user)
+        self.client.post(participants_url)
+
+        self.client.force_authenticate(self.user)
+        res = self.client.delete(detail_url(self.user.id))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        event.refresh_from_db()
+        self.assertEqual(event.participant_count, 1)
+        self.assertFalse(event.has_space)
+
     def test_retrieve_user_email_by_another_user(self):
         """Test false retrieving user e-mail by another user"""
         url = email_url(self.another_user.id)
@@ -363,3 +391,60 @@ class PrivateUserApiTests(TestCase):
         url = detail_url(self.another_user.id)
         res = self.client.delete(url)
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@budget(queries=1, ms=300)
+class UserProfilesApiTests(TestCase):
+    """Test the batch user profile lookup"""
+
+    def setUp(self):
+        cache.clear()
+        self.users = [UserFactory(first_name=fake.first_name())
+                      for _ in range(3)]
+        self.deleted_user = UserFactory(first_name=fake.first_name())
+        self.deleted_user.delete()
+        self.client = APIClient()
+
+    def get_profiles(self, user_ids):
+        return self.client.get(
+            PROFILES_URL, {'ids': ','.join(map(str, user_ids))})
+
+    def test_retrieve_profiles(self):
+        """Test profiles are returned in the requested order"""
+        ids = [self.users[2].id, self.deleted_user.id, 0, self.users[0].id]
+        res = self.get_profiles(ids)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        default_icon = staticfiles_storage.url(
+            get_user_model().DEFAULT_ICON_PATH)
+        self.assertJSONEqual(res.content, [
+            {'id': self.users[2].id, 'short_name': self.users[2].first_name,
+             'icon_url': self.users[2].icon_url},
+            {'id': self.deleted_user.id, 'short_name': 'deleted user',
+             'icon_url': default_icon},
+            {'id': self.users[0].id, 'short_name': self.users[0].first_name,
+             'icon_url': self.users[0].icon_url},
+        ])
+
+    def test_cached_profiles(self):
+        """Test profiles are cached per user until the user changes"""
+        ids = [user.id for user in self.users]
+        self.get_profiles(ids[:2])
+
+        with RequestBudget(queries=0):
+            res = self.get_profiles(ids[:2])
+        self.assertEqual(len(res.data), 2)
+
+        self.users[0].first_name = 'edited'
+        self.users[0].save()
+        with RequestBudget(queries=1):
+            res = self.get_profiles(ids)
+        self.assertEqual([profile['short_name'] for profile in res.data],
+                         ['edited', self.users[1].first_name,
+                          self.users[2].first_name])
+
+    def test_invalid_ids(self):
+        """Test malformed or too many ids are rejected"""
+        for ids in ('', 'a,1', ','.join(map(str, range(1, 102)))):
+            res = self.client.get(PROFILES_URL, {'ids': ids})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,21 +1,30 @@
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 
+from core.admission import release_seat
+from core.metrics import MetricsMixin, record_cache
 from core.models import Event, Participant, EventComment
 from core.permissions import IsUserOwnerOnly
+from core.signals import user_profile_key
+from event.consumers import publish_participant_delta
+from event.read_serializers import BriefEventReadSerializer
 from user import serializers
 
 
-class UserViewSet(viewsets.GenericViewSet,
+class UserViewSet(MetricsMixin, viewsets.GenericViewSet,
                   mixins.RetrieveModelMixin,
                   mixins.UpdateModelMixin,
                   mixins.DestroyModelMixin):
     """Manage User"""
     queryset = get_user_model().objects.filter(is_active=True)
+    PROFILE_CACHE_SECONDS = 300
 
     def get_permissions(self):
         """Return appropriate permission class"""
@@ -35,6 +44,8 @@ class UserViewSet(viewsets.GenericViewSet,
             return serializers.ShowUserSerializer
         elif self.action == 'shortname':
             return serializers.UserShortNameSerializer
+        elif self.action == 'profiles':
+            return serializers.UserProfileSerializer
         elif self.action == 'email':
             return serializers.UserEmailSerializer
         elif self.action == 'organizedEvents' or self.action == 'joinedEvents':
@@ -58,6 +69,48 @@ class UserViewSet(viewsets.GenericViewSet,
         serializer = self.get_serializer(instance=user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @extend_schema(
+        parameters=[OpenApiParameter(
+            'ids', str, required=True,
+            description='Comma separated user ids, at most '
+                        f'{serializers.UserProfilesQuerySerializer.MAX_IDS}')],
+        responses=serializers.UserProfileSerializer(many=True))
+    @action(methods=['get'], detail=False, pagination_class=None)
+    def profiles(self, request):
+        """Return short names and icons of many users in one request
+
+        Deleted users are included as "deleted user". Profiles are cached
+        per user, so only users missing from the cache are queried.
+        """
+        query = serializers.UserProfilesQuerySerializer(
+            data=self.request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status.HTTP_400_BAD_REQUEST)
+
+        ids = query.validated_data['ids']
+        keys = {user_id: user_profile_key(user_id) for user_id in ids}
+        cached = cache.get_many(keys.values())
+        profiles = {user_id: cached[key] for user_id, key in keys.items()
+                    if key in cached}
+        for user_id in ids:
+            record_cache('user_profiles', user_id in profiles)
+
+        missing = [user_id for user_id in ids if user_id not in profiles]
+        if missing:
+            users = get_user_model().objects.filter(id__in=missing).only(
+                'id', 'first_name', 'family_name', 'is_active', 'icon')
+            fetched = {
+                profile['id']: profile for profile in
+                self.get_serializer(users, many=True).data
+            }
+            cache.set_many({keys[user_id]: profile
+                            for user_id, profile in fetched.items()},
+                           self.PROFILE_CACHE_SECONDS)
+            profiles.update(fetched)
+
+        return Response([profiles[user_id] for user_id in ids
+                         if user_id in profiles], status=status.HTTP_200_OK)
+
     @action(methods=['get', 'patch'], detail=True)
     def email(self, request, pk=None):
         user = self.get_object()
@@ -88,13 +141,13 @@ class UserViewSet(viewsets.GenericViewSet,
                     status=Event.Status.PRIVATE
                 )
 
-        page = self.paginate_queryset(events)
+        reader = BriefEventReadSerializer()
+        page = self.paginate_queryset(reader.get_rows(events))
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(reader.serialize(page))
 
-        serializer = self.get_serializer(instance=events, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        rows = list(reader.get_rows(events))
+        return Response(reader.serialize(rows), status=status.HTTP_200_OK)
 
     @action(methods=['get'], detail=True)
     def organizedEvents(self, request, pk=None):
@@ -126,9 +179,16 @@ class UserViewSet(viewsets.GenericViewSet,
         for event in events:
             event.delete()
 
-        participants = Participant.objects.filter(user=user.id)
-        for participant in participants:
-            participant.delete()
+        with transaction.atomic():
+            participants = Participant.objects.select_for_update().filter(
+                user=user.id, is_active=True)
+            for participant in participants:
+                participant.delete()
+                if participant.status == Participant.Status.JOIN:
+                    delta = release_seat(participant.event_id) - 1
+                    if delta:
+                        publish_participant_delta(participant.event_id,
+                                                  delta)
 
         event_comments = EventComment.objects.filter(user=user.id)
         for event_comment in event_comments: